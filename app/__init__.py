@@ -1,9 +1,11 @@
-from flask import Flask, render_template
+from flask import Flask, render_template, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect  # Neuer Import
 from app.models import User, db
 from app.utils.enforce_password_change import enforce_password_change
+from app.utils.settings_utils import check_settings_version
+from app.utils.storage_utils import configure_storage, get_storage_profile, report_storage
 from app.blueprints.auth import auth_bp
 from app.blueprints.admin import admin_bp
 from app.blueprints.public import public_bp
@@ -57,12 +59,48 @@ def create_app(testing=False):
                 f.write(secret_key)
     app.config['SECRET_KEY'] = secret_key
 
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:' if testing else f"sqlite:///{db_path}"
+    # DATABASE_URL erlaubt eine andere Datenbankdatei (z. B. für Lasttests)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:' if testing else os.environ.get('DATABASE_URL', f"sqlite:///{db_path}")
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # SQLite-Speicherprofil (siehe app/utils/storage_utils.py), einzelne Pragmas per SQLITE_* überschreibbar
+    app.config['SQLITE_PROFILE'] = os.environ.get('SQLITE_PROFILE', 'wal')
+    app.config['SQLITE_STORAGE'] = get_storage_profile(app.config['SQLITE_PROFILE'], os.environ)
+    # Wiederholungen von BEGIN IMMEDIATE, wenn busy_timeout abgelaufen ist
+    app.config['SQLITE_WRITE_RETRIES'] = int(os.environ.get('SQLITE_WRITE_RETRIES', '3'))
+    if ':memory:' not in app.config['SQLALCHEMY_DATABASE_URI']:
+        # Verbindungen pro Worker; jeder Thread hält höchstens eine
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': int(os.environ.get('SQLITE_POOL_SIZE', '5')),
+            'max_overflow': int(os.environ.get('SQLITE_MAX_OVERFLOW', '10')),
+        }
     app.config['DB_AUTO_FIX'] = os.environ.get('DB_AUTO_FIX', 'True').lower() in ('true', '1', 't')
     app.config['PDF_CLEANUP_MINUTES'] = int(os.environ.get('PDF_CLEANUP_MINUTES', '15'))
+    # Relativer Anteil überzähliger Tische, ab dem die Sitzordnung komplett neu gepackt wird
+    app.config['TABLE_REPACK_THRESHOLD'] = float(os.environ.get('TABLE_REPACK_THRESHOLD', '0.1'))
+    # Tischberechnung im Hintergrund: höchstens einmal pro Zeitfenster (Sekunden)
+    app.config['TABLE_RECOMPUTE_ASYNC'] = not testing and os.environ.get('TABLE_RECOMPUTE_ASYNC', 'True').lower() in ('true', '1', 't')
+    app.config['TABLE_RECOMPUTE_WINDOW'] = float(os.environ.get('TABLE_RECOMPUTE_WINDOW', '5'))
+    # Zeitbudget (Sekunden) für die optimierte Tischverteilung
+    app.config['TABLE_SOLVER_BUDGET'] = float(os.environ.get('TABLE_SOLVER_BUDGET', '2'))
+    # Maximales Alter (Sekunden) des Einstellungs-Caches pro Worker
+    app.config['SETTINGS_CACHE_TTL'] = float(os.environ.get('SETTINGS_CACHE_TTL', '60'))
+    # Browser-Cache (Sekunden) für Startseite und Rechtstexte
+    app.config['PUBLIC_CACHE_SECONDS'] = int(os.environ.get('PUBLIC_CACHE_SECONDS', '300'))
+    # Einladungen pro Seite in der Gästeliste des Dashboards
+    app.config['ADMIN_PAGE_SIZE'] = int(os.environ.get('ADMIN_PAGE_SIZE', '100'))
+    # Live-Aktualisierung des Dashboards: Abfrageintervall und Laufzeit eines Streams (Sekunden).
+    # Streams brauchen einen Server mit Threads (gunicorn.conf.py: gthread); die Laufzeit bleibt unter dem --timeout (30)
+    app.config['EVENT_POLL_SECONDS'] = float(os.environ.get('EVENT_POLL_SECONDS', '1'))
+    app.config['EVENT_STREAM_SECONDS'] = float(os.environ.get('EVENT_STREAM_SECONDS', '25'))
+    # Ohne Threads (Sync-Worker) fragt der Browser stattdessen in diesem Abstand nach (Sekunden)
+    app.config['EVENT_FALLBACK_SECONDS'] = float(os.environ.get('EVENT_FALLBACK_SECONDS', '5'))
+    # Aufbewahrungsdauer des Änderungsprotokolls (Sekunden)
+    app.config['EVENT_RETENTION_SECONDS'] = int(os.environ.get('EVENT_RETENTION_SECONDS', '3600'))
 
     db.init_app(app)
+    with app.app_context():
+        configure_storage(db.engine, app.config['SQLITE_STORAGE'], app.config['SQLITE_WRITE_RETRIES'])
+        app.extensions['sqlite_pragmas'] = report_storage(app)
 
     login_manager = LoginManager()
     login_manager.login_view = "auth.login"
@@ -74,6 +112,12 @@ def create_app(testing=False):
 
     app.before_request(enforce_password_change)
 
+    # Geänderte Einstellungen anderer Worker erkennen (eine Abfrage pro Request)
+    @app.before_request
+    def refresh_settings_cache():
+        if request.endpoint != "static":
+            check_settings_version()
+
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(admin_bp, url_prefix="/admin")
     app.register_blueprint(public_bp)
@@ -1,13 +1,24 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app, jsonify, stream_with_context
 from flask_login import login_required
-from app.models import Invite, Response, Setting, TableAssignment, db
-from app.utils.table_utils import assign_all_tables, get_blocked_tischnummern, get_next_free_tischnummer, build_verein_tische_map
-from app.utils.settings_utils import get_setting, get_multiple_settings, get_max_tables, get_base_url
+from app.models import Invite, Response, db
+from app.utils.table_utils import get_blocked_tischnummern, get_next_free_tischnummer
+from app.utils.settings_utils import get_settings, get_base_url, save_settings
 from app.utils.qr_utils import generate_qr
+from app.utils.recompute_utils import mark_layout_dirty, get_layout_state
+from app.utils.verein_utils import make_verein_key
+from app.utils.token_utils import mark_invites_changed
+from app.utils.dashboard_utils import (
+    INVITE_STATUS_FILTERS, MAX_PAGE_SIZE, get_dashboard_stats, load_invite_page, load_table_occupancy,
+)
+from app.utils.storage_utils import write_transaction
+from app.utils.stream_utils import stream_page
+from app.utils.event_utils import event_stream, latest_event_id, record_event, response_delta
+from app.utils.stats_utils import apply_stats_delta, refresh_table_stats
 import os
 from datetime import datetime, date
-from sqlalchemy import func
-from functools import lru_cache  # Für die cache_clear Methode
+from sqlalchemy import exists, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
 
 admin_bp = Blueprint("admin", __name__)
 
@@ -19,104 +30,116 @@ admin_bp = Blueprint("admin", __name__)
 @login_required
 def index():
     """Admin dashboard for managing invitations."""
-    invites = Invite.query.order_by(Invite.verein).all()
-    responses = {r.token: r for r in Response.query.all()}
-    max_tables = get_max_tables()
+    settings = get_settings()
+    max_tables = settings.max_tables
+    enable_tables = "true" if settings.enable_tables else "false"
 
-    # Prepare statistics and data for the template
-    settings = get_multiple_settings({
-        "enable_tables": "false",
-        "max_tables": "90",
-        "vereins_name": "",
-        "event_name": "",
-        "event_date": ""
-    })
-    
-    enable_tables = settings["enable_tables"]
-    max_tables_value = settings["max_tables"]
-    
-    # Calculate statistics
-    response_count = Response.query.filter_by(attending='yes').count()
-    total_invites = len(invites)
-    total_persons = sum(r.persons for r in responses.values() if r.attending == 'yes' and r.persons)
-    
-    # Table statistics 
-    used_tables = 0
-    top_verein = "-"
-    top_persons = 0
-    verein_tische = {}
-    
-    if enable_tables == "true":
-        used_tables = len(set([ta.tischnummer for ta in TableAssignment.query.all()]))
-        verein_tische = build_verein_tische_map()
-        
-        # Find association with most guests
-        top = db.session.query(
-            TableAssignment.verein, 
-            func.sum(TableAssignment.personen)
-        ).group_by(TableAssignment.verein).order_by(
-            func.sum(TableAssignment.personen).desc()
-        ).first()
-        
-        if top:
-            top_verein = top[0]
-            top_persons = top[1]
+    # Gästeliste seitenweise (Keyset), gefiltert und sortiert in der Datenbank
+    filters = {key: request.args.get(key, "").strip() for key in ("status", "tisch", "q", "ort", "plz")}
+    sort = request.args.get("sort", "verein")
+    direction = "desc" if request.args.get("dir") == "desc" else "asc"
+    limit = request.args.get("limit", current_app.config["ADMIN_PAGE_SIZE"], type=int)
+    try:
+        invites = load_invite_page(
+            settings.enable_tables, filters, sort, direction,
+            after=request.args.get("after"), limit=max(1, min(limit, MAX_PAGE_SIZE))
+        )
+    except ValueError:
+        abort(400)
+    list_args = {key: value for key, value in filters.items() if value}
+    list_args.update(sort=sort, dir=direction)
 
-    # Tischzuweisungen für detaillierte Ansicht
-    table_assignments = TableAssignment.query.all()
-    tisch_belegung = {}
-    max_persons_per_table = int(get_setting("max_persons_per_table", "10"))
+    # JSON-Variante für das Nachladen weiterer Seiten, ohne Kennzahlen
+    if request.args.get("format") == "json" or request.accept_mimetypes.best == "application/json":
+        rows = list(invites)
+        next_cursor = invites.next_cursor
+        return jsonify(
+            invites=rows,
+            next_cursor=next_cursor,
+            next_url=url_for("admin.index", after=next_cursor, format="json", **list_args) if next_cursor else None,
+            html=render_template("admin_invite_rows.html", invites=rows, enable_tables=enable_tables),
+        )
 
-    for ta in table_assignments:
-        tisch_nr = str(ta.tischnummer)
-        if tisch_nr not in tisch_belegung:
-            tisch_belegung[tisch_nr] = {"belegt": 0, "vereine": []}
-        
-        tisch_belegung[tisch_nr]["vereine"].append((ta.verein, ta.personen))
-        tisch_belegung[tisch_nr]["belegt"] += ta.personen
+    # Stand des Änderungsprotokolls vor den Kennzahlen: Live-Updates setzen hier an
+    change_cursor = latest_event_id()
 
-    # Sortiere die Tische nach Nummer
-    tisch_belegung = dict(sorted(tisch_belegung.items(), key=lambda item: int(item[0])))
+    # Kennzahlen und Tischbelegung kommen fertig aggregiert aus der Datenbank
+    stats = get_dashboard_stats(settings.enable_tables)
+    tisch_belegung = {}
+    layout_pending = False
+    if settings.enable_tables:
+        layout_pending = get_layout_state().dirty
+        tisch_belegung = load_table_occupancy()
+    max_persons_per_table = settings.max_persons_per_table
 
     # Calculate days until event
     days_until_event = None
-    event_date_str = settings["event_date"]
-    event_name = settings["event_name"]
+    event_date_str = settings.get("event_date", "")
+    event_name = settings.get("event_name", "")
     
-    if event_date_str:
-        from datetime import datetime, date
-        try:
-            event_date = datetime.strptime(event_date_str, "%Y-%m-%d").date()
-            today = date.today()
-            days_until_event = (event_date - today).days
-        except ValueError:
-            # Falls das Datumsformat nicht korrekt ist, ignorieren
-            pass
+    if settings.event_date:
+        days_until_event = (settings.event_date - date.today()).days
     
-    return render_template(
+    # Gestreamt: Kopf und Kennzahlen gehen raus, während die Zeilen noch gelesen werden
+    return stream_page(
         "admin_dashboard.html",
         invites=invites,
-        responses=responses,
-        response_count=response_count,
-        total_invites=total_invites,
-        total_persons=total_persons,
-        vereins_name=settings["vereins_name"],
+        filters=filters,
+        sort=sort,
+        direction=direction,
+        list_args=list_args,
+        status_filters=INVITE_STATUS_FILTERS,
+        response_count=stats["response_count"],
+        total_invites=stats["total_invites"],
+        total_persons=stats["total_persons"],
+        vereins_name=settings.get("vereins_name", ""),
         event_name=event_name,
         event_date=event_date_str,
         days_until_event=days_until_event,
         enable_tables=enable_tables,
         max_tables=max_tables,  # ist jetzt ein int!
-        used_tables=used_tables,  # ebenfalls int
-        top_verein=top_verein,
-        top_persons=top_persons,
-        verein_tische=verein_tische,
+        used_tables=stats["used_tables"],  # ebenfalls int
+        top_verein=stats["top_verein"],
+        top_persons=stats["top_persons"],
         tisch_belegung=tisch_belegung,
-        max_persons_per_table=max_persons_per_table
+        max_persons_per_table=max_persons_per_table,
+        layout_pending=layout_pending,
+        change_cursor=change_cursor
     )
 
+@admin_bp.route("/events", methods=["GET"])
+@login_required
+def events():
+    """Stream changes for the dashboard as Server-Sent Events.
+
+    Why: Admins watching the RSVP rush had to reload the whole dashboard
+    to see new answers. The dashboard subscribes to this stream and
+    patches counters and rows in place (see event_stream()).
+    """
+    # Beim erneuten Verbinden schickt der Browser die zuletzt empfangene id mit
+    after = request.headers.get("Last-Event-ID") or request.args.get("after")
+    try:
+        after = int(after) if after else latest_event_id()
+    except ValueError:
+        abort(400)
+    lifetime = current_app.config["EVENT_STREAM_SECONDS"]
+    retry = None
+    if not request.environ.get("wsgi.multithread"):
+        # Sync-Worker: ein offener Stream würde den ganzen Worker blockieren,
+        # daher nur den Rückstand senden und den Browser später neu abfragen lassen
+        lifetime = 0
+        retry = current_app.config["EVENT_FALLBACK_SECONDS"]
+    stream = event_stream(after, current_app.config["EVENT_POLL_SECONDS"], lifetime, retry_seconds=retry)
+    response = current_app.response_class(stream_with_context(stream), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Reverse-Proxys (nginx) dürfen den Stream nicht puffern
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
 # Neue Route für die Einladungserstellung
 @admin_bp.route("/create-invite", methods=["GET", "POST"])
 @login_required
+@write_transaction
 def create_invite():
     """Create or edit an invitation."""
     invite_id = request.args.get("invite_id")
@@ -153,14 +176,14 @@ def create_invite():
             # Bestehende Einladung aktualisieren
             
             # Prüfen, ob der neue Vereinsname bereits existiert (wenn er geändert wurde)
-            if verein.lower() != invite.verein.lower():
-                existing_invite = Invite.query.filter(func.lower(Invite.verein) == verein.lower()).first()
+            if make_verein_key(verein) != invite.verein_key:
+                existing_invite = Invite.query.filter_by(verein_key=make_verein_key(verein)).first()
                 if existing_invite and existing_invite.id != invite.id:
                     flash(f"Ein Eintrag für '{verein}' existiert bereits. Bitte wählen Sie einen anderen Namen.", "danger")
                     return render_template(
                         "admin_invite_create.html", 
                         invite=invite,
-                        vereins_name=get_setting("vereins_name", "")
+                        vereins_name=get_settings().get("vereins_name", "")
                     )
             
             # Update invitation details
@@ -173,18 +196,25 @@ def create_invite():
             # The token cannot be changed after creation
             
             # Save changes
-            db.session.commit()
+            try:
+                record_event("invite", action="updated", invite_id=invite.id, verein=verein)
+                db.session.commit()
+            except IntegrityError:
+                # Der eindeutige Index auf verein_key greift, wenn parallel derselbe Name gespeichert wurde
+                db.session.rollback()
+                flash(f"Ein Eintrag für '{verein}' existiert bereits. Bitte wählen Sie einen anderen Namen.", "danger")
+                return redirect(url_for("admin.create_invite", invite_id=invite.id))
             
             flash(f"Einladung für {verein} wurde aktualisiert.", "success")
         else:
             # Prüfen, ob der Vereinsname bereits existiert
-            existing_invite = Invite.query.filter(func.lower(Invite.verein) == verein.lower()).first()
+            existing_invite = Invite.query.filter_by(verein_key=make_verein_key(verein)).first()
             if existing_invite:
                 flash(f"Ein Eintrag für '{verein}' existiert bereits. Bitte wählen Sie einen anderen Namen.", "danger")
                 return render_template(
                     "admin_invite_create.html", 
                     invite=None,
-                    vereins_name=get_setting("vereins_name", "")
+                    vereins_name=get_settings().get("vereins_name", "")
                 )
                 
             # Create response URL
@@ -201,7 +231,17 @@ def create_invite():
                 ort=ort
             )
             db.session.add(new_invite)
-            db.session.commit()
+            mark_invites_changed()
+            try:
+                db.session.flush()
+                apply_stats_delta({"total_invites": 1})
+                record_event("invite", action="created", invite_id=new_invite.id, verein=verein,
+                             delta={"total_invites": 1})
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                flash(f"Ein Eintrag für '{verein}' existiert bereits. Bitte wählen Sie einen anderen Namen.", "danger")
+                return redirect(url_for("admin.create_invite"))
             
             # We don't generate QR codes here anymore - they will be generated on-demand when creating PDFs
             flash(f"Neue Einladung für {verein} wurde erstellt.", "success")
@@ -209,8 +249,7 @@ def create_invite():
         return redirect(url_for("admin.index"))
     
     # Lade den Vereinsnamen für die Anzeige
-    vereins_name_setting = Setting.query.filter_by(key="vereins_name").first()
-    vereins_name = vereins_name_setting.value if vereins_name_setting else ""
+    vereins_name = get_settings().get("vereins_name", "")
     
     return render_template(
         "admin_invite_create.html", 
@@ -220,6 +259,7 @@ def create_invite():
 
 @admin_bp.route("/delete/<token>", methods=["POST"])
 @login_required
+@write_transaction
 def delete_invite(token):
     """Delete an invitation and its associated data.
     
@@ -227,30 +267,30 @@ def delete_invite(token):
     or are no longer needed, cleaning up all related data.
     """
     invite = Invite.query.filter_by(token=token).first()
-    response = Response.query.filter_by(token=token).first()
     
     if invite:
-        # First remove any table assignments
-        TableAssignment.query.filter_by(verein=invite.verein).delete()
-        db.session.commit()
-        
-        # Remove the invitation
+        invite_id = invite.id
+        alt = db.session.execute(
+            select(Response.attending, Response.persons).where(Response.invite_id == invite_id)
+        ).first()
+        # Response and table assignments are removed by ON DELETE CASCADE
         db.session.delete(invite)
-    
-    # Remove response if exists
-    if response:
-        db.session.delete(response)
-    
-    db.session.commit()
-    
-    # Recalculate table assignments after deletion
-    assign_all_tables()
+        mark_invites_changed()
+        delta = dict(response_delta(alt, None, 0), total_invites=-1)
+        apply_stats_delta(delta)
+        # Die Tischzuweisungen der Gruppe sind mit ihr weg
+        refresh_table_stats()
+        record_event("invite", action="deleted", invite_id=invite_id, delta=delta)
+        # Free the tables of the deleted group
+        mark_layout_dirty(invite_id)
+        db.session.commit()
     
     flash("Einladung gelöscht", "success")
     return redirect(url_for("admin.index"))
 
 @admin_bp.route("/settings", methods=["GET", "POST"])
 @login_required
+@write_transaction
 def settings():
     """Manage application settings."""
     # Define all settings with their keys and default values
@@ -268,40 +308,33 @@ def settings():
         "website": "",  # Website des Vereins
         "max_tables": "90",
         "max_persons_per_table": "10",
-        "enable_tables": "false"
+        "enable_tables": "false",
+        "table_solver": "greedy"  # "greedy" oder "optimize"
     }
     
     if request.method == "POST":
         # Process all settings from the form
+        values = {}
         for key in setting_definitions:
             # Spezialbehandlung für Checkboxen: wenn nicht gesendet, setze auf "false"
             if key == "enable_tables":
-                value = "true" if key in request.form else "false"
+                values[key] = "true" if key in request.form else "false"
             else:
-                value = request.form.get(key, setting_definitions[key])
-                
-            setting = Setting.query.filter_by(key=key).first()
-            
-            if setting:
-                setting.value = value
-            else:
-                db.session.add(Setting(key=key, value=value))
-        
-        db.session.commit()
-        
-        # Clear setting cache to ensure latest values are used
-        get_setting.cache_clear()
+                values[key] = request.form.get(key, setting_definitions[key])
         
         # Neu berechnen der Tischzuweisung, wenn die Tischverwaltung aktiviert ist
         if request.form.get("enable_tables") == "true":
-            from app.utils.table_utils import assign_all_tables
-            assign_all_tables()
+            mark_layout_dirty()
+        
+        # Ein Upsert für alle Einstellungen, danach laden alle Worker den Cache neu;
+        # der Commit schließt die Markierung für die Neuberechnung ein
+        save_settings(values)
         
         flash("Einstellungen gespeichert", "success")
         return redirect(url_for("admin.settings"))
 
     # Optimiert: Alle Einstellungen auf einmal abrufen
-    current_settings = get_multiple_settings(setting_definitions)
+    current_settings = get_settings().values_for(setting_definitions)
     
     return render_template(
         "admin_settings_edit.html",
@@ -325,18 +358,19 @@ def export_all_csv():
         # Wenn nur ein Token ausgewählt wurde, generiere einen einzelnen CSV-Export
         if len(selected_tokens) == 1:
             invite = Invite.query.filter_by(token=selected_tokens[0]).first_or_404()
-            res = Response.query.filter_by(token=selected_tokens[0]).first()
+            res = Response.query.filter_by(invite_id=invite.id).first()
             return generate_single_invite_csv(invite, res, get_full_link)
         
         # Mehrere ausgewählte Einladungen exportieren
         invites = Invite.query.filter(Invite.token.in_(selected_tokens)).order_by(Invite.verein).all()
-        responses = {r.token: r for r in Response.query.filter(Response.token.in_(selected_tokens)).all()}
+        responses = {r.invite_id: r for r in Response.query.filter(
+            Response.invite_id.in_([invite.id for invite in invites])).all()}
         
         return generate_all_invites_csv(invites, responses, get_full_link)
     
     # Standard: Alle exportieren
     invites = Invite.query.all()
-    responses = {r.token: r for r in Response.query.all()}
+    responses = {r.invite_id: r for r in Response.query.all()}
     return generate_all_invites_csv(invites, responses, get_full_link)
 
 @admin_bp.route("/export/csv/<token>")
@@ -346,7 +380,7 @@ def export_single_csv(token):
     from app.utils.csv_utils import generate_single_invite_csv
     
     invite = Invite.query.filter_by(token=token).first_or_404()
-    res = Response.query.filter_by(token=token).first()
+    res = Response.query.filter_by(invite_id=invite.id).first()
     
     # Hilfsfunktion für die URL-Generierung
     def get_full_link(token):
@@ -357,6 +391,7 @@ def export_single_csv(token):
 # Die neue edit_invite Route sollte so lauten:
 @admin_bp.route("/edit/<token>", methods=["GET", "POST"])
 @login_required
+@write_transaction
 def edit_invite(token):
     """Edit an existing invitation."""
     invite = Invite.query.filter_by(token=token).first_or_404()
@@ -370,8 +405,8 @@ def edit_invite(token):
         ort = request.form.get("ort", "").strip()
         
         # Check if another invite with this name exists
-        if verein.lower() != invite.verein.lower():
-            existing = Invite.query.filter(func.lower(Invite.verein) == verein.lower(),
+        if make_verein_key(verein) != invite.verein_key:
+            existing = Invite.query.filter(Invite.verein_key == make_verein_key(verein),
                                           Invite.id != invite.id).first()
             if existing:
                 flash(f"Ein Eintrag für '{verein}' existiert bereits. Bitte wählen Sie einen anderen Namen.", "danger")
@@ -384,7 +419,13 @@ def edit_invite(token):
         invite.plz = plz
         invite.ort = ort
         
-        db.session.commit()
+        try:
+            record_event("invite", action="updated", invite_id=invite.id, verein=verein)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            flash(f"Ein Eintrag für '{verein}' existiert bereits. Bitte wählen Sie einen anderen Namen.", "danger")
+            return redirect(url_for("admin.edit_invite", token=token))
         
         flash(f"Einladung für {verein} wurde aktualisiert.", "success")
         return redirect(url_for("admin.index"))
@@ -393,6 +434,7 @@ def edit_invite(token):
 
 @admin_bp.route("/import-csv", methods=["POST"])
 @login_required
+@write_transaction
 def import_csv():
     """Import multiple invitations from a CSV file.
     
@@ -428,55 +470,76 @@ def import_csv():
 
 @admin_bp.route("/assign_table/<token>", methods=["GET", "POST"])
 @login_required
+@write_transaction
 def assign_table(token):
     """Manually assign a table to an invitation."""
     invite = Invite.query.filter_by(token=token).first_or_404()
     
     # Überprüfe, ob Tischverwaltung aktiviert ist
-    enable_tables = get_setting("enable_tables", "false")
-    if enable_tables != "true":
+    settings = get_settings()
+    if not settings.enable_tables:
         flash("Die Tischverwaltung ist deaktiviert. Bitte aktivieren Sie sie zuerst in den Einstellungen.", "warning")
         return redirect(url_for("admin.settings"))
     
     # Holen der relevanten Tischdaten und Einstellungen
-    max_tables = int(get_setting("max_tables", "90"))
-    max_persons_per_table = int(get_setting("max_persons_per_table", "10"))
+    max_tables = settings.max_tables
+    max_persons_per_table = settings.max_persons_per_table
     
     # Zugehörige Response für Personenzahl
-    response = Response.query.filter_by(token=token).first()
+    response = Response.query.filter_by(invite_id=invite.id).first()
     
     if request.method == "POST":
         tisch_nr = request.form.get("tischnummer", "").strip()
         
         if tisch_nr and tisch_nr.isdigit():
-            # Wenn eine Tischnummer eingegeben wurde, als manuell gesetzt markieren
-            invite.tischnummer = tisch_nr
-            invite.manuell_gesetzt = True
+            tisch_nr = int(tisch_nr)
+            if not 1 <= tisch_nr <= max_tables:
+                flash(f"Bitte eine Tischnummer zwischen 1 und {max_tables} eingeben.", "danger")
+                return redirect(url_for("admin.assign_table", token=token))
+            # Wenn eine Tischnummer eingegeben wurde, als manuell gesetzt markieren.
+            # Ein Tisch gehört höchstens einer manuell gesetzten Gruppe (siehe README,
+            # "doppelte Tischnummern werden verhindert"); Prüfung und Schreiben in einem
+            # UPDATE, damit zwei Admins nicht gleichzeitig denselben Tisch vergeben.
+            andere = aliased(Invite)
+            gesetzt = db.session.execute(
+                update(Invite)
+                .where(
+                    Invite.id == invite.id,
+                    ~exists().where(
+                        andere.manuell_gesetzt.is_(True),
+                        andere.id != invite.id,
+                        andere.tischnummer == tisch_nr,
+                    ),
+                )
+                .values(tischnummer=tisch_nr, manuell_gesetzt=True)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if gesetzt:
+                record_event("invite", action="updated", invite_id=invite.id, tischnummer=tisch_nr, manuell=True)
+                # Tische neu berechnen
+                mark_layout_dirty()
             db.session.commit()
             
-            # Tische neu berechnen
-            assign_all_tables()
+            if not gesetzt:
+                flash(f"Tisch {tisch_nr} ist bereits manuell einem anderen Verein zugewiesen.", "danger")
+                return redirect(url_for("admin.assign_table", token=token))
             
             flash(f"Tisch {tisch_nr} wurde für {invite.verein} zugewiesen.", "success")
         else:
             # Falls keine Tischnummer eingegeben wurde, zur automatischen Zuweisung zurückkehren
             invite.tischnummer = None
             invite.manuell_gesetzt = False
-            db.session.commit()
-            
+            record_event("invite", action="updated", invite_id=invite.id, tischnummer=None, manuell=False)
             # Tische neu berechnen
-            assign_all_tables()
+            mark_layout_dirty()
+            db.session.commit()
             
             flash(f"Tischzuweisung für {invite.verein} wird nun automatisch berechnet.", "success")
             
         return redirect(url_for("admin.index"))
     
-    # Liste der bereits belegten Tische
-    blocked_tables = []
-    table_assignments = TableAssignment.query.all()
-    for ta in table_assignments:
-        if ta.verein != invite.verein:  # Eigene Tische nicht als blockiert anzeigen
-            blocked_tables.append(ta.tischnummer)
+    # Liste der bereits belegten Tische (eigene Tische nicht als blockiert anzeigen)
+    blocked_tables = get_blocked_tischnummern(exclude_invite_id=invite.id)
     
     # Bestehende Tischzuweisung
     current_table = invite.tischnummer if invite.manuell_gesetzt else None
@@ -484,9 +547,63 @@ def assign_table(token):
     return render_template(
         "admin_table_assign.html", 
         invite=invite, 
-        blocked=set(blocked_tables),  # Duplikate entfernen
+        blocked=sorted(blocked_tables),
         max_tables=max_tables,
         current_table=current_table,
         response=response,
         max_persons_per_table=max_persons_per_table
     )
+
+@admin_bp.route("/capacity", methods=["GET"])
+@login_required
+def capacity_planning():
+    """Compare seating results for a grid of table counts and seats per table.
+    
+    Why: Lets the admin choose max_tables and max_persons_per_table before
+    the event based on the current responses or a projected acceptance rate,
+    instead of trying values one by one in the settings.
+    """
+    from app.utils.capacity_utils import project_groups, evaluate_capacity_grid
+    
+    settings = get_settings()
+    max_tables = settings.max_tables
+    max_persons_per_table = settings.max_persons_per_table
+    
+    def int_arg(name, default, minimum=1):
+        value = request.args.get(name, "").strip()
+        return max(minimum, int(value)) if value.isdigit() else default
+    
+    tables_min = int_arg("tables_min", max(1, max_tables - 40))
+    tables_max = max(tables_min, int_arg("tables_max", max_tables + 40))
+    tables_step = int_arg("tables_step", 2)
+    seats_min = int_arg("seats_min", max(1, max_persons_per_table - 4))
+    seats_max = max(seats_min, int_arg("seats_max", max_persons_per_table + 4))
+    acceptance = request.args.get("acceptance", "").strip()
+    acceptance_rate = int(acceptance) / 100 if acceptance.isdigit() else None
+    
+    table_counts = list(range(tables_min, tables_max + 1, tables_step))
+    seat_counts = list(range(seats_min, seats_max + 1))
+    if len(table_counts) * len(seat_counts) > 5000:
+        flash("Das Raster ist zu groß (maximal 5000 Kombinationen). Bitte Bereich oder Schrittweite anpassen.", "warning")
+        table_counts = table_counts[:max(1, 5000 // len(seat_counts))]
+    
+    manuell_zuweisungen, vereine = project_groups(acceptance_rate)
+    cells = evaluate_capacity_grid(manuell_zuweisungen, vereine, table_counts, seat_counts)
+    grid = {(cell["max_tables"], cell["max_persons_per_table"]): cell for cell in cells}
+    
+    return render_template(
+        "admin_capacity_planning.html",
+        grid=grid,
+        table_counts=table_counts,
+        seat_counts=seat_counts,
+        tables_min=tables_min,
+        tables_max=tables_max,
+        tables_step=tables_step,
+        seats_min=seats_min,
+        seats_max=seats_max,
+        acceptance=acceptance if acceptance_rate is not None else "",
+        total_persons=sum(personen for _, personen in vereine) + sum(z["personen"] for z in manuell_zuweisungen.values()),
+        group_count=len(vereine) + len(manuell_zuweisungen),
+        max_tables=max_tables,
+        max_persons_per_table=max_persons_per_table
+    )
@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
 from app.models import User, db
+from app.utils.storage_utils import write_transaction
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -27,6 +28,7 @@ def logout():
 
 @auth_bp.route("/change_password", methods=["GET", "POST"])
 @login_required
+@write_transaction
 def change_password():
     if request.method == "POST":
         new_password = request.form.get("new_password")
@@ -62,6 +64,7 @@ def change_password():
 
 @auth_bp.route("/admin_change_password", methods=["GET", "POST"])
 @login_required
+@write_transaction
 def admin_change_password():
     """
     Route für Administratoren, um ihr Passwort freiwillig zu ändern.
@@ -2,12 +2,14 @@
 Routes for PDF generation and QR code management
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash, send_from_directory, current_app, request
+from flask import Blueprint, redirect, url_for, flash, send_from_directory, current_app, request
 from flask_login import login_required
 from app.models import Invite, db
 from app.utils.pdf_utils import generate_invitation_pdf, generate_all_invitations_pdf, PDF_DIR
 from app.utils.qr_utils import generate_qr
-from app.utils.settings_utils import get_multiple_settings, get_base_url
+from app.utils.settings_utils import get_settings, get_base_url
+from app.utils.stream_utils import STREAM_YIELD_PER, stream_page
+from sqlalchemy import func, select
 import os
 import re
 
@@ -77,12 +79,46 @@ def sanitize_text_for_pdf(text):
     
     return safe_text
 
+# Settings used for the invitation PDFs with their defaults
+PDF_SETTING_DEFAULTS = {
+    "vereins_name": "",
+    "event_name": "",
+    "event_date": "",
+    "event_location": "",
+    "event_time": "",
+    "invite_header": "",
+    "subject_line": "Einladung zum 150 jährigen Feuerwehrfest",
+    "contact_email": "",
+    "contact_address": "",
+    "contact_phone": "",
+    "website": ""
+}
+
+def get_pdf_settings():
+    """Get the settings for the PDF including contact information.
+    
+    Returns:
+        dict: Settings from the cached snapshot with a sanitized invite_header
+    """
+    settings = get_settings().values_for(PDF_SETTING_DEFAULTS)
+    
+    # Sanitize the invite_header to ensure it's safe for PDF generation
+    if settings["invite_header"]:
+        settings["invite_header"] = sanitize_text_for_pdf(settings["invite_header"])
+    return settings
+
 @pdf_bp.route("/", methods=["GET"])
 @login_required
 def index():
     """Show the PDF generation interface"""
-    invites = Invite.query.order_by(Invite.verein).all()
-    return render_template("generate_pdfs.html", invites=invites)
+    total = db.session.scalar(select(func.count(Invite.id)))
+    # Nur die angezeigten Spalten, in Blöcken gelesen, während die Seite gestreamt wird
+    invites = db.session.execute(
+        select(Invite.verein, Invite.token, Invite.plz, Invite.ort)
+        .order_by(Invite.verein)
+        .execution_options(yield_per=STREAM_YIELD_PER)
+    )
+    return stream_page("generate_pdfs.html", invites=invites, total=total)
 
 @pdf_bp.route("/serve/<path:filename>", methods=["GET"])
 @login_required
@@ -102,23 +138,7 @@ def generate_pdf(token):
     invite = Invite.query.filter_by(token=token).first_or_404()
     
     # Get settings for the PDF including contact information
-    settings = get_multiple_settings({
-        "vereins_name": "",
-        "event_name": "",
-        "event_date": "",
-        "event_location": "",
-        "event_time": "",
-        "invite_header": "",
-        "subject_line": "Einladung zum 150 jährigen Feuerwehrfest",
-        "contact_email": "",
-        "contact_address": "",
-        "contact_phone": "",
-        "website": ""
-    })
-    
-    # Sanitize the invite_header to ensure it's safe for PDF generation
-    if "invite_header" in settings and settings["invite_header"]:
-        settings["invite_header"] = sanitize_text_for_pdf(settings["invite_header"])
+    settings = get_pdf_settings()
     
     # Generate the PDF
     pdf_path = generate_invitation_pdf(invite, settings)
@@ -141,23 +161,7 @@ def generate_selected_pdfs():
     selection_type = request.form.get('selection_type')
     
     # Get settings for the PDF including contact information
-    settings = get_multiple_settings({
-        "vereins_name": "",
-        "event_name": "",
-        "event_date": "",
-        "event_location": "",
-        "event_time": "",
-        "invite_header": "",
-        "subject_line": "Einladung zum 150 jährigen Feuerwehrfest",
-        "contact_email": "",
-        "contact_address": "",
-        "contact_phone": "",
-        "website": ""
-    })
-    
-    # Sanitize the invite_header to ensure it's safe for PDF generation
-    if "invite_header" in settings and settings["invite_header"]:
-        settings["invite_header"] = sanitize_text_for_pdf(settings["invite_header"])
+    settings = get_pdf_settings()
     
     if selection_type == 'all':
         # Get all invites
@@ -206,23 +210,7 @@ def generate_all_pdfs():
     invites = Invite.query.order_by(Invite.verein).all()
     
     # Get settings for the PDF including contact information
-    settings = get_multiple_settings({
-        "vereins_name": "",
-        "event_name": "",
-        "event_date": "",
-        "event_location": "",
-        "event_time": "",
-        "invite_header": "",
-        "subject_line": "Einladung zum 150 jährigen Feuerwehrfest",
-        "contact_email": "",
-        "contact_address": "",
-        "contact_phone": "",
-        "website": ""
-    })
-    
-    # Sanitize the invite_header to ensure it's safe for PDF generation
-    if "invite_header" in settings and settings["invite_header"]:
-        settings["invite_header"] = sanitize_text_for_pdf(settings["invite_header"])
+    settings = get_pdf_settings()
     
     # Generate the PDF
     pdf_path = generate_all_invitations_pdf(invites, settings)
@@ -1,193 +1,227 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from app.models import Setting, Invite, Response, TableAssignment, db
-from app.utils.table_utils import assign_all_tables
-from datetime import datetime, timezone
+from flask import Blueprint, render_template, request, redirect, url_for, flash, g, session, current_app, make_response
+from flask_wtf.csrf import generate_csrf
+from werkzeug.http import is_resource_modified
+from app.models import Invite, Response, db
+from app.utils.recompute_utils import mark_layout_dirty
+from app.utils.response_utils import upsert_response
+from app.utils.settings_utils import get_settings
+from app.utils.token_utils import resolve_token
+from app.utils.storage_utils import write_transaction
+from app.utils.event_utils import record_event, response_delta
+from app.utils.stats_utils import apply_stats_delta
+from datetime import date, datetime, timezone
+from sqlalchemy import select
+from functools import lru_cache
+import hashlib
+import time
 
 public_bp = Blueprint("public", __name__)
 
+@lru_cache(maxsize=8)
+def _event_countdown(event_date, today):
+    """Get (days_until_event, formatted event date) for the countdown banner.
+
+    Cached by event date and day, so it is computed once per day.
+    """
+    if event_date is None:
+        return None, None
+    return (event_date - today).days, event_date.strftime("%d.%m.%Y")
+
+def get_public_settings():
+    """Get the settings snapshot for the current request.
+
+    Why: Guests hit the public pages far more often than admins hit
+    anything. The cached snapshot is looked up once per request and kept
+    on flask.g for all helpers of that request.
+    """
+    if "public_settings" not in g:
+        g.public_settings = get_settings()
+    return g.public_settings
+
+def get_event_context():
+    """Get the template values shared by all public pages (name, countdown)."""
+    if "event_context" not in g:
+        settings = get_public_settings()
+        days_until_event, event_date_formatted = _event_countdown(settings.event_date, date.today())
+        g.event_context = {
+            "vereins_name": settings.get("vereins_name", ""),
+            "event_name": settings.get("event_name", ""),
+            "days_until_event": days_until_event,
+            "event_date": event_date_formatted,
+        }
+    return g.event_context
+
+def _csrf_state():
+    """Identify the CSRF token a rendered page would contain.
+
+    The token is bound to the session and signed with a timestamp, so a
+    cached page must not outlive half of WTF_CSRF_TIME_LIMIT.
+    """
+    generate_csrf()  # Creates the session token on the first visit, like rendering would
+    raw_token = session.get(current_app.config.get("WTF_CSRF_FIELD_NAME", "csrf_token"), "")
+    time_limit = current_app.config.get("WTF_CSRF_TIME_LIMIT", 3600)
+    bucket = int(time.time() // max(1, time_limit // 2)) if time_limit else 0
+    return hashlib.sha256(raw_token.encode()).hexdigest()[:16], bucket
+
+def _conditional_page(render, etag_parts=(), last_modified=None):
+    """Render a page or answer 304 Not Modified if the browser copy is current.
+
+    Why: Guests reload their pages repeatedly. The ETag is derived from the
+    given row versions, the settings version, the day (countdown) and the
+    CSRF token, so an unchanged page is confirmed without rendering it.
+    Pages showing flash messages are never cached. Last-Modified is only
+    informational, 304 is decided by the ETag alone because settings
+    changes carry no timestamp.
+
+    Args:
+        render: Callable returning the rendered page
+        etag_parts: Values identifying the page content
+        last_modified: Last change of the shown data (datetime) or None
+    """
+    if session.get("_flashes"):
+        response = make_response(render())
+        response.cache_control.no_store = True
+        return response
+
+    parts = (*etag_parts, get_public_settings().version, date.today().isoformat(), *_csrf_state())
+    etag = hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+    if is_resource_modified(request.environ, etag=etag):
+        response = make_response(render())
+    else:
+        response = make_response("", 304)
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Contains the session's CSRF token: only the browser may cache, after revalidating
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add("Cookie")
+    return response
+
+def _cacheable_page(html):
+    """Let browsers and proxies cache a static public page."""
+    response = make_response(html)
+    if not session.get("_flashes"):
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config.get("PUBLIC_CACHE_SECONDS", 300)
+    return response
+
 @public_bp.route("/")
 def index():
-    # Get settings for the view
-    vereins_name_setting = Setting.query.filter_by(key="vereins_name").first()
-    event_name_setting = Setting.query.filter_by(key="event_name").first()
-    event_date_setting = Setting.query.filter_by(key="event_date").first()
-    
-    # Calculate days until event for countdown
-    days_until_event = None
-    event_date_formatted = None
-    if event_date_setting and event_date_setting.value:
-        try:
-            event_date = datetime.strptime(event_date_setting.value, "%Y-%m-%d").date()
-            today = datetime.now().date()
-            days_until_event = (event_date - today).days
-            event_date_formatted = event_date.strftime("%d.%m.%Y")
-        except (ValueError, TypeError):
-            # Falls das Datumsformat nicht korrekt ist, ignorieren
-            pass
-            
-    return render_template(
-        "public_token_input.html",
-        vereins_name=vereins_name_setting.value if vereins_name_setting else "",
-        event_name=event_name_setting.value if event_name_setting else "",
-        days_until_event=days_until_event,
-        event_date=event_date_formatted
-    )
+    return _conditional_page(lambda: render_template("public_token_input.html", **get_event_context()))
+
+def _unknown_token():
+    flash("Uuupsii! Diesen Token kennen wir nicht. Bitte überprüfe deine Eingabe.", "danger")
+    return redirect(url_for("public.index"))
 
 @public_bp.route("/find", methods=["POST"])
 def find_token():
     token = request.form.get("token")
-    if token:
-        return redirect(url_for("public.respond", token=token))
-    flash("Bitte einen gültigen Token eingeben.", "danger")
-    return redirect(url_for("public.index"))
+    if not token:
+        flash("Bitte einen gültigen Token eingeben.", "danger")
+        return redirect(url_for("public.index"))
+    invite = resolve_token(token)
+    if invite is None:
+        return _unknown_token()
+    # Direkt die Antwortseite zeigen, ohne Umweg über eine Weiterleitung
+    return _respond_page(*invite)
+
+def _respond_page(token, invite_id):
+    """Render the respond page, or 304 if the guest's copy is unchanged.
+
+    Invite and response are read with one projected query by primary
+    key; the page is only rendered when the ETag does not match.
+    """
+    row = db.session.query(
+        Invite.id, Invite.verein,
+        Response.id.label("response_id"), Response.attending, Response.persons, Response.timestamp
+    ).outerjoin(Response, Response.invite_id == Invite.id).filter(Invite.id == invite_id).first()
+    if row is None:
+        # Gerade von einem anderen Worker gelöscht
+        return _unknown_token()
+
+    # Übergabe der vorhandenen Antwort an das Template
+    def render():
+        return render_template(
+            "public_invite_respond.html",
+            invite=row,
+            invite_header=get_public_settings().get("invite_header", "Einladung"),
+            response=row if row.response_id is not None else None,
+            gast_name=row.verein,
+            token=token,
+            **get_event_context()
+        )
+
+    last_modified = row.timestamp.replace(tzinfo=timezone.utc) if row.timestamp else None
+    return _conditional_page(render, tuple(row), last_modified)
 
 @public_bp.route("/respond/<token>", methods=["GET", "POST"])
+@write_transaction
 def respond(token):
     """
     Zeigt die Einladung an und verarbeitet die Rückmeldung.
     """
-    invite = Invite.query.filter_by(token=token).first()
+    # Unbekannte Tokens werden ohne Datenbankabfrage abgewiesen
+    resolved = resolve_token(token)
+    if resolved is None:
+        return _unknown_token()
+    if resolved[0] != token:
+        # Abweichende Schreibweise (z. B. Großbuchstaben): auf den gespeicherten Token umleiten
+        return redirect(url_for("public.respond", token=resolved[0]), code=308)
+
+    if request.method == "GET":
+        return _respond_page(*resolved)
+
+    invite = db.session.get(Invite, resolved[1])
     if not invite:
-        flash("Uuupsii! Diesen Token kennen wir nicht. Bitte überprüfe deine Eingabe.", "danger")
-        return redirect(url_for("public.index"))
+        return _unknown_token()
         
-    # Get settings for the view
-    event_name_setting = Setting.query.filter_by(key="event_name").first()
-    event_date_setting = Setting.query.filter_by(key="event_date").first()
-    
-    # Calculate days until event for countdown
-    days_until_event = None
-    event_date_formatted = None
-    if event_date_setting and event_date_setting.value:
-        try:
-            event_date = datetime.strptime(event_date_setting.value, "%Y-%m-%d").date()
-            today = datetime.now().date()
-            days_until_event = (event_date - today).days
-            event_date_formatted = event_date.strftime("%d.%m.%Y")
-        except (ValueError, TypeError):
-            # Falls das Datumsformat nicht korrekt ist, ignorieren
-            pass
-
-    # Einladungstext aus der Datenbank laden
-    invite_header = Setting.query.filter_by(key="invite_header").first()
-    invite_header_value = invite_header.value if invite_header else "Einladung"
-
-    # Vorhandene Antwort abrufen
-    response = Response.query.filter_by(token=token).first()
-
-    # Alte Werte für den Vergleich speichern
-    old_attending = response.attending if response else None
-    old_persons = response.persons if response else None
-
-    if request.method == "POST":
-        # Verarbeite die Rückmeldung
-        attending = request.form.get("attending")
-        persons = request.form.get("persons", "").strip()
-
-        try:
-            persons = int(persons) if persons else 0
-        except ValueError:
-            persons = 0
-            
-        # Bei "Nein"-Antworten Personenzahl auf 0 setzen
-        if attending == "no":
-            persons = 0
-            
-            # Bei "Nein" auch manuelle Tischzuweisung entfernen
-            if invite.manuell_gesetzt:
-                invite.manuell_gesetzt = False
-                invite.tischnummer = None
-
-        if response:
-            response.attending = attending
-            response.persons = persons
-        else:
-            response = Response(
-                token=token,
-                attending=attending,
-                persons=persons
-            )
-            db.session.add(response)
-            
-        # Änderungen speichern
-        db.session.commit()
-
-        # Tische neu berechnen, wenn sich der Status oder die Personenzahl ändert
-        attending_changed = old_attending != attending if old_attending else True
-        persons_changed = old_persons != persons if old_persons else True
-
-        if attending_changed or persons_changed:
-            assign_all_tables()  # Zentrale Tischvergabe - berücksichtigt Aktivierungsstatus
-
-        flash("Antwort gespeichert. Danke!", "success")
-        return redirect(url_for("public.respond", token=token))
-
-    # Übergabe der vorhandenen Antwort an das Template
-    event_name_setting = Setting.query.filter_by(key="event_name").first()
-    vereins_name_setting = Setting.query.filter_by(key="vereins_name").first()
-    return render_template(
-        "public_invite_respond.html",
-        invite=invite,
-        invite_header=invite_header_value,
-        response=response,
-        event_name=event_name_setting.value if event_name_setting else "",
-        vereins_name=vereins_name_setting.value if vereins_name_setting else "",
-        gast_name=invite.verein,
-        days_until_event=days_until_event,
-        event_date=event_date_formatted
-    )
+    # Verarbeite die Rückmeldung
+    attending = request.form.get("attending")
+    persons = request.form.get("persons", "").strip()
+
+    try:
+        persons = int(persons) if persons else 0
+    except ValueError:
+        persons = 0
+
+    # Bei "Nein"-Antworten Personenzahl auf 0 setzen
+    manuell_entfernt = False
+    if attending == "no":
+        persons = 0
+
+        # Bei "Nein" auch manuelle Tischzuweisung entfernen
+        if invite.manuell_gesetzt:
+            invite.manuell_gesetzt = False
+            invite.tischnummer = None
+            manuell_entfernt = True
+
+    # Bisherige Antwort für die Zählerdifferenz, gelesen unter der Schreibsperre von write_transaction
+    alt = db.session.execute(
+        select(Response.attending, Response.persons).where(Response.invite_id == invite.id)
+    ).first()
+
+    # Ein Statement für Anlegen oder Ändern, liefert ob sich etwas geändert hat
+    changed = upsert_response(invite.id, attending, persons)
+    if changed:
+        # Zähler des Dashboards in derselben Transaktion fortschreiben
+        delta = response_delta(alt, attending, persons)
+        apply_stats_delta(delta)
+        record_event("response", invite_id=invite.id, attending=attending, persons=persons, delta=delta)
+
+    # Tische neu berechnen, wenn sich der Status oder die Personenzahl ändert
+    if changed or manuell_entfernt:
+        mark_layout_dirty(invite.id)  # Nur diese Gruppe neu platzieren - im Hintergrund
+    # Antwort und Markierung für die Neuberechnung in einer Transaktion
+    db.session.commit()
+
+    flash("Antwort gespeichert. Danke!", "success")
+    return redirect(url_for("public.respond", token=token))
 
 @public_bp.route("/impressum")
 def legal_impressum():
-    # Get event info for countdown banner
-    event_name_setting = Setting.query.filter_by(key="event_name").first()
-    event_date_setting = Setting.query.filter_by(key="event_date").first()
-    vereins_name_setting = Setting.query.filter_by(key="vereins_name").first()
-
-    
-    # Calculate days until event for countdown
-    days_until_event = None
-    event_date_formatted = None
-    if event_date_setting and event_date_setting.value:
-        try:
-            event_date = datetime.strptime(event_date_setting.value, "%Y-%m-%d").date()
-            today = datetime.now().date()
-            days_until_event = (event_date - today).days
-            event_date_formatted = event_date.strftime("%d.%m.%Y")
-        except (ValueError, TypeError):
-            pass
-            
-    return render_template(
-        "public_legal_impressum.html",
-        event_name=event_name_setting.value if event_name_setting else "",
-        days_until_event=days_until_event,
-        event_date=event_date_formatted,
-        vereins_name=vereins_name_setting.value if vereins_name_setting else ""
-    )
+    return _cacheable_page(render_template("public_legal_impressum.html", **get_event_context()))
 
 @public_bp.route("/datenschutz")
 def legal_datenschutz():
-    # Get event info for countdown banner
-    event_name_setting = Setting.query.filter_by(key="event_name").first()
-    event_date_setting = Setting.query.filter_by(key="event_date").first()
-    vereins_name_setting = Setting.query.filter_by(key="vereins_name").first()
-    
-    # Calculate days until event for countdown
-    days_until_event = None
-    event_date_formatted = None
-    if event_date_setting and event_date_setting.value:
-        try:
-            event_date = datetime.strptime(event_date_setting.value, "%Y-%m-%d").date()
-            today = datetime.now().date()
-            days_until_event = (event_date - today).days
-            event_date_formatted = event_date.strftime("%d.%m.%Y")
-        except (ValueError, TypeError):
-            pass
-            
-    return render_template(
-        "public_legal_privacy.html",
-        event_name=event_name_setting.value if event_name_setting else "",
-        days_until_event=days_until_event,
-        event_date=event_date_formatted,
-        vereins_name=vereins_name_setting.value if vereins_name_setting else ""
-    )
+    return _cacheable_page(render_template("public_legal_privacy.html", **get_event_context()))
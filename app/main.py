@@ -2,26 +2,24 @@ from app import create_app, db
 from flask import render_template
 from flask_migrate import Migrate
 from app.utils.settings_utils import check_hostname_config
-from app.utils.db_fixes import apply_model_fixes
+from app.utils.db_fixes import prepare_database
 from app.utils.pdf_utils import cleanup_old_pdf_files
+from app.utils.recompute_utils import start_recompute_worker
 import threading
 import time
 
 app = create_app()
 migrate = Migrate(app, db)
 
+# Datenbank-Korrekturen laufen einmal vor dem Start der Worker (gunicorn.conf.py bzw. __main__)
+
 with app.app_context():
-    # Apply database fixes if enabled
-    if app.config.get('DB_AUTO_FIX', True):
-        try:
-            app.logger.info("Attempting to apply database fixes for missing columns...")
-            apply_model_fixes(db, app)
-        except Exception as e:
-            app.logger.error(f"Error applying database fixes: {e}")
-    
     # Überprüfe die Hostnamen-Konfiguration
     check_hostname_config()
 
+# Tischberechnung läuft in jedem Prozess (auch unter gunicorn) im Hintergrund
+start_recompute_worker(app)
+
 # Background thread for periodic PDF cleanup
 def periodic_pdf_cleanup():
     """Run PDF cleanup in a background thread at regular intervals"""
@@ -41,6 +39,8 @@ def periodic_pdf_cleanup():
                 time.sleep(300)  # Sleep on error too
 
 if __name__ == "__main__":
+    prepare_database(app)
+
     # Start the cleanup thread when running directly (not when imported)
     cleanup_thread = threading.Thread(target=periodic_pdf_cleanup)
     cleanup_thread.daemon = True  # Thread will exit when main thread exits
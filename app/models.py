@@ -2,6 +2,8 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from sqlalchemy.orm import validates
+from app.utils.verein_utils import make_verein_key
 
 db = SQLAlchemy()
 
@@ -13,12 +15,14 @@ class Invite(db.Model):
     """
     __tablename__ = "invites"
     id = db.Column(db.Integer, primary_key=True)
-    verein = db.Column(db.String(150), nullable=False)
-    tischnummer = db.Column(db.String(200), nullable=True)
+    verein = db.Column(db.String(150), nullable=False, index=True)
+    # Normalisierter Name für die Duplikatprüfung, wird beim Setzen von verein gepflegt
+    verein_key = db.Column(db.String(150), nullable=False, unique=True, index=True)
+    tischnummer = db.Column(db.Integer, nullable=True)  # Nur bei manueller Zuweisung
     token = db.Column(db.String(64), unique=True, nullable=False)
     link = db.Column(db.String(512), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
-    manuell_gesetzt = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    manuell_gesetzt = db.Column(db.Boolean, default=False, index=True)
     
     # Neue Felder für Kontaktdaten
     ansprechpartner = db.Column(db.String(200), nullable=True)
@@ -33,17 +37,30 @@ class Invite(db.Model):
         # QR code path wird bei Bedarf später gesetzt
         super(Invite, self).__init__(**kwargs)
 
+    @validates("verein")
+    def _set_verein_key(self, key, verein):
+        self.verein_key = make_verein_key(verein)
+        return verein
+
 class Response(db.Model):
     """
     Speichert die Rückmeldungen (Antworten) zu Einladungen.
-    Verknüpft über den Token mit der Invite-Tabelle.
+    Genau eine Antwort pro Einladung, wird mit ihr gelöscht.
     """
     __tablename__ = "responses"
     id = db.Column(db.Integer, primary_key=True)
-    token = db.Column(db.String(64), db.ForeignKey("invites.token"), nullable=False)
+    invite_id = db.Column(db.Integer, db.ForeignKey("invites.id", ondelete="CASCADE"),
+                          nullable=False, unique=True, index=True)
     attending = db.Column(db.String(10), nullable=False)  # "yes" oder "no"
     persons = db.Column(db.Integer, nullable=True)
-    timestamp = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    # Zeitpunkt der letzten Änderung (dient auch als Last-Modified der Antwortseite)
+    timestamp = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
+                          onupdate=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # Zusagen zählen und Gruppen für die Tischberechnung laden
+        db.Index("ix_responses_attending_persons", "attending", "persons"),
+    )
 
 class Setting(db.Model):
     """
@@ -75,8 +92,75 @@ class User(db.Model, UserMixin):
         return check_password_hash(self.password_hash, password)
 
 class TableAssignment(db.Model):
+    """
+    Berechnete Sitzordnung: wie viele Personen einer Einladung an welchem Tisch sitzen.
+    Wird mit der Einladung gelöscht.
+    """
     __tablename__ = "table_assignments"
     id = db.Column(db.Integer, primary_key=True)
     tischnummer = db.Column(db.Integer, nullable=False)
-    verein = db.Column(db.String(150), nullable=False)
+    invite_id = db.Column(db.Integer, db.ForeignKey("invites.id", ondelete="CASCADE"),
+                          nullable=False, index=True)
     personen = db.Column(db.Integer, nullable=False)
+
+class LayoutState(db.Model):
+    """
+    Zustand der Tischberechnung (genau eine Zeile mit id=1).
+    Schreibende Routen markieren die Sitzordnung nur als veraltet,
+    ein Hintergrund-Worker übernimmt über lock_owner/lock_expires die Neuberechnung
+    und erhöht danach die Versionsnummer.
+    """
+    __tablename__ = "layout_state"
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    dirty = db.Column(db.Boolean, nullable=False, default=False)
+    dirty_since = db.Column(db.Float, nullable=True)  # Unix-Zeitstempel der ersten Änderung
+    full_pending = db.Column(db.Boolean, nullable=False, default=False)
+    lock_owner = db.Column(db.String(200), nullable=True)
+    lock_expires = db.Column(db.Float, nullable=True)
+    computed_at = db.Column(db.Float, nullable=True)
+
+class LayoutPending(db.Model):
+    """Einladungen, deren Rückmeldung sich seit der letzten Tischberechnung geändert hat."""
+    __tablename__ = "layout_pending"
+    invite_id = db.Column(db.Integer, primary_key=True)
+
+class VersionStamp(db.Model):
+    """
+    Versionszähler, über den alle Worker-Prozesse Änderungen erkennen
+    (z.B. "settings" nach dem Speichern der Einstellungen).
+    """
+    __tablename__ = "version_stamps"
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class ChangeEvent(db.Model):
+    """
+    Änderungsprotokoll für die Live-Aktualisierung des Dashboards.
+    Die fortlaufende id dient Browsern aller Worker als Cursor (Last-Event-ID),
+    AUTOINCREMENT verhindert, dass nach dem Aufräumen ids erneut vergeben werden.
+    """
+    __tablename__ = "change_events"
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # "response", "invite" oder "layout"
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.Float, nullable=False, index=True)  # Unix-Zeitstempel
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+class DashboardStats(db.Model):
+    """
+    Laufend mitgeführte Kennzahlen des Dashboards (genau eine Zeile mit id=1).
+    Rückmeldungen, Einladungen und die Tischberechnung passen sie in derselben
+    Transaktion an wie die Basistabellen; check_stats.py prüft sie auf Abweichungen.
+    """
+    __tablename__ = "dashboard_stats"
+    id = db.Column(db.Integer, primary_key=True)
+    total_invites = db.Column(db.Integer, nullable=False, default=0)
+    response_count = db.Column(db.Integer, nullable=False, default=0)  # Zusagen
+    total_persons = db.Column(db.Integer, nullable=False, default=0)  # Personen aller Zusagen
+    used_tables = db.Column(db.Integer, nullable=False, default=0)
+    # Gruppe mit den meisten Plätzen in der Sitzordnung
+    top_invite_id = db.Column(db.Integer, db.ForeignKey("invites.id", ondelete="SET NULL"), nullable=True)
+    top_persons = db.Column(db.Integer, nullable=False, default=0)
+    rebuilt_at = db.Column(db.Float, nullable=True)  # Unix-Zeitstempel der letzten Neuberechnung
@@ -2,21 +2,19 @@
 
 function filterTable() {
   const searchInput = document.getElementById("searchInput").value.toLowerCase();
-  const tischFilter = document.getElementById("tischFilter").value;
+  const tischSelect = document.getElementById("tischFilter");
+  // Nur eine konkrete Tischnummer filtert die Tischkarten ("Mit/Ohne Tisch" nicht)
+  const tischFilter = tischSelect && /^\d+$/.test(tischSelect.value) ? tischSelect.value : "";
   
-  // 1. Tabelle filtern
+  // 1. Geladene Zeilen sofort filtern (die Gästeliste selbst filtert der Server)
   const rows = document.querySelectorAll("#invitesTable tbody tr");
   let visibleVereine = new Set(); // Sammlung aller sichtbaren Vereine
   
   rows.forEach((row) => {
     const text = row.textContent.toLowerCase();
-    const tischZelle = row.cells[1].textContent.trim();
-    const verein = row.cells[0].textContent.trim(); // Name des Vereins speichern
+    const verein = row.cells[1].textContent.trim(); // Name des Vereins speichern
     
-    const textMatch = text.includes(searchInput);
-    const tischMatch = !tischFilter || tischZelle.includes(tischFilter);
-    
-    const visible = (textMatch && tischMatch);
+    const visible = text.includes(searchInput);
     row.style.display = visible ? "" : "none";
     
     // Wenn sichtbar, füge Verein zur Liste der sichtbaren Vereine hinzu
@@ -65,72 +63,13 @@ function filterTable() {
   }
 }
 
-// Sortierfunktion für die Tabelle
-document.addEventListener("DOMContentLoaded", function () {
-  // Funktion zum Sortieren der Tabelle
-  function sortTable(sortBy, ascending, headerElement = null) {
-    const table = document.getElementById("invitesTable");
-    const tbody = table.querySelector("tbody");
-    const rows = Array.from(tbody.querySelectorAll("tr"));
-
-    // Alle Sortierklassen entfernen und die richtige setzen
-    document.querySelectorAll(".sortable").forEach((h) => {
-      h.classList.remove("sort-asc", "sort-desc");
-    });
-
-    if (headerElement) {
-      headerElement.classList.add(ascending ? "sort-asc" : "sort-desc");
-    }
-
-    // Zeilen sortieren
-    rows.sort(function (a, b) {
-      let valA, valB;
-
-      if (sortBy === "verein") {
-        valA = a.cells[0].textContent.toLowerCase();
-        valB = b.cells[0].textContent.toLowerCase();
-      } else if (sortBy === "tisch") {
-        const tischA = a.cells[1].textContent;
-        const tischB = b.cells[1].textContent;
-        valA = tischA === "-" ? 9999 : parseInt(tischA) || 9999;
-        valB = tischB === "-" ? 9999 : parseInt(tischB) || 9999;
-      } else if (sortBy === "personen") {
-        valA = parseInt(a.cells[5].textContent) || 0;
-        valB = parseInt(b.cells[5].textContent) || 0;
-      } else if (sortBy === "status") {
-        valA = a.cells[4].textContent;
-        valB = b.cells[4].textContent;
-      }
-
-      if (ascending) {
-        return valA > valB ? 1 : -1;
-      } else {
-        return valA < valB ? 1 : -1;
-      }
-    });
-
-    // Neu sortierte Zeilen einfügen
-    rows.forEach(function (row) {
-      tbody.appendChild(row);
-    });
-  }
+// Sortiert wird serverseitig über die Links in den Spaltenköpfen
 
-  // Standardmäßig nach Vereinsnamen sortieren (aufsteigend)
-  const vereinsHeader = document.querySelector('.sortable[data-sort="verein"]');
-  if (vereinsHeader) {
-    sortTable("verein", true, vereinsHeader);
+// Tischkarten passend zu den aktiven Filtern anzeigen
+document.addEventListener("DOMContentLoaded", function () {
+  if (document.getElementById("searchInput")) {
+    filterTable();
   }
-
-  // Event-Listener für Klicks auf Spaltenüberschriften
-  document.querySelectorAll(".sortable").forEach(function (header) {
-    header.addEventListener("click", function () {
-      const sortBy = this.dataset.sort;
-      // Sortierrichtung umschalten
-      const ascending = !this.classList.contains("sort-asc");
-      sortTable(sortBy, ascending, this);
-
-    });
-  });
 });
 
 // Kopieren-Funktion für Einladungslink
@@ -4,6 +4,7 @@
 
 document.addEventListener('DOMContentLoaded', function() {
   initDashboard();
+  initLiveUpdates();
 });
 
 /**
@@ -11,16 +12,22 @@ document.addEventListener('DOMContentLoaded', function() {
  */
 function initDashboard() {
   const selectAllCheckbox = document.getElementById('selectAll');
-  const inviteCheckboxes = document.querySelectorAll('.invite-checkbox');
+  const tbody = document.querySelector('#invitesTable tbody');
   const pdfExportBtn = document.getElementById('pdfExportBtn');
   const csvExportBtn = document.getElementById('csvExportBtn');
+  const loadMoreBtn = document.getElementById('loadMoreBtn');
+
+  // Checkboxes are looked up on demand, rows are added by "load more"
+  function inviteCheckboxes() {
+    return Array.from(document.querySelectorAll('.invite-checkbox'));
+  }
   
   // Select all checkboxes
   if (selectAllCheckbox) {
     selectAllCheckbox.addEventListener('change', function() {
       const isChecked = this.checked;
       
-      inviteCheckboxes.forEach(checkbox => {
+      inviteCheckboxes().forEach(checkbox => {
         if (checkbox.closest('tr').style.display !== 'none') {
           checkbox.checked = isChecked;
         }
@@ -31,24 +38,27 @@ function initDashboard() {
   }
   
   // When any invite checkbox is clicked
-  inviteCheckboxes.forEach(checkbox => {
-    checkbox.addEventListener('change', function() {
+  if (tbody) {
+    tbody.addEventListener('change', function(event) {
+      if (!event.target.classList.contains('invite-checkbox')) {
+        return;
+      }
       updateButtons();
       
       // Update "select all" checkbox
       if (selectAllCheckbox) {
-        const allVisible = Array.from(inviteCheckboxes)
+        const allVisible = inviteCheckboxes()
           .filter(cb => cb.closest('tr').style.display !== 'none')
           .every(cb => cb.checked);
           
         selectAllCheckbox.checked = allVisible;
       }
     });
-  });
+  }
   
   // Update button states based on checkbox selection
   function updateButtons() {
-    const hasSelectedInvites = Array.from(inviteCheckboxes).some(cb => cb.checked);
+    const hasSelectedInvites = inviteCheckboxes().some(cb => cb.checked);
     if (pdfExportBtn) pdfExportBtn.disabled = !hasSelectedInvites;
     if (csvExportBtn) csvExportBtn.disabled = !hasSelectedInvites;
   }
@@ -68,6 +78,120 @@ function initDashboard() {
       submitExportForm('csv');
     });
   }
+
+  // Load the next page of the invite list without reloading the statistics
+  if (loadMoreBtn && tbody) {
+    loadMoreBtn.addEventListener('click', function() {
+      loadMoreBtn.disabled = true;
+      fetch(loadMoreBtn.dataset.nextUrl, { headers: { 'Accept': 'application/json' } })
+        .then(response => {
+          if (!response.ok) {
+            throw new Error(response.status);
+          }
+          return response.json();
+        })
+        .then(data => {
+          tbody.insertAdjacentHTML('beforeend', data.html);
+          if (selectAllCheckbox) selectAllCheckbox.checked = false;
+          if (typeof filterTable === 'function') filterTable();
+          if (data.next_url) {
+            loadMoreBtn.dataset.nextUrl = data.next_url;
+            loadMoreBtn.disabled = false;
+          } else {
+            loadMoreBtn.parentNode.removeChild(loadMoreBtn);
+          }
+        })
+        .catch(err => {
+          loadMoreBtn.disabled = false;
+          alert('Laden fehlgeschlagen: ' + err.message);
+        });
+    });
+  }
+}
+
+/**
+ * Patch the dashboard with change events from the server (Server-Sent Events).
+ * Counters and visible rows are updated in place; changes that affect the
+ * list order or the table cards only show a notice with a reload link.
+ */
+function initLiveUpdates() {
+  const notice = document.getElementById('liveNotice');
+  if (!notice || !window.EventSource) {
+    return;
+  }
+
+  function showNotice(text) {
+    notice.querySelector('.live-notice-text').textContent = text;
+    notice.classList.remove('hidden');
+  }
+
+  function addToStat(name, delta) {
+    const el = document.querySelector('[data-stat="' + name + '"]');
+    if (el && delta) {
+      el.textContent = (parseInt(el.textContent, 10) || 0) + delta;
+    }
+  }
+
+  function applyDelta(delta) {
+    Object.keys(delta || {}).forEach(name => addToStat(name, delta[name]));
+  }
+
+  function rowField(inviteId, field) {
+    return document.querySelector('tr[data-invite-id="' + inviteId + '"] [data-field="' + field + '"]');
+  }
+
+  function setAttending(inviteId, attending, persons) {
+    const cell = rowField(inviteId, 'attending');
+    if (cell) {
+      const span = document.createElement('span');
+      span.className = attending === 'yes' ? 'text-success-600' : 'text-primary-600';
+      span.textContent = attending === 'yes' ? 'Ja' : 'Nein';
+      cell.replaceChildren(span);
+    }
+    const personsCell = rowField(inviteId, 'persons');
+    if (personsCell) {
+      personsCell.textContent = attending === 'yes' ? persons : '-';
+    }
+  }
+
+  const source = new EventSource(notice.dataset.eventsUrl);
+
+  source.addEventListener('response', function(event) {
+    const data = JSON.parse(event.data);
+    applyDelta(data.delta);
+    setAttending(data.invite_id, data.attending, data.persons);
+  });
+
+  source.addEventListener('invite', function(event) {
+    const data = JSON.parse(event.data);
+    applyDelta(data.delta);
+    if (data.action === 'deleted') {
+      const row = document.querySelector('tr[data-invite-id="' + data.invite_id + '"]');
+      if (row) row.parentNode.removeChild(row);
+    } else if (data.action === 'updated') {
+      const vereinCell = rowField(data.invite_id, 'verein');
+      if (vereinCell && data.verein) vereinCell.textContent = data.verein;
+      const tischCell = rowField(data.invite_id, 'tisch');
+      if (tischCell && data.manuell) tischCell.textContent = data.tischnummer + ' (manuell)';
+    } else {
+      showNotice('Neue Einladungen vorhanden.');
+    }
+  });
+
+  source.addEventListener('layout', function(event) {
+    const data = JSON.parse(event.data);
+    const stat = document.querySelector('[data-stat="used_tables"]');
+    if (stat && data.used_tables !== null) stat.textContent = data.used_tables;
+    const pending = document.getElementById('layoutPending');
+    if (pending) pending.parentNode.removeChild(pending);
+    if (stat) showNotice('Die Sitzordnung wurde neu berechnet.');
+  });
+
+  // Events were pruned while the page was open: patching is no longer possible
+  source.addEventListener('reset', function() {
+    source.close();
+    showNotice('Das Dashboard ist nicht mehr aktuell.');
+  });
 }
 
 /**
@@ -0,0 +1,152 @@
+"""
+Hilfsfunktionen für die Kapazitätsplanung (Tischanzahl × Personen pro Tisch).
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from app.models import Invite, Response, db
+from app.utils.seating_utils import pack_tables
+from app.utils.table_utils import load_seating_groups
+
+# Assumed group size for projected acceptances if nobody has answered yet
+DEFAULT_GROUP_SIZE = 5
+
+# Below this many cells a process pool costs more than it saves
+MIN_CELLS_FOR_POOL = 16
+
+# Upper bound for the processes of the shared pool, whatever the CPU count
+MAX_POOL_PROCESSES = 4
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def project_groups(acceptance_rate=None):
+    """Get the groups to plan for.
+
+    Why: Before the RSVP deadline most invites are still unanswered. With
+    an acceptance rate the unanswered invites are projected as attending
+    with the average group size of the current acceptances.
+
+    Args:
+        acceptance_rate: Share (0..1) of unanswered invites expected to
+            accept, or None to only use the current responses
+
+    Returns:
+        tuple: (manuell_zuweisungen, vereine) like load_seating_groups()
+    """
+    manuell_zuweisungen, vereine = load_seating_groups()
+    if not acceptance_rate:
+        return manuell_zuweisungen, vereine
+
+    groessen = [personen for _, personen in vereine]
+    groessen += [z['personen'] for z in manuell_zuweisungen.values() if z['personen']]
+    groesse = round(sum(groessen) / len(groessen)) if groessen else DEFAULT_GROUP_SIZE
+
+    offen = db.session.query(Invite.id).outerjoin(
+        Response, Response.invite_id == Invite.id
+    ).filter(
+        Response.id.is_(None), Invite.manuell_gesetzt.isnot(True)
+    ).order_by(Invite.id).all()
+    anzahl = round(min(max(acceptance_rate, 0), 1) * len(offen))
+    return manuell_zuweisungen, vereine + [(invite_id, groesse) for invite_id, in offen[:anzahl]]
+
+
+def evaluate_cell(manuell_zuweisungen, vereine, max_tables, max_persons_per_table):
+    """Pack the groups for one grid cell and return its key figures."""
+    layout, unplaced = pack_tables(manuell_zuweisungen, vereine, max_tables, max_persons_per_table)
+    summary = layout.summary()
+    return {
+        "max_tables": max_tables,
+        "max_persons_per_table": max_persons_per_table,
+        "tables_used": summary["tables_used"],
+        "split_groups": summary["split_groups"],
+        "seated_persons": summary["seated"],
+        "unplaced_persons": sum(unplaced.values()),
+        "utilisation": summary["seated"] / (max_tables * max_persons_per_table) if max_tables else 0,
+        "max_table_used": summary["max_table_used"],
+    }
+
+
+def _get_pool():
+    """Get the process pool of this web worker, created on first use.
+
+    Starting spawn processes costs more than most grids, so the pool is
+    kept for the lifetime of the worker and shared by all requests. Its
+    size is bounded, so concurrent requests queue instead of starting
+    more processes.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn instead of fork: the web worker may run other threads
+            _pool = ProcessPoolExecutor(
+                max_workers=min(os.cpu_count() or 1, MAX_POOL_PROCESSES),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _evaluate_chunk(groups, cells):
+    manuell_zuweisungen, vereine = groups
+    return [evaluate_cell(manuell_zuweisungen, vereine, *cell) for cell in cells]
+
+
+def evaluate_capacity_grid(manuell_zuweisungen, vereine, table_counts, seat_counts, processes=None):
+    """Evaluate the seating plan for every combination of table count and seats.
+
+    Why: Guessing max_tables and max_persons_per_table and then watching
+    the "Not enough tables" warnings takes many recomputes. The greedy
+    packer fills tables from number 1 upwards, so for a given seat count
+    the layout with more tables is identical as long as no table beyond
+    the smaller count was touched. Only the cells below that point are
+    packed individually, in a process pool for large grids.
+
+    Args:
+        manuell_zuweisungen: Manual assignments as returned by load_seating_groups()
+        vereine: List of (verein, personen) for automatic placement
+        table_counts: Iterable of max_tables values
+        seat_counts: Iterable of max_persons_per_table values
+        processes: Number of chunks for the shared pool (default: its size,
+            1 evaluates inline)
+
+    Returns:
+        list: One dict per cell, ordered by seats and then table count
+    """
+    table_counts = sorted(set(table_counts))
+    seat_counts = sorted(set(seat_counts))
+    if not table_counts or not seat_counts:
+        return []
+
+    ergebnisse = {}
+    offen = []
+    groesste = table_counts[-1]
+    manuelle_tische = [z['tischnummer'] for z in manuell_zuweisungen.values() if z['tischnummer'] <= groesste]
+    for seats in seat_counts:
+        basis = evaluate_cell(manuell_zuweisungen, vereine, groesste, seats)
+        grenze = max([basis["max_table_used"]] + manuelle_tische)
+        for tables in table_counts:
+            if tables >= grenze:
+                ergebnisse[(tables, seats)] = dict(
+                    basis,
+                    max_tables=tables,
+                    utilisation=basis["seated_persons"] / (tables * seats),
+                )
+            else:
+                offen.append((tables, seats))
+
+    if processes is None:
+        processes = min(os.cpu_count() or 1, MAX_POOL_PROCESSES)
+    if processes > 1 and len(offen) >= MIN_CELLS_FOR_POOL:
+        # One task per chunk, so the groups are pickled once per chunk and not per cell
+        chunks = [offen[i::processes] for i in range(processes)]
+        groups = (manuell_zuweisungen, vereine)
+        for cells, results in zip(chunks, _get_pool().map(_evaluate_chunk, [groups] * processes, chunks)):
+            ergebnisse.update(zip(cells, results))
+    else:
+        for tables, seats in offen:
+            ergebnisse[(tables, seats)] = evaluate_cell(manuell_zuweisungen, vereine, tables, seats)
+
+    return [ergebnisse[(tables, seats)] for seats in seat_counts for tables in table_counts]
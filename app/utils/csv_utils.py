@@ -9,8 +9,16 @@ import string
 from flask import flash, redirect, url_for, request, Response
 from app.models import Invite, Response as InviteResponse, db
 from app.utils.settings_utils import get_base_url
+from app.utils.verein_utils import make_verein_key
+from app.utils.token_utils import mark_invites_changed
+from app.utils.event_utils import record_event
+from app.utils.stats_utils import apply_stats_delta
+from sqlalchemy import select
 from datetime import datetime
 
+# Maximale Anzahl gebundener Parameter pro IN-Abfrage bei der Duplikatprüfung
+KEY_LOOKUP_CHUNK = 500
+
 def validate_csv_file(csv_file):
     """
     Validates that the uploaded file is a valid CSV file.
@@ -114,9 +122,6 @@ def process_csv_import(content, dialect, has_header, base_url):
     imported_count = 0
     duplicate_count = 0
     
-    # Bestehende Vereine in der Datenbank abrufen (als Set für schnellere Suche)
-    existing_vereine = {invite.verein.lower() for invite in Invite.query.all()}
-    
     # Überspringe Header, wenn vorhanden
     first_row = None
     if has_header:
@@ -152,6 +157,7 @@ def process_csv_import(content, dialect, has_header, base_url):
             elif header_lower in ['email', 'e-mail', 'mail']:
                 column_indices['email'] = i
     
+    rows = []
     for row in csv_data:
         if not row or len(row) <= column_indices['verein']:  # Überspringe leere oder unvollständige Zeilen
             continue
@@ -161,19 +167,25 @@ def process_csv_import(content, dialect, has_header, base_url):
         
         if not verein:  # Überspringe leere Namen
             continue
-        
+        rows.append((verein, row))
+    
+    # Nur die Vereine der Datei in der Datenbank nachschlagen (indizierte IN-Abfrage statt aller Einladungen)
+    existing_vereine = find_existing_verein_keys(make_verein_key(verein) for verein, _ in rows)
+    
+    for verein, row in rows:
         # Begrenze die Anzahl der Importe
         if imported_count >= max_imports:
             flash(f"Import auf {max_imports} Einträge begrenzt. Bitte teilen Sie größere Dateien auf.", "warning")
             break
         
-        # Prüfe, ob der Verein bereits existiert (case-insensitive Prüfung)
-        if verein.lower() in existing_vereine:
+        # Prüfe, ob der Verein bereits existiert (normalisierter Name, auch innerhalb der Datei)
+        verein_key = make_verein_key(verein)
+        if verein_key in existing_vereine:
             duplicate_count += 1
             continue
             
         # Verein zur Liste der existierenden Vereine hinzufügen
-        existing_vereine.add(verein.lower())
+        existing_vereine.add(verein_key)
             
         # Generiere einen einzigartigen Token
         token = generate_unique_token()
@@ -206,6 +218,10 @@ def process_csv_import(content, dialect, has_header, base_url):
         # We no longer generate QR codes here - they will be generated on-demand when creating PDFs
         imported_count += 1
     
+    if imported_count:
+        mark_invites_changed()
+        apply_stats_delta({"total_invites": imported_count})
+        record_event("invite", action="imported", count=imported_count, delta={"total_invites": imported_count})
     db.session.commit()
     
     # Wenn doppelte Einträge gefunden wurden, Information anzeigen
@@ -215,6 +231,24 @@ def process_csv_import(content, dialect, has_header, base_url):
     return imported_count
 
 
+def find_existing_verein_keys(keys):
+    """
+    Ermittelt, welche normalisierten Vereinsnamen bereits existieren.
+    
+    Args:
+        keys: Iterable normalisierter Namen (siehe make_verein_key)
+        
+    Returns:
+        set: Die bereits vergebenen Schlüssel
+    """
+    keys = list(set(keys))
+    existing = set()
+    for start in range(0, len(keys), KEY_LOOKUP_CHUNK):
+        chunk = keys[start:start + KEY_LOOKUP_CHUNK]
+        existing.update(db.session.scalars(select(Invite.verein_key).where(Invite.verein_key.in_(chunk))))
+    return existing
+
+
 def get_value_from_row(row, indices, field):
     """
     Hilfsfunktion, um einen Wert aus einer Zeile zu extrahieren,
@@ -249,7 +283,7 @@ def generate_all_invites_csv(invites, responses, get_full_link_func):
     
     Args:
         invites: Liste aller Einladungen
-        responses: Dictionary mit Token als Schlüssel und Response-Objekt als Wert
+        responses: Dictionary mit Invite-ID als Schlüssel und Response-Objekt als Wert
         get_full_link_func: Funktion, die einen vollen URL-Link für eine Einladung erzeugt
         
     Returns:
@@ -269,7 +303,7 @@ def generate_all_invites_csv(invites, responses, get_full_link_func):
     sorted_invites = sorted(invites, key=lambda x: x.verein.lower())
     
     for invite in sorted_invites:
-        res = responses.get(invite.token)
+        res = responses.get(invite.id)
         full_link = get_full_link_func(invite.token)
         
         writer.writerow([
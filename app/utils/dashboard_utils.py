@@ -0,0 +1,225 @@
+"""
+Hilfsfunktionen für die Daten des Admin-Dashboards (Kennzahlen, Gästeliste, Tischbelegung).
+"""
+
+import base64
+import json
+from sqlalchemy import and_, case, func, or_, select, tuple_
+from app.models import Invite, Response, TableAssignment, db
+from app.utils.stats_utils import load_stats
+from app.utils.stream_utils import STREAM_YIELD_PER
+
+
+def get_dashboard_stats(enable_tables):
+    """Get all dashboard figures.
+
+    Why: Counting responses and grouping the seating plan on every view
+    scanned responses and table_assignments. The figures are maintained
+    incrementally by the write paths (see app/utils/stats_utils.py), so
+    the dashboard reads a single row.
+
+    Args:
+        enable_tables: Whether table figures (used tables, top group) are needed
+
+    Returns:
+        dict: total_invites, response_count, total_persons, used_tables,
+        top_verein and top_persons
+    """
+    stats = load_stats()
+    if not enable_tables or stats["top_verein"] is None:
+        stats.update(top_verein="-", top_persons=0)
+    if not enable_tables:
+        stats["used_tables"] = 0
+    del stats["top_invite_id"]
+    return stats
+
+
+# Sortierbare Spalten der Gästeliste (Parameter "sort")
+INVITE_SORTS = ("verein", "status", "personen", "tisch")
+
+# Filter der Gästeliste nach Rückmeldung (Parameter "status")
+INVITE_STATUS_FILTERS = ("answered", "unanswered", "attending", "declined")
+
+# Obergrenze für den Parameter "limit" der Gästeliste
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(value, invite_id):
+    """Encode the sort value and id of the last row of a page as an opaque cursor."""
+    raw = json.dumps([value, invite_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Decode a cursor from encode_cursor().
+
+    Raises:
+        ValueError: If the cursor was not created by encode_cursor()
+    """
+    try:
+        value, invite_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(invite_id, int) or not isinstance(value, (str, int)):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return value, invite_id
+
+
+def _invite_filters(filters, enable_tables):
+    """Translate the list filters into SQL conditions."""
+    conditions = []
+    status = filters.get("status")
+    if status == "answered":
+        conditions.append(Response.id.isnot(None))
+    elif status == "unanswered":
+        conditions.append(Response.id.is_(None))
+    elif status == "attending":
+        conditions.append(Response.attending == "yes")
+    elif status == "declined":
+        conditions.append(Response.attending == "no")
+
+    tisch = filters.get("tisch")
+    if enable_tables and tisch:
+        zugewiesen = select(TableAssignment.id).where(TableAssignment.invite_id == Invite.id)
+        if tisch == "yes":
+            conditions.append(or_(Invite.tischnummer.isnot(None), zugewiesen.exists()))
+        elif tisch == "no":
+            conditions.append(and_(Invite.tischnummer.is_(None), ~zugewiesen.exists()))
+        elif tisch.isdigit():
+            conditions.append(or_(
+                Invite.tischnummer == int(tisch),
+                zugewiesen.where(TableAssignment.tischnummer == int(tisch)).exists(),
+            ))
+
+    if filters.get("q"):
+        conditions.append(Invite.verein.contains(filters["q"], autoescape=True))
+    if filters.get("ort"):
+        conditions.append(Invite.ort.contains(filters["ort"], autoescape=True))
+    if filters.get("plz"):
+        conditions.append(Invite.plz.startswith(filters["plz"], autoescape=True))
+    return conditions
+
+
+def load_invite_page(enable_tables, filters=None, sort="verein", direction="asc", after=None, limit=100):
+    """Load one page of the invite list with response and tables.
+
+    Why: Rendering every invite made the dashboard grow linearly with the
+    guest list. Pages are read with keyset pagination: the cursor holds
+    the sort value and id of the last row, so the next page starts with
+    an index-backed comparison instead of an OFFSET that reads and
+    discards all previous rows. Filters and sorting run in SQL.
+
+    Args:
+        enable_tables: Whether table numbers are loaded and can be filtered/sorted
+        filters: Dict with optional status (see INVITE_STATUS_FILTERS),
+            tisch ("yes", "no" or a table number), q (name), ort and plz
+        sort: Column of INVITE_SORTS, ties are broken by invite id
+        direction: "asc" or "desc"
+        after: Cursor of the previous page from encode_cursor(), None for the first page
+        limit: Rows per page
+
+    Returns:
+        InvitePage: Yields one dict per invite (invite columns used by the
+        dashboard, attending, persons and tische as "1, 4"); afterwards its
+        next_cursor is the cursor of the next page or None on the last page
+    """
+    tische_query = (
+        select(func.group_concat(TableAssignment.tischnummer))
+        .where(TableAssignment.invite_id == Invite.id)
+        .scalar_subquery()
+    )
+    sort_keys = {
+        "verein": Invite.verein,
+        "status": func.coalesce(Response.attending, ""),
+        "personen": case((Response.attending == "yes", func.coalesce(Response.persons, 0)), else_=0),
+        # Invites without a table come last
+        "tisch": func.coalesce(
+            Invite.tischnummer,
+            select(func.min(TableAssignment.tischnummer))
+            .where(TableAssignment.invite_id == Invite.id)
+            .scalar_subquery(),
+            2 ** 31,
+        ),
+    }
+    if sort not in sort_keys or (sort == "tisch" and not enable_tables):
+        sort = "verein"
+    sort_key = sort_keys[sort].label("sort_key")
+
+    query = select(
+        Invite.id, Invite.verein, Invite.token, Invite.link, Invite.manuell_gesetzt, Invite.tischnummer,
+        Invite.ort, Invite.plz, Response.attending, Response.persons, sort_key,
+    ).outerjoin(Response, Response.invite_id == Invite.id)
+    if enable_tables:
+        query = query.add_columns(tische_query.label("tische"))
+    query = query.where(*_invite_filters(filters or {}, enable_tables))
+
+    descending = direction == "desc"
+    if after is not None:
+        value, invite_id = decode_cursor(after)
+        keyset = tuple_(sort_keys[sort], Invite.id)
+        query = query.where(keyset < tuple_(value, invite_id) if descending else keyset > tuple_(value, invite_id))
+    if descending:
+        query = query.order_by(sort_keys[sort].desc(), Invite.id.desc())
+    else:
+        query = query.order_by(sort_keys[sort], Invite.id)
+
+    result = db.session.execute(query.limit(limit + 1).execution_options(yield_per=STREAM_YIELD_PER))
+    return InvitePage(result, limit)
+
+
+class InvitePage:
+    """One page of the invite list, fetched while it is iterated.
+
+    Why: The dashboard is streamed, so the rows are read in batches
+    (yield_per) while the template renders them instead of being
+    collected in a list first. Whether there is a next page is only known
+    after the last row, which is why next_cursor is filled in by the
+    iteration; the template reads it after the row loop.
+    """
+
+    __slots__ = ("_result", "_limit", "next_cursor")
+
+    def __init__(self, result, limit):
+        self._result = result
+        self._limit = limit
+        self.next_cursor = None
+
+    def __iter__(self):
+        count = 0
+        last = None
+        for row in self._result:
+            if count == self._limit:
+                # One more row than requested: there is a next page
+                self.next_cursor = encode_cursor(last["sort_key"], last["id"])
+                break
+            invite = dict(row._mapping)
+            tische = invite.get("tische")
+            # group_concat has no defined order
+            invite["tische"] = ", ".join(sorted(tische.split(","), key=int)) if tische else ""
+            last = {"sort_key": invite.pop("sort_key"), "id": invite["id"]}
+            count += 1
+            yield invite
+        self._result.close()
+
+
+def load_table_occupancy():
+    """Load the occupancy of every table in one query.
+
+    The seats taken per table are summed by a window function, so the
+    rows come back ready for the template without re-aggregating.
+
+    Returns:
+        dict: {tischnummer (str): {"belegt": persons, "vereine": [(verein, personen), ...]}}
+        ordered by table number
+    """
+    belegt = func.sum(TableAssignment.personen).over(partition_by=TableAssignment.tischnummer)
+    rows = db.session.execute(
+        select(TableAssignment.tischnummer, Invite.verein, TableAssignment.personen, belegt)
+        .join(Invite, Invite.id == TableAssignment.invite_id)
+        .order_by(TableAssignment.tischnummer, TableAssignment.id)
+    )
+    tisch_belegung = {}
+    for tischnummer, verein, personen, summe in rows:
+        tisch = tisch_belegung.setdefault(str(tischnummer), {"belegt": summe, "vereine": []})
+        tisch["vereine"].append((verein, personen))
+    return tisch_belegung
@@ -2,26 +2,48 @@
 This is a temporary file with model fixes to handle missing database columns.
 """
 
+from contextlib import contextmanager
 import sqlalchemy as sa
 from sqlalchemy import inspect
 from flask import current_app
 
-def check_column_exists(engine, table_name, column_name):
+def check_column_exists(connection, table_name, column_name):
     """Check if a column exists in a table"""
     try:
-        insp = inspect(engine)
+        insp = inspect(connection)
         columns = [c['name'] for c in insp.get_columns(table_name)]
         return column_name in columns
     except Exception as e:
         current_app.logger.error(f"Error checking column {column_name}: {e}")
         return False
 
+@contextmanager
+def _exclusive_transaction(engine):
+    """Run a block in one BEGIN EXCLUSIVE transaction on a dedicated connection.
+
+    The driver's own transaction handling is switched off (see
+    storage_utils.configure_storage()), so the DDL of the block commits or
+    rolls back as a whole, and no other process can read or write the
+    database while a table is half converted.
+    """
+    with engine.connect() as connection:
+        connection.connection.driver_connection.execute("BEGIN EXCLUSIVE")
+        # The begin listener sees the running transaction and adds no BEGIN
+        with connection.begin():
+            yield connection
+
+
 def apply_model_fixes(db, app):
-    """Apply fixes to handle missing columns in the database"""
-    with app.app_context():
+    """Apply fixes to handle missing columns in the database.
+
+    All fixes run in a single exclusive transaction, each one in a
+    savepoint so a failing fix is rolled back without losing the others.
+    Every check is made under the lock, so a second process that waited
+    for it finds nothing left to do. Run it once before the workers start
+    (see prepare_database()), not in every worker.
+    """
+    with app.app_context(), _exclusive_transaction(db.engine) as connection:
         # Check if columns exist, if not, add them to the table
-        engine = db.engine
-        
         # List of columns we need to check for in the invites table
         columns_to_check = [
             ('ansprechpartner', sa.String(200)),
@@ -35,11 +57,188 @@ def apply_model_fixes(db, app):
         
         # Check each column and add if missing
         for column_name, column_type in columns_to_check:
-            if not check_column_exists(engine, 'invites', column_name):
+            if not check_column_exists(connection, 'invites', column_name):
                 app.logger.warning(f"Column '{column_name}' is missing, attempting to add it")
                 try:
-                    with engine.begin() as connection:
+                    with connection.begin_nested():
                         connection.execute(sa.text(f"ALTER TABLE invites ADD COLUMN {column_name} {column_type}"))
                     app.logger.info(f"Added column '{column_name}' to invites table")
                 except Exception as e:
                     app.logger.error(f"Failed to add column '{column_name}': {e}")
+
+        migrate_to_invite_ids(connection, app)
+        ensure_verein_keys(connection, app)
+        ensure_lookup_indexes(connection, app)
+
+
+def prepare_database(app):
+    """Bring the database up to date once, before the workers start.
+
+    Called from the gunicorn master (gunicorn.conf.py) and when the app is
+    started directly. The workers then find every table and column in
+    place and do not race each other on the schema.
+    """
+    from app.models import db
+    from app.utils.stats_utils import ensure_stats
+    from app.utils.storage_utils import write_lock
+
+    with app.app_context():
+        if app.config.get('DB_AUTO_FIX', True):
+            app.logger.info("Attempting to apply database fixes for missing columns...")
+            try:
+                apply_model_fixes(db, app)
+            except Exception as e:
+                app.logger.error(f"Error applying database fixes: {e}")
+        # Dashboard counters of databases from before them, built before the first write
+        with write_lock():
+            ensure_stats()
+        # Do not hand the master's connections down to the forked workers
+        db.engine.dispose()
+
+
+def _column_type(connection, table_name, column_name):
+    """Get the declared type of a column or None if it does not exist."""
+    for column in inspect(connection).get_columns(table_name):
+        if column['name'] == column_name:
+            return str(column['type']).upper()
+    return None
+
+
+def _rebuild_table(connection, model, copy_sql):
+    """Recreate a table from its model and copy the old rows over.
+
+    The old table is renamed to <name>_alt, its indexes are dropped so the
+    new table can use the same index names, and it is dropped after the
+    copy_sql (INSERT INTO <name> ... FROM <name>_alt) has run.
+    """
+    name = model.__tablename__
+    connection.execute(sa.text(f"DROP TABLE IF EXISTS {name}_alt"))
+    connection.execute(sa.text(f"ALTER TABLE {name} RENAME TO {name}_alt"))
+    for index in inspect(connection).get_indexes(f"{name}_alt"):
+        connection.execute(sa.text(f"DROP INDEX IF EXISTS {index['name']}"))
+    model.__table__.create(connection)
+    connection.execute(sa.text(copy_sql))
+    connection.execute(sa.text(f"DROP TABLE {name}_alt"))
+
+
+def migrate_to_invite_ids(connection, app):
+    """Link responses and table assignments to invites by integer id.
+
+    Why: Responses used to reference invites by token and table assignments
+    by association name, so renaming an association orphaned its tables and
+    deleting an invite needed manual cleanup. Databases created before the
+    change are converted once (see migration d4a9b2c6e8f1): responses are
+    joined to invites by token (one per invite, lowest id wins like
+    public.respond used to), table assignments by association name, and
+    invites.tischnummer becomes an integer column.
+    """
+    from app.models import LayoutPending, Response, TableAssignment
+
+    try:
+        with connection.begin_nested():
+            tischnummer_type = _column_type(connection, 'invites', 'tischnummer')
+            if tischnummer_type and 'INT' not in tischnummer_type:
+                connection.execute(sa.text("ALTER TABLE invites ADD COLUMN tischnummer_neu INTEGER"))
+                # Only purely numeric values were ever used as table numbers
+                connection.execute(sa.text(
+                    "UPDATE invites SET tischnummer_neu = CAST(tischnummer AS INTEGER) "
+                    "WHERE tischnummer <> '' AND tischnummer NOT GLOB '*[^0-9]*'"
+                ))
+                connection.execute(sa.text("ALTER TABLE invites DROP COLUMN tischnummer"))
+                connection.execute(sa.text("ALTER TABLE invites RENAME COLUMN tischnummer_neu TO tischnummer"))
+                app.logger.info("Converted invites.tischnummer to INTEGER")
+
+            if _column_type(connection, 'responses', 'invite_id') is None:
+                _rebuild_table(connection, Response, (
+                    "INSERT INTO responses (id, invite_id, attending, persons, timestamp) "
+                    "SELECT r.id, i.id, r.attending, r.persons, r.timestamp FROM responses_alt r "
+                    "JOIN invites i ON i.token = r.token "
+                    "WHERE r.id IN (SELECT MIN(id) FROM responses_alt GROUP BY token)"
+                ))
+                app.logger.info("Linked responses to invites by id")
+
+            if _column_type(connection, 'table_assignments', 'invite_id') is None:
+                _rebuild_table(connection, TableAssignment, (
+                    "INSERT INTO table_assignments (id, tischnummer, invite_id, personen) "
+                    "SELECT ta.id, ta.tischnummer, i.id, ta.personen FROM table_assignments_alt ta "
+                    "JOIN invites i ON i.verein = ta.verein"
+                ))
+                app.logger.info("Linked table assignments to invites by id")
+
+            if _column_type(connection, 'layout_pending', 'invite_id') is None:
+                connection.execute(sa.text("DROP TABLE layout_pending"))
+                LayoutPending.__table__.create(connection)
+                # Pending groups are lost, so the next recompute must be a full one
+                connection.execute(sa.text(
+                    "UPDATE layout_state SET dirty = 1, full_pending = 1, "
+                    "dirty_since = COALESCE(dirty_since, 0) WHERE id = 1"
+                ))
+    except Exception as e:
+        app.logger.error(f"Failed to link responses and table assignments by invite id: {e}")
+
+
+def assign_verein_keys(connection, logger):
+    """Fill invites.verein_key for rows that do not have one yet.
+
+    Existing data may already contain names that only differ in case,
+    spacing or umlaut spelling. The oldest invite keeps the plain key, the
+    others get their id appended so the unique index can be created; they
+    are logged so the admin can merge or rename them.
+    """
+    from app.utils.verein_utils import make_verein_key
+
+    vergeben = set(connection.execute(sa.text(
+        "SELECT verein_key FROM invites WHERE verein_key IS NOT NULL"
+    )).scalars())
+    rows = connection.execute(sa.text(
+        "SELECT id, verein FROM invites WHERE verein_key IS NULL ORDER BY id"
+    )).all()
+    updates = []
+    for invite_id, verein in rows:
+        key = make_verein_key(verein)
+        if key in vergeben:
+            logger.warning(f"Invite {invite_id} ('{verein}') duplicates an existing association name")
+            key = f"{key}#{invite_id}"
+        vergeben.add(key)
+        updates.append({"id": invite_id, "key": key})
+    if updates:
+        connection.execute(sa.text("UPDATE invites SET verein_key = :key WHERE id = :id"), updates)
+    return len(updates)
+
+
+def ensure_verein_keys(connection, app):
+    """Add and backfill the normalized association key (see migration e5b8c3d7f2a9)."""
+    try:
+        has_column = check_column_exists(connection, 'invites', 'verein_key')
+        with connection.begin_nested():
+            if not has_column:
+                connection.execute(sa.text("ALTER TABLE invites ADD COLUMN verein_key VARCHAR(150)"))
+            filled = assign_verein_keys(connection, app.logger)
+            connection.execute(sa.text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ix_invites_verein_key ON invites (verein_key)"
+            ))
+            # Replaced by verein_key for the duplicate check
+            connection.execute(sa.text("DROP INDEX IF EXISTS ix_invites_verein_lower"))
+        if filled:
+            app.logger.info(f"Assigned normalized association keys to {filled} invites")
+    except Exception as e:
+        app.logger.error(f"Failed to add normalized association keys: {e}")
+
+
+# Indexes for the hot lookups (see migrations c7d2e5f8a1b6 and d4a9b2c6e8f1)
+LOOKUP_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_invites_verein ON invites (verein)",
+    "CREATE INDEX IF NOT EXISTS ix_invites_manuell_gesetzt ON invites (manuell_gesetzt)",
+    "CREATE INDEX IF NOT EXISTS ix_responses_attending_persons ON responses (attending, persons)",
+    "CREATE INDEX IF NOT EXISTS ix_table_assignments_invite_id ON table_assignments (invite_id)",
+]
+
+
+def ensure_lookup_indexes(connection, app):
+    """Create the indexes for hot lookups on databases created before them."""
+    for statement in LOOKUP_INDEXES:
+        try:
+            with connection.begin_nested():
+                connection.execute(sa.text(statement))
+        except Exception as e:
+            app.logger.error(f"Failed to create index ({statement}): {e}")
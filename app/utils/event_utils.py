@@ -0,0 +1,156 @@
+"""
+Hilfsfunktionen für das Änderungsprotokoll und die Live-Aktualisierung des Dashboards (Server-Sent Events).
+"""
+
+import json
+import time
+from flask import current_app
+from sqlalchemy import delete, func, insert, select
+from app.models import ChangeEvent, db
+
+# Ereignisse, die pro Abfrage des Protokolls höchstens gesendet werden
+EVENT_BATCH_SIZE = 100
+
+# Nach so vielen neuen Ereignissen werden alte aus dem Protokoll gelöscht
+PRUNE_EVERY = 200
+
+
+def record_event(kind, **payload):
+    """Append a change to the change log inside the caller's transaction.
+
+    The event becomes visible when the change commits and disappears
+    with a rollback. SQLite serializes writers, so ids become visible in
+    ascending order. The caller commits.
+
+    Args:
+        kind: "response", "invite" or "layout"
+        **payload: JSON-serializable event data
+
+    Returns:
+        int: ID of the new event
+    """
+    now = time.time()
+    event_id = db.session.execute(
+        insert(ChangeEvent).values(kind=kind, payload=json.dumps(payload, separators=(",", ":")), created_at=now)
+    ).inserted_primary_key[0]
+    if event_id % PRUNE_EVERY == 0:
+        prune_events(now)
+    return event_id
+
+
+def prune_events(now=None, retention=None):
+    """Delete events older than EVENT_RETENTION_SECONDS.
+
+    Browsers that were offline longer than that receive a reset event
+    from read_events() and reload the dashboard.
+    """
+    if retention is None:
+        retention = current_app.config.get("EVENT_RETENTION_SECONDS", 3600)
+    if now is None:
+        now = time.time()
+    db.session.execute(delete(ChangeEvent).where(ChangeEvent.created_at < now - retention))
+
+
+def latest_event_id():
+    """Get the ID of the newest event (0 if the log is empty), the cursor for a freshly rendered page."""
+    return db.session.execute(select(func.max(ChangeEvent.id))).scalar() or 0
+
+
+def read_events(after, limit=EVENT_BATCH_SIZE):
+    """Read the events after a cursor.
+
+    Args:
+        after: ID of the last event the client has seen
+        limit: Maximum number of events
+
+    Returns:
+        list: (id, kind, payload dict) tuples in ascending order. If events
+        after the cursor were already pruned, a single ("reset") event with
+        the newest ID is returned instead, because the client can no longer
+        catch up by patching.
+    """
+    rows = db.session.execute(
+        select(ChangeEvent.id, ChangeEvent.kind, ChangeEvent.payload)
+        .where(ChangeEvent.id > after)
+        .order_by(ChangeEvent.id)
+        .limit(limit)
+    ).all()
+    # Pruning runs right after an insert, so the log is never empty afterwards
+    # and a gap before the first row shows that events were missed
+    if rows and rows[0].id > after + 1:
+        return [(latest_event_id(), "reset", {})]
+    return [(row.id, row.kind, json.loads(row.payload)) for row in rows]
+
+
+def response_delta(old, attending, persons):
+    """Compute how a changed response moves the dashboard counters.
+
+    Args:
+        old: Previous (attending, persons) or None if there was no response
+        attending: New answer ("yes"/"no"), None if the response was removed
+        persons: New number of persons
+
+    Returns:
+        dict: Changes of response_count and total_persons (attending only)
+    """
+    def counted(answer, count):
+        if answer != "yes":
+            return 0, 0
+        return 1, count or 0
+
+    old_zusagen, old_persons = counted(*old) if old else (0, 0)
+    new_zusagen, new_persons = counted(attending, persons)
+    return {"response_count": new_zusagen - old_zusagen, "total_persons": new_persons - old_persons}
+
+
+def format_sse(event_id, kind, payload):
+    """Format one event for a text/event-stream response."""
+    data = json.dumps(payload, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {kind}\ndata: {data}\n\n"
+
+
+def event_stream(after, poll_seconds, lifetime, heartbeat_seconds=15, retry_seconds=None):
+    """Generate the Server-Sent Events of the change log after a cursor.
+
+    Why: Polling the change log reaches the browsers of every worker
+    without a message broker. Each poll ends its read transaction, so WAL
+    shows new commits, and the stream ends after `lifetime` seconds; the
+    browser reconnects with its Last-Event-ID.
+
+    Args:
+        after: ID of the last event the client has seen
+        poll_seconds: Pause between two reads of the change log
+        lifetime: Seconds after which the stream ends
+        heartbeat_seconds: Idle seconds after which a comment line is sent,
+            which keeps proxies from closing the connection and detects
+            disconnected clients
+        retry_seconds: Pause before the browser reconnects (default:
+            poll_seconds, at least one second)
+
+    Yields:
+        str: Formatted events, see format_sse()
+    """
+    # Wartezeit des Browsers vor dem erneuten Verbinden (ms)
+    if retry_seconds is None:
+        retry_seconds = max(poll_seconds, 1)
+    yield f"retry: {int(retry_seconds * 1000)}\n\n"
+    deadline = time.monotonic() + lifetime
+    last_sent = time.monotonic()
+    while True:
+        events = read_events(after)
+        db.session.close()
+        for event_id, kind, payload in events:
+            after = event_id
+            yield format_sse(event_id, kind, payload)
+        now = time.monotonic()
+        if events:
+            last_sent = now
+            if len(events) == EVENT_BATCH_SIZE:
+                # Rückstand sofort weiter abarbeiten
+                continue
+        if now >= deadline:
+            return
+        if now - last_sent >= heartbeat_seconds:
+            yield ": keepalive\n\n"
+            last_sent = now
+        time.sleep(min(poll_seconds, deadline - now))
@@ -3,6 +3,7 @@ import qrcode
 import re
 from app.models import db, Invite
 from app.utils.settings_utils import get_base_url
+from app.utils.storage_utils import write_lock
 import logging
 
 # Logger setup
@@ -73,10 +74,11 @@ def generate_qr(url, path, token, invite_id=None):
     # We no longer save QR code paths in the database by default
     # Only if explicitly requested with invite_id and save_to_db=True
     if invite_id is not None and os.environ.get('SAVE_QR_TO_DB', '').lower() == 'true':
-        invite = Invite.query.get(invite_id)
-        if invite:
-            invite.qr_code_path = rel_path
-            db.session.commit()
+        with write_lock():
+            invite = Invite.query.get(invite_id)
+            if invite:
+                invite.qr_code_path = rel_path
+                db.session.commit()
     
     return rel_path
 
@@ -0,0 +1,195 @@
+"""
+Hilfsfunktionen für die verzögerte Neuberechnung der Tischzuweisung im Hintergrund.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+from flask import after_this_request, current_app, has_request_context
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
+from app.models import DashboardStats, LayoutState, LayoutPending, db
+from app.utils.event_utils import record_event
+from app.utils.settings_utils import check_settings_version
+from app.utils.storage_utils import immediate_transactions, write_lock
+from app.utils.table_utils import assign_all_tables, update_group_tables
+
+logger = logging.getLogger(__name__)
+
+# Above this many changed groups a single full repack is cheaper than incremental updates
+MAX_INCREMENTAL_GROUPS = 20
+
+# A claimed recompute is considered abandoned after this many seconds (e.g. worker killed)
+LOCK_LEASE_SECONDS = 300
+
+_worker_started = False
+
+
+def _ensure_layout_state():
+    """Create the single layout_state row if it does not exist yet."""
+    if db.session.get(LayoutState, 1) is None:
+        try:
+            db.session.add(LayoutState(id=1, version=0, dirty=False, full_pending=False))
+            db.session.commit()
+        except IntegrityError:
+            # Another worker created it at the same time
+            db.session.rollback()
+
+
+def get_layout_state():
+    """Get the current layout state (version, dirty flag).
+
+    Why: The seating plan is computed asynchronously, so pages showing
+    it need to know whether a recompute is still pending.
+    """
+    _ensure_layout_state()
+    return db.session.get(LayoutState, 1)
+
+
+def _bump_layout_version():
+    version = db.session.execute(
+        update(LayoutState)
+        .where(LayoutState.id == 1)
+        .values(version=LayoutState.version + 1, computed_at=time.time())
+        .returning(LayoutState.version)
+    ).scalar()
+    # Dashboards im Browser über die neue Sitzordnung informieren
+    used_tables = db.session.execute(select(DashboardStats.used_tables).where(DashboardStats.id == 1)).scalar()
+    record_event("layout", version=version, used_tables=used_tables)
+    db.session.commit()
+
+
+def mark_layout_dirty(invite_id=None):
+    """Flag the seating plan as outdated inside the caller's transaction.
+
+    Why: Writers must not pay for the recompute on the request thread.
+    The background worker picks up the coalesced changes at most once per
+    TABLE_RECOMPUTE_WINDOW. Without it (e.g. in tests) the change is
+    recomputed right after the request. The caller commits.
+
+    Args:
+        invite_id: ID of the single invite that changed, or None if the
+            whole plan needs to be recomputed
+    """
+    now = time.time()
+    stmt = insert(LayoutState).values(id=1, version=0, dirty=True, dirty_since=now, full_pending=invite_id is None)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[LayoutState.id],
+        set_={
+            "dirty": True,
+            "dirty_since": db.func.coalesce(LayoutState.dirty_since, now),
+            "full_pending": LayoutState.full_pending | stmt.excluded.full_pending,
+        },
+    ))
+    if invite_id is not None:
+        db.session.execute(insert(LayoutPending).values(invite_id=invite_id).on_conflict_do_nothing())
+
+    if not current_app.config.get("TABLE_RECOMPUTE_ASYNC", False) and has_request_context():
+        # Without the worker the request recomputes once the view has committed
+        @after_this_request
+        def recompute(response):
+            with write_lock():
+                run_pending_recompute("request", window=0)
+            return response
+
+
+def run_pending_recompute(owner, window=None, now=None):
+    """Recompute the seating plan if it is dirty and no one else is doing it.
+
+    The claim is a single conditional UPDATE on layout_state, so exactly
+    one process wins and the others see rowcount 0 and skip.
+
+    Args:
+        owner: Identifier of the claiming process
+        window: Debounce window in seconds (defaults to TABLE_RECOMPUTE_WINDOW)
+        now: Current Unix timestamp (for tests)
+
+    Returns:
+        bool: True if a recompute was performed
+    """
+    if window is None:
+        window = current_app.config.get("TABLE_RECOMPUTE_WINDOW", 5)
+    if now is None:
+        now = time.time()
+
+    _ensure_layout_state()
+    claimed = db.session.execute(
+        update(LayoutState)
+        .where(
+            LayoutState.id == 1,
+            LayoutState.dirty.is_(True),
+            LayoutState.dirty_since <= now - window,
+            or_(LayoutState.lock_owner.is_(None), LayoutState.lock_expires < now),
+        )
+        .values(lock_owner=owner, lock_expires=now + LOCK_LEASE_SECONDS)
+    ).rowcount
+    if claimed != 1:
+        db.session.rollback()
+        return False
+
+    # Take over the pending changes in the same transaction as the claim
+    state = db.session.get(LayoutState, 1)
+    full = state.full_pending
+    invite_ids = [p.invite_id for p in LayoutPending.query.all()]
+    LayoutPending.query.delete()
+    state.dirty = False
+    state.dirty_since = None
+    state.full_pending = False
+    db.session.commit()
+
+    try:
+        # Settings may have been changed by another worker
+        check_settings_version()
+        if full or len(invite_ids) > MAX_INCREMENTAL_GROUPS:
+            assign_all_tables()
+        else:
+            for invite_id in invite_ids:
+                update_group_tables(invite_id)
+    except Exception:
+        db.session.rollback()
+        # Retry with a full recompute in the next cycle
+        db.session.execute(
+            update(LayoutState)
+            .where(LayoutState.id == 1)
+            .values(dirty=True, full_pending=True, dirty_since=time.time())
+        )
+        raise
+    finally:
+        db.session.execute(
+            update(LayoutState)
+            .where(LayoutState.id == 1, LayoutState.lock_owner == owner)
+            .values(lock_owner=None, lock_expires=None)
+        )
+        db.session.commit()
+
+    _bump_layout_version()
+    return True
+
+
+def start_recompute_worker(app):
+    """Start the background recompute thread for this process, see run_pending_recompute()."""
+    global _worker_started
+    if _worker_started or not app.config.get("TABLE_RECOMPUTE_ASYNC", False):
+        return None
+    _worker_started = True
+
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    poll_seconds = min(1.0, app.config.get("TABLE_RECOMPUTE_WINDOW", 5))
+
+    def worker():
+        while True:
+            try:
+                # Der Claim ist ein Schreibzugriff: Sperre gleich beim BEGIN holen
+                with app.app_context(), immediate_transactions():
+                    run_pending_recompute(owner)
+            except Exception as e:
+                app.logger.error(f"Error in table recompute worker: {e}")
+            time.sleep(poll_seconds)
+
+    thread = threading.Thread(target=worker, name="table-recompute", daemon=True)
+    thread.start()
+    logger.info(f"Table recompute worker started ({owner})")
+    return thread
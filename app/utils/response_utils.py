@@ -0,0 +1,41 @@
+"""
+Hilfsfunktionen für das Speichern von Rückmeldungen.
+"""
+
+from datetime import datetime, timezone
+from sqlalchemy.dialects.sqlite import insert
+from app.models import Response, db
+
+
+def upsert_response(invite_id, attending, persons):
+    """Insert or update the response of an invite with a single statement.
+
+    Why: Reading the response and then inserting or updating it lets two
+    concurrent submits for the same invite create duplicate rows. With the
+    unique index on responses.invite_id one INSERT ... ON CONFLICT DO UPDATE
+    does both atomically. The update only fires if the answer differs, so
+    the affected row count tells whether anything changed. The caller
+    commits.
+
+    Args:
+        invite_id: ID of the invite
+        attending: "yes" or "no"
+        persons: Number of persons
+
+    Returns:
+        bool: True if a response was created or its answer changed
+    """
+    stmt = insert(Response).values(
+        invite_id=invite_id, attending=attending, persons=persons, timestamp=datetime.now(timezone.utc)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Response.invite_id],
+        set_={
+            "attending": stmt.excluded.attending,
+            "persons": stmt.excluded.persons,
+            "timestamp": stmt.excluded.timestamp,
+        },
+        where=(Response.attending.is_distinct_from(stmt.excluded.attending))
+        | (Response.persons.is_distinct_from(stmt.excluded.persons)),
+    )
+    return db.session.execute(stmt).rowcount > 0
@@ -0,0 +1,448 @@
+"""
+Reine In-Memory-Berechnung der Sitzordnung (ohne Datenbankzugriff).
+"""
+
+import random
+import time
+
+# Groups with at least this many persons are never split into chunks smaller than this
+MIN_GRUPPE = 3
+
+
+class FreeSeatIndex:
+    """Segment tree over table numbers holding the free seats per table.
+
+    Why: Packing thousands of groups onto hundreds of tables must not scan
+    the whole table list for every chunk. The tree stores the maximum free
+    capacity of each subtree, so "first table with at least k free seats"
+    is answered in O(log n). Reserved tables are stored as -1 and are never
+    returned.
+    """
+
+    def __init__(self, frei):
+        self.size = 1
+        while self.size < max(len(frei), 1):
+            self.size *= 2
+        self.tree = [-1] * (2 * self.size)
+        self.tree[self.size:self.size + len(frei)] = frei
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def update(self, index, frei):
+        """Set the free seats of the table at position ``index``."""
+        node = index + self.size
+        self.tree[node] = frei
+        node //= 2
+        while node:
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
+
+    def first_at_least(self, k):
+        """Return the lowest position with at least ``k`` free seats or None."""
+        if self.tree[1] < k:
+            return None
+        node = 1
+        while node < self.size:
+            node = 2 * node if self.tree[2 * node] >= k else 2 * node + 1
+        return node - self.size
+
+
+class SeatingLayout:
+    """In-memory seating plan for one event.
+
+    Why: The packing rules (manual tables, neighbour overflow, MIN_GRUPPE)
+    are needed both for a full recompute and for applying a single group's
+    change to an existing plan. Keeping them in one place without any
+    database access guarantees that both paths produce the same kind of layout.
+    """
+
+    def __init__(self, max_tables, max_persons_per_table):
+        self.max_tables = max_tables
+        self.max_persons = max_persons_per_table
+        # e.g. [{"belegt": 5, "zuweisungen": [(verein, personen), ...], "nummer": 1, "reserviert": False}, ...]
+        self.tische = [
+            {"belegt": 0, "zuweisungen": [], "nummer": i, "reserviert": False}
+            for i in range(1, max_tables + 1)
+        ]
+        # Table numbers whose assignments changed since the layout was built
+        self.geaendert = set()
+        # Set when stored assignments do not fit the current settings
+        self.inkonsistent = False
+        # {verein: {tischnummer, ...}} for removing a group without a full scan
+        self.tische_von = {}
+        self.index = FreeSeatIndex([max_persons_per_table] * max_tables)
+
+    @classmethod
+    def from_assignments(cls, rows, reserved, max_tables, max_persons_per_table):
+        """Rebuild a layout from stored assignments.
+
+        Args:
+            rows: Iterable of (tischnummer, verein, personen) tuples
+            reserved: Table numbers held by manual assignments
+            max_tables: Number of available tables
+            max_persons_per_table: Seats per table
+
+        Returns:
+            SeatingLayout: The layout; ``inkonsistent`` is set if the rows
+            do not fit into the current table settings.
+        """
+        layout = cls(max_tables, max_persons_per_table)
+        for nummer in reserved:
+            tisch = layout.get_tisch(nummer)
+            if tisch is not None:
+                tisch["reserviert"] = True
+        for tischnummer, verein, personen in rows:
+            tisch = layout.get_tisch(tischnummer)
+            if tisch is None:
+                layout.inkonsistent = True
+                continue
+            tisch["zuweisungen"].append((verein, personen))
+            tisch["belegt"] += personen
+            layout.tische_von.setdefault(verein, set()).add(tischnummer)
+            if tisch["belegt"] > max_persons_per_table:
+                layout.inkonsistent = True
+        layout.index = FreeSeatIndex([layout._frei(t) for t in layout.tische])
+        return layout
+
+    def get_tisch(self, nummer):
+        """Return the table dict for a table number or None if out of range."""
+        if 1 <= nummer <= self.max_tables:
+            return self.tische[nummer - 1]
+        return None
+
+    def _frei(self, tisch):
+        return -1 if tisch["reserviert"] else self.max_persons - tisch["belegt"]
+
+    def _aktualisiere(self, tisch):
+        self.index.update(tisch["nummer"] - 1, self._frei(tisch))
+
+    def _setze(self, tisch, verein, personen):
+        tisch["zuweisungen"].append((verein, personen))
+        tisch["belegt"] += personen
+        self.tische_von.setdefault(verein, set()).add(tisch["nummer"])
+        self.geaendert.add(tisch["nummer"])
+        self._aktualisiere(tisch)
+
+    def _reserviere(self, tisch):
+        tisch["reserviert"] = True
+        self.geaendert.add(tisch["nummer"])
+        self._aktualisiere(tisch)
+
+    def _freier_tisch(self):
+        """Return the lowest completely free, non-reserved table or None."""
+        index = self.index.first_at_least(self.max_persons)
+        return None if index is None else self.tische[index]
+
+    def place_manual(self, verein, tischnummer, personen):
+        """Place a group on its manually assigned table (phase 1).
+
+        Groups larger than one table overflow first to the neighbouring
+        tables and then to the next completely free table. All tables used
+        this way are reserved for the group.
+        """
+        tisch = self.get_tisch(tischnummer)
+        if tisch is None:
+            return
+
+        # Mark this table as reserved
+        self._reserviere(tisch)
+        self.tische_von.setdefault(verein, set()).add(tischnummer)
+
+        if personen <= self.max_persons:
+            # Normal assignment if number of persons <= max_persons
+            tisch["belegt"] = personen
+            tisch["zuweisungen"].append((verein, personen))
+            return
+
+        # First fill the main table
+        rest_personen = personen
+        tisch["belegt"] = self.max_persons
+        tisch["zuweisungen"].append((verein, self.max_persons))
+        rest_personen -= self.max_persons
+
+        # Try adjacent tables first (tischnummer-1 or tischnummer+1)
+        for nachbar_nr in (tischnummer - 1, tischnummer + 1):
+            if rest_personen <= 0:
+                break
+            nachbar = self.get_tisch(nachbar_nr)
+            if nachbar is not None and not nachbar["reserviert"] and nachbar["belegt"] == 0:
+                setze = min(self.max_persons, rest_personen)
+                self._setze(nachbar, verein, setze)
+                self._reserviere(nachbar)
+                rest_personen -= setze
+
+        # If there are still persons left, use the next available tables
+        while rest_personen > 0:
+            freier_tisch = self._freier_tisch()
+            if freier_tisch is None:
+                break
+            setze = min(self.max_persons, rest_personen)
+            self._setze(freier_tisch, verein, setze)
+            self._reserviere(freier_tisch)
+            rest_personen -= setze
+
+    def place_on(self, tischnummer, verein, personen):
+        """Put a chunk of a group on a specific non-reserved table."""
+        self._setze(self.tische[tischnummer - 1], verein, personen)
+
+    def place_group(self, verein, personen):
+        """Distribute a group over the non-reserved tables (phase 2).
+
+        Returns:
+            int: Number of persons that could not be placed
+        """
+        if self.max_persons < 1:
+            return personen
+        rest = personen
+        while rest > 0:
+            # A chunk may only be smaller than MIN_GRUPPE if the rest of the group is
+            k = MIN_GRUPPE if rest >= MIN_GRUPPE else 1
+            index = self.index.first_at_least(k)
+            if index is not None:
+                tisch = self.tische[index]
+                setze = min(self.max_persons - tisch["belegt"], rest)
+            else:
+                # If no suitable table was found, look for a completely free table
+                tisch = self._freier_tisch()
+                if tisch is None:
+                    return rest
+                setze = min(self.max_persons, rest)
+            self._setze(tisch, verein, setze)
+            rest -= setze
+        return 0
+
+    def remove_group(self, verein):
+        """Remove all non-reserved assignments of a group.
+
+        Returns:
+            set: Table numbers that were freed up
+        """
+        betroffen = set()
+        for nummer in self.tische_von.pop(verein, set()):
+            tisch = self.tische[nummer - 1]
+            if tisch["reserviert"]:
+                continue
+            tisch["zuweisungen"] = [(v, p) for v, p in tisch["zuweisungen"] if v != verein]
+            tisch["belegt"] = sum(p for _, p in tisch["zuweisungen"])
+            self._aktualisiere(tisch)
+            betroffen.add(nummer)
+        self.geaendert |= betroffen
+        return betroffen
+
+    def assignments(self):
+        """Yield all meaningful assignments as (tischnummer, verein, personen)."""
+        for tisch in self.tische:
+            for verein, personen in tisch["zuweisungen"]:
+                if personen > 0:
+                    yield tisch["nummer"], verein, personen
+
+    def summary(self):
+        """Return key figures of the layout.
+
+        Returns:
+            dict: tables_used, split_groups (groups sitting at more than one
+            table), seated persons and the highest table number in use
+        """
+        tische_je_verein = {}
+        belegte = set()
+        seated = 0
+        for tischnummer, verein, personen in self.assignments():
+            tische_je_verein.setdefault(verein, set()).add(tischnummer)
+            belegte.add(tischnummer)
+            seated += personen
+        return {
+            "tables_used": len(belegte),
+            "split_groups": sum(1 for tische in tische_je_verein.values() if len(tische) > 1),
+            "seated": seated,
+            "max_table_used": max(belegte, default=0),
+        }
+
+    def fragmentation(self):
+        """Return (surplus_tables, lower_bound) for the automatically filled tables.
+
+        Why: Incremental updates only ever append groups to the first
+        fitting table, so over time partially filled tables accumulate.
+        The surplus over the theoretical minimum tells us when a full
+        repack is worth it again.
+        """
+        belegte = [t for t in self.tische if not t["reserviert"] and t["belegt"] > 0]
+        personen = sum(t["belegt"] for t in belegte)
+        untergrenze = -(-personen // self.max_persons)
+        return len(belegte) - untergrenze, untergrenze
+
+    def needs_repack(self, threshold):
+        """Check whether fragmentation exceeds the given relative threshold."""
+        surplus, untergrenze = self.fragmentation()
+        return surplus > max(1, threshold * untergrenze)
+
+
+def pack_tables(manuell_zuweisungen, vereine, max_tables, max_persons_per_table):
+    """Compute a complete seating plan from scratch.
+
+    Args:
+        manuell_zuweisungen: Dict {verein: {'tischnummer': X, 'personen': Y}}
+        vereine: List of (verein, personen) for groups without manual table
+        max_tables: Number of available tables
+        max_persons_per_table: Seats per table
+
+    Returns:
+        tuple: (SeatingLayout, unplaced) where unplaced maps verein to the
+        number of persons that did not fit
+    """
+    layout = SeatingLayout(max_tables, max_persons_per_table)
+
+    # Phase 1: Process manually assigned tables
+    for verein, info in manuell_zuweisungen.items():
+        layout.place_manual(verein, info['tischnummer'], info['personen'])
+
+    # Phase 2: Automatic distribution, larger groups first
+    unplaced = {}
+    for verein, personen in sorted(vereine, key=lambda v: -v[1]):
+        rest = layout.place_group(verein, personen)
+        if rest > 0:
+            unplaced[verein] = rest
+    return layout, unplaced
+
+
+def _score(layout, unplaced):
+    """Lower is better: unplaced persons first, then tables used, then split groups."""
+    summary = layout.summary()
+    return sum(unplaced.values()), summary["tables_used"], summary["split_groups"]
+
+
+def _first_fit(items, kapazitaet):
+    """Pack (personen, verein) items into bins in the given order, first fit."""
+    bins = []
+    index = FreeSeatIndex([kapazitaet] * len(items))
+    for personen, verein in items:
+        b = index.first_at_least(personen)
+        if b == len(bins):
+            bins.append([])
+        bins[b].append((verein, personen))
+        index.update(b, index.tree[index.size + b] - personen)
+    return bins
+
+
+def _best_fit(items, kapazitaet):
+    """Pack (personen, verein) items into bins in the given order, best fit."""
+    bins = []
+    frei_bins = [[] for _ in range(kapazitaet + 1)]  # free seats -> bin numbers
+    for personen, verein in items:
+        b = None
+        for frei in range(personen, kapazitaet + 1):
+            if frei_bins[frei]:
+                b = frei_bins[frei].pop()
+                break
+        if b is None:
+            b, frei = len(bins), kapazitaet
+            bins.append([])
+        bins[b].append((verein, personen))
+        frei_bins[frei - personen].append(b)
+    return bins
+
+
+def _eliminate_bins(bins, kapazitaet):
+    """Try to empty the least filled bins by moving their items into the others."""
+    bins = sorted(bins, key=lambda b: -sum(p for _, p in b))
+    while len(bins) > 1:
+        kandidat = bins[-1]
+        frei = [kapazitaet - sum(p for _, p in b) for b in bins[:-1]]
+        moves = []
+        for verein, personen in sorted(kandidat, key=lambda i: -i[1]):
+            ziel = min((i for i, f in enumerate(frei) if f >= personen), key=lambda i: frei[i], default=None)
+            if ziel is None:
+                return bins
+            frei[ziel] -= personen
+            moves.append((ziel, verein, personen))
+        for ziel, verein, personen in moves:
+            bins[ziel].append((verein, personen))
+        bins.pop()
+    return bins
+
+
+def optimize_tables(manuell_zuweisungen, vereine, max_tables, max_persons_per_table, budget_seconds=1.0, seed=0):
+    """Compute a seating plan that minimises tables used and split groups.
+
+    Why: The greedy first fit splits groups more often than necessary and
+    leaves partially filled tables. Here manual tables are placed exactly
+    like in pack_tables(); groups larger than a table get whole tables
+    and only their remainder is packed. The remaining groups are bin-packed
+    unsplit with first-fit/best-fit decreasing, bin elimination and
+    randomised restarts until the time budget is used up or the lower
+    bound is reached. The greedy result is always one of the candidates,
+    so the returned layout is never worse than pack_tables().
+
+    Args:
+        manuell_zuweisungen: Dict {verein: {'tischnummer': X, 'personen': Y}}
+        vereine: List of (verein, personen) for groups without manual table
+        max_tables: Number of available tables
+        max_persons_per_table: Seats per table
+        budget_seconds: Wall-clock budget for the search
+        seed: Random seed for the restarts
+
+    Returns:
+        tuple: (SeatingLayout, unplaced) like pack_tables()
+    """
+    deadline = time.monotonic() + budget_seconds
+    best = pack_tables(manuell_zuweisungen, vereine, max_tables, max_persons_per_table)
+    best_score = _score(*best)
+    kapazitaet = max_persons_per_table
+    if not vereine or kapazitaet < 1:
+        return best
+
+    # Whole tables for large groups, only the remainder takes part in the bin packing
+    volle_tische = []
+    items = []
+    for verein, personen in sorted(vereine, key=lambda v: -v[1]):
+        volle_tische.extend([verein] * (personen // kapazitaet))
+        if personen % kapazitaet:
+            items.append((personen % kapazitaet, verein))
+    untergrenze = -(-sum(p for p, _ in items) // kapazitaet)
+
+    def build(bins):
+        layout = SeatingLayout(max_tables, max_persons_per_table)
+        for verein, info in manuell_zuweisungen.items():
+            layout.place_manual(verein, info['tischnummer'], info['personen'])
+        freie = [t["nummer"] for t in layout.tische if not t["reserviert"]]
+        rest = {}
+        belegungen = [[(verein, kapazitaet)] for verein in volle_tische]
+        belegungen += sorted(bins, key=lambda b: -sum(p for _, p in b))
+        for tischnummer, belegung in zip(freie, belegungen):
+            for verein, personen in belegung:
+                layout.place_on(tischnummer, verein, personen)
+        for belegung in belegungen[len(freie):]:
+            for verein, personen in belegung:
+                rest[verein] = rest.get(verein, 0) + personen
+        # Not enough tables: split the leftovers into the remaining seats
+        unplaced = {}
+        for verein, personen in sorted(rest.items(), key=lambda r: -r[1]):
+            uebrig = layout.place_group(verein, personen)
+            if uebrig > 0:
+                unplaced[verein] = uebrig
+        return layout, unplaced
+
+    def consider(bins):
+        nonlocal best, best_score
+        bins = _eliminate_bins(bins, kapazitaet)
+        kandidat = build(bins)
+        score = _score(*kandidat)
+        if score < best_score:
+            best, best_score = kandidat, score
+        return len(bins)
+
+    # Deterministic first-fit and best-fit decreasing
+    if consider(_first_fit(items, kapazitaet)) <= untergrenze:
+        return best
+    if consider(_best_fit(items, kapazitaet)) <= untergrenze:
+        return best
+
+    # Randomised restarts: decreasing order with noise on the sizes
+    rnd = random.Random(seed)
+    versuch = 0
+    while time.monotonic() < deadline:
+        versuch += 1
+        reihenfolge = sorted(items, key=lambda i: -(i[0] + rnd.random() * kapazitaet * 0.5))
+        packer = _best_fit if versuch % 2 else _first_fit
+        if consider(packer(reihenfolge, kapazitaet)) <= untergrenze:
+            break
+    return best
@@ -3,26 +3,192 @@ Hilfsfunktionen für die Verwaltung von Anwendungseinstellungen.
 """
 
 import os
-from functools import lru_cache
-from app.models import Setting
+import time
+from datetime import datetime
+from types import MappingProxyType
+from flask import current_app, g
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from app.models import Setting, VersionStamp, db
 
-# Cache settings for 60 seconds to reduce DB queries
-# Why: Settings rarely change but are accessed frequently
-@lru_cache(maxsize=32)
-def get_setting(key, default=None, expire_after=60):
+# Name of the version stamp bumped on every settings change
+SETTINGS_STAMP = "settings"
+
+
+def get_version_stamp(name):
+    """Read a shared version stamp (0 if it was never bumped)."""
+    version = db.session.execute(
+        select(VersionStamp.version).where(VersionStamp.name == name)
+    ).scalar()
+    return version or 0
+
+
+def get_version_stamps(reload=False):
+    """Read all shared version stamps, once per request.
+
+    Why: Several per-worker caches (settings, token index) validate
+    themselves against a stamp on every request. Reading all stamps with
+    one query and keeping them on flask.g costs a single tiny query per
+    request, however many caches are checked.
+
+    Args:
+        reload: Read the stamps again even if this request already has them
+
+    Returns:
+        dict: {name: version}
+    """
+    if reload or "version_stamps" not in g:
+        g.version_stamps = dict(db.session.execute(select(VersionStamp.name, VersionStamp.version)).all())
+    return g.version_stamps
+
+
+def bump_version_stamp(name):
+    """Increment a shared version stamp in the current transaction, the caller commits."""
+    db.session.execute(
+        insert(VersionStamp)
+        .values(name=name, version=1)
+        .on_conflict_do_update(index_elements=[VersionStamp.name], set_={"version": VersionStamp.version + 1})
+    )
+    g.pop("version_stamps", None)
+
+
+class SettingsSnapshot:
+    """Immutable view of the whole settings table at one point in time.
+
+    Why: Request handlers need several settings at once. Loading them
+    key by key costs one query each; the snapshot is filled by a single
+    query and offers typed accessors so callers stop parsing strings.
+    """
+
+    __slots__ = ("_values", "version")
+
+    def __init__(self, values, version=0):
+        object.__setattr__(self, "_values", MappingProxyType(dict(values)))
+        object.__setattr__(self, "version", version)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SettingsSnapshot is immutable")
+
+    @classmethod
+    def load(cls):
+        """Read all settings and the current settings version from the database."""
+        version = get_version_stamp(SETTINGS_STAMP)
+        return cls(db.session.execute(select(Setting.key, Setting.value)).all(), version)
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def get_int(self, key, default):
+        value = self._values.get(key, "")
+        return int(value) if value.isdigit() else default
+
+    def get_bool(self, key, default=False):
+        value = self._values.get(key)
+        return value == "true" if value is not None else default
+
+    def values_for(self, setting_definitions):
+        """Get a new dict with the given keys, using the defaults for missing ones."""
+        return {key: self._values.get(key, default) for key, default in setting_definitions.items()}
+
+    @property
+    def max_tables(self):
+        return self.get_int("max_tables", 90)
+
+    @property
+    def max_persons_per_table(self):
+        return self.get_int("max_persons_per_table", 10)
+
+    @property
+    def enable_tables(self):
+        return self.get_bool("enable_tables")
+
+    @property
+    def event_date(self):
+        """The event date as datetime.date, or None if unset or invalid."""
+        try:
+            return datetime.strptime(self._values.get("event_date", ""), "%Y-%m-%d").date()
+        except ValueError:
+            return None
+
+
+def clear_settings_cache():
+    """Drop this worker's settings cache, the next access reloads it."""
+    current_app.extensions.pop("settings_cache", None)
+
+
+def check_settings_version():
+    """Drop the cached settings if another worker changed them.
+
+    Runs once per request and before each background recompute.
+    """
+    stamps = get_version_stamps(reload=True)
+    cache = current_app.extensions.get("settings_cache")
+    if cache is not None and cache["snapshot"].version != stamps.get(SETTINGS_STAMP, 0):
+        clear_settings_cache()
+
+
+def invalidate_settings():
+    """Mark the settings as changed for all workers.
+
+    Bumps the shared version stamp and commits it together with pending
+    setting changes, then drops this worker's cache.
+    """
+    bump_version_stamp(SETTINGS_STAMP)
+    db.session.commit()
+    clear_settings_cache()
+
+
+def save_settings(values):
+    """Insert or update several settings with a single statement.
+
+    Args:
+        values: Dict mapping setting keys to their new values
+    """
+    if values:
+        stmt = insert(Setting).values([{"key": key, "value": value} for key, value in values.items()])
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[Setting.key], set_={"value": stmt.excluded.value}
+        ))
+    invalidate_settings()
+
+
+def get_settings(expire_after=None):
+    """Get the cached settings snapshot of this worker.
+
+    The cache is dropped by check_settings_version() and reloaded after a
+    TTL at the latest.
+
+    Args:
+        expire_after: Cache-Zeit in Sekunden (Standard: SETTINGS_CACHE_TTL)
+
+    Returns:
+        SettingsSnapshot: The current settings
+    """
+    if expire_after is None:
+        expire_after = current_app.config.get("SETTINGS_CACHE_TTL", 60)
+    cache = current_app.extensions.get("settings_cache")
+    if cache is None or time.monotonic() - cache["loaded_at"] > expire_after:
+        cache = {"snapshot": SettingsSnapshot.load(), "loaded_at": time.monotonic()}
+        current_app.extensions["settings_cache"] = cache
+    return cache["snapshot"]
+
+
+def get_setting(key, default=None, expire_after=None):
     """
     Holt eine Einstellung aus der Datenbank mit Caching.
     
     Args:
         key: Der Schlüssel für die Einstellung
         default: Standardwert, wenn die Einstellung nicht gefunden wird
-        expire_after: Cache-Zeit in Sekunden (nicht verwendet, aber für API-Konsistenz)
+        expire_after: Cache-Zeit in Sekunden (Standard: SETTINGS_CACHE_TTL)
         
     Returns:
         Der Wert der Einstellung oder der Standardwert
     """
-    setting = Setting.query.filter_by(key=key).first()
-    return setting.value if setting else default
+    return get_settings(expire_after).get(key, default)
 
 
 def get_multiple_settings(setting_definitions):
@@ -37,7 +203,7 @@ def get_multiple_settings(setting_definitions):
     Returns:
         Dict containing all requested settings with their values
     """
-    return {key: get_setting(key, default) for key, default in setting_definitions.items()}
+    return get_settings().values_for(setting_definitions)
 
 
 def get_max_tables():
@@ -46,8 +212,7 @@ def get_max_tables():
     Why: This is a frequently accessed value that impacts table assignments
     and validations throughout the application.
     """
-    max_tables_setting = get_setting("max_tables", "90")
-    return int(max_tables_setting) if max_tables_setting.isdigit() else 90
+    return get_settings().max_tables
 
 
 def get_base_url():
@@ -0,0 +1,168 @@
+"""
+Hilfsfunktionen für die laufend mitgeführten Dashboard-Kennzahlen (Zeile dashboard_stats mit id=1).
+"""
+
+import time
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from app.models import DashboardStats, Invite, Response, TableAssignment, db
+from app.utils.storage_utils import require_write_lock
+
+# Zähler, die schreibende Routen per Differenz anpassen
+DELTA_FIELDS = ("total_invites", "response_count", "total_persons")
+
+# Kennzahlen, die die Tischberechnung aus table_assignments übernimmt
+TABLE_FIELDS = ("used_tables", "top_invite_id", "top_persons")
+
+STATS_FIELDS = DELTA_FIELDS + TABLE_FIELDS
+
+
+def _table_stats():
+    """Compute used tables and the group with most seats from table_assignments."""
+    used_tables = db.session.execute(
+        select(func.count(func.distinct(TableAssignment.tischnummer)))
+    ).scalar()
+    personen = func.sum(TableAssignment.personen)
+    top = db.session.execute(
+        select(TableAssignment.invite_id, personen)
+        .group_by(TableAssignment.invite_id)
+        .order_by(personen.desc(), TableAssignment.invite_id)
+        .limit(1)
+    ).first()
+    top_invite_id, top_persons = top if top else (None, 0)
+    return {"used_tables": used_tables, "top_invite_id": top_invite_id, "top_persons": top_persons}
+
+
+def compute_stats():
+    """Compute all counters from the base tables (full scans, for rebuilds and checks only).
+
+    Returns:
+        dict: Value of every field in STATS_FIELDS
+    """
+    zusagen = Response.attending == "yes"
+    totals = db.session.execute(select(
+        select(func.count(Invite.id)).scalar_subquery().label("total_invites"),
+        select(func.count(Response.id)).where(zusagen).scalar_subquery().label("response_count"),
+        select(func.coalesce(func.sum(Response.persons), 0)).where(zusagen).scalar_subquery().label("total_persons"),
+    )).one()
+    return dict(totals._mapping, **_table_stats())
+
+
+def apply_stats_delta(delta):
+    """Add changes to the counters inside the caller's transaction.
+
+    Why: The dashboard used to count responses and sum persons on every
+    view. The write paths already know how a change moves the counters
+    (see response_delta()), so they add that difference to the stats row
+    in the same transaction: both commit or roll back together. The
+    caller must hold the write lock from before it read the old values,
+    otherwise two concurrent changes would both count. If the row does not
+    exist yet, it is built from the base tables, which already contain
+    the change. The caller commits.
+
+    Args:
+        delta: Dict with changes of DELTA_FIELDS, other keys are ignored
+    """
+    require_write_lock()
+    values = {
+        field: getattr(DashboardStats, field) + delta[field]
+        for field in DELTA_FIELDS if delta.get(field)
+    }
+    if values and not _update_stats(values):
+        rebuild_stats()
+
+
+def refresh_table_stats():
+    """Take over used tables and the top group after the seating plan changed.
+
+    These figures depend on the whole seating plan and cannot be moved by
+    a delta, so they are recomputed by the writers of table_assignments
+    (the table recompute and invite deletion), never by the dashboard.
+    The caller holds the write lock and commits.
+    """
+    require_write_lock()
+    if not _update_stats(_table_stats()):
+        rebuild_stats()
+
+
+def _update_stats(values):
+    """Update the stats row, returns False if it does not exist."""
+    return db.session.execute(
+        update(DashboardStats).where(DashboardStats.id == 1).values(**values)
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+
+
+def rebuild_stats():
+    """Recompute the stats row from the base tables and store it.
+
+    Used after bulk loads that bypass the write paths (benchmarks, tests)
+    and to repair drift found by check_stats(). The caller commits.
+
+    Returns:
+        dict: The stored counters
+    """
+    values = compute_stats()
+    stmt = insert(DashboardStats).values(id=1, rebuilt_at=time.time(), **values)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[DashboardStats.id],
+        set_={field: stmt.excluded[field] for field in STATS_FIELDS + ("rebuilt_at",)},
+    ))
+    return values
+
+
+def ensure_stats():
+    """Create the stats row from the base tables if it does not exist yet.
+
+    Runs once at startup (see db_fixes.prepare_database()), so databases
+    from before the counters get their row before the first write.
+    """
+    if db.session.get(DashboardStats, 1) is None:
+        stmt = insert(DashboardStats).values(id=1, rebuilt_at=time.time(), **compute_stats())
+        # Another worker may have created it at the same time
+        db.session.execute(stmt.on_conflict_do_nothing())
+        db.session.commit()
+
+
+def load_stats():
+    """Read the counters with the name of the top group in one primary-key lookup.
+
+    Returns:
+        dict: Fields of STATS_FIELDS plus top_verein (None without a top group)
+    """
+    row = db.session.execute(
+        select(*(getattr(DashboardStats, field) for field in STATS_FIELDS), Invite.verein.label("top_verein"))
+        .outerjoin(Invite, Invite.id == DashboardStats.top_invite_id)
+        .where(DashboardStats.id == 1)
+    ).first()
+    if row is None:
+        ensure_stats()
+        return load_stats()
+    return dict(row._mapping)
+
+
+def check_stats(repair=False):
+    """Compare the stored counters with the base tables.
+
+    Args:
+        repair: Overwrite drifted counters with the recomputed values
+
+    Returns:
+        dict: {field: (stored, actual)} for every drifted field, empty if
+        consistent. A missing row is created and is not drift.
+    """
+    stored = db.session.execute(
+        select(*(getattr(DashboardStats, field) for field in STATS_FIELDS)).where(DashboardStats.id == 1)
+    ).first()
+    if stored is None:
+        ensure_stats()
+        return {}
+    actual = compute_stats()
+    drift = {
+        field: (stored._mapping[field], actual[field])
+        for field in STATS_FIELDS if stored._mapping[field] != actual[field]
+    }
+    if repair and drift:
+        rebuild_stats()
+        db.session.commit()
+    return drift
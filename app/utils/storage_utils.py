@@ -0,0 +1,214 @@
+"""
+Hilfsfunktionen für das SQLite-Speicherprofil (Pragmas und Schreibtransaktionen).
+"""
+
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+# Profile für die Pragmas jeder neuen Verbindung, auswählbar über SQLITE_PROFILE
+STORAGE_PROFILES = {
+    # Pragmas vor Einführung der Profile (SQLite-Standardwerte); Schreiber sperren Leser beim Commit
+    "legacy": {
+        "journal_mode": "delete",
+        "synchronous": "full",
+        "busy_timeout": 5000,
+        "cache_size": -2000,
+        "mmap_size": 0,
+    },
+    # Mehrere gunicorn-Worker: Leser und Schreiber blockieren sich nicht gegenseitig
+    "wal": {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "busy_timeout": 5000,
+        "cache_size": -16000,
+        "mmap_size": 128 * 1024 * 1024,
+    },
+}
+
+SYNCHRONOUS_LEVELS = ["off", "normal", "full", "extra"]
+
+# Pause vor dem ersten erneuten BEGIN IMMEDIATE, verdoppelt sich pro Versuch
+WRITE_RETRY_BACKOFF = 0.05
+
+_begin_immediate = ContextVar("sqlite_begin_immediate", default=False)
+
+
+def get_storage_profile(name, environ):
+    """Build the pragmas of a storage profile with per-pragma overrides.
+
+    Args:
+        name: Key of STORAGE_PROFILES
+        environ: Mapping with optional SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS,
+            SQLITE_BUSY_TIMEOUT, SQLITE_CACHE_SIZE and SQLITE_MMAP_SIZE overrides
+
+    Returns:
+        dict: Pragma values
+    """
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile {name!r}, expected one of {', '.join(STORAGE_PROFILES)}")
+    profile = dict(STORAGE_PROFILES[name])
+    for key in ("journal_mode", "synchronous"):
+        if environ.get(f"SQLITE_{key.upper()}"):
+            profile[key] = environ[f"SQLITE_{key.upper()}"].lower()
+    for key in ("busy_timeout", "cache_size", "mmap_size"):
+        if environ.get(f"SQLITE_{key.upper()}"):
+            profile[key] = int(environ[f"SQLITE_{key.upper()}"])
+    return profile
+
+
+def apply_pragmas(dbapi_connection, profile):
+    """Set the profile's pragmas on a new DBAPI connection."""
+    cursor = dbapi_connection.cursor()
+    # Zuerst, damit auch die Umstellung des Journals auf andere Worker wartet
+    cursor.execute(f"PRAGMA busy_timeout={int(profile['busy_timeout'])}")
+    try:
+        cursor.execute(f"PRAGMA journal_mode={profile['journal_mode']}")
+    except Exception as e:
+        # Wechsel aus WAL heraus braucht exklusiven Zugriff; dann bleibt der bisherige Modus
+        logger.warning(f"Could not set journal_mode={profile['journal_mode']}: {e}")
+    cursor.execute(f"PRAGMA synchronous={profile['synchronous']}")
+    cursor.execute(f"PRAGMA cache_size={int(profile['cache_size'])}")
+    cursor.execute(f"PRAGMA mmap_size={int(profile['mmap_size'])}")
+    # SQLite setzt Fremdschlüssel (ON DELETE CASCADE) nur mit diesem Pragma durch
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def _begin_with_retry(connection, retries):
+    """Start the transaction with BEGIN IMMEDIATE, retrying while the database is locked."""
+    if connection.connection.driver_connection.in_transaction:
+        return
+    for attempt in range(retries + 1):
+        try:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            return
+        except OperationalError as e:
+            if "database is locked" not in str(e.orig) or attempt == retries:
+                raise
+            delay = WRITE_RETRY_BACKOFF * 2 ** attempt
+            logger.warning(f"Database locked, retrying BEGIN IMMEDIATE in {delay:.2f}s")
+            time.sleep(delay * random.uniform(0.5, 1.5))
+
+
+def configure_storage(engine, profile, retries=3):
+    """Apply a storage profile and explicit transactions to every connection of the engine.
+
+    Why: pysqlite only opens a transaction right before INSERT, UPDATE or
+    DELETE, so SELECTs ran outside of it. Every transaction now starts
+    with BEGIN, or BEGIN IMMEDIATE inside write_lock(), whatever the
+    profile; the profile only sets the pragmas.
+
+    Args:
+        engine: SQLAlchemy engine of the app
+        profile: Pragmas from get_storage_profile()
+        retries: Attempts to repeat BEGIN IMMEDIATE after the busy timeout expired
+    """
+    def on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        apply_pragmas(dbapi_connection, profile)
+
+    def on_begin(connection):
+        if _begin_immediate.get():
+            _begin_with_retry(connection, retries)
+        elif not connection.connection.driver_connection.in_transaction:
+            connection.exec_driver_sql("BEGIN")
+
+    event.listen(engine, "connect", on_connect)
+    event.listen(engine, "begin", on_begin)
+
+
+def read_pragmas(engine):
+    """Read the pragmas a connection of the engine actually uses.
+
+    Returns:
+        dict: journal_mode, synchronous, busy_timeout, cache_size, mmap_size, foreign_keys
+    """
+    values = {}
+    with engine.connect() as connection:
+        for pragma in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size", "foreign_keys"):
+            values[pragma] = connection.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+    values["synchronous"] = SYNCHRONOUS_LEVELS[values["synchronous"]]
+    values["foreign_keys"] = bool(values["foreign_keys"])
+    return values
+
+
+def report_storage(app):
+    """Log the effective pragmas at startup and warn if they differ from the profile.
+
+    SQLite silently ignores some settings, e.g. WAL on network file
+    systems or in-memory databases, so the configured values are not
+    proof of what is in effect.
+
+    Returns:
+        dict: Effective pragmas, see read_pragmas()
+    """
+    profile = app.config["SQLITE_STORAGE"]
+    effective = read_pragmas(db.engine)
+    app.logger.info(
+        f"SQLite profile {app.config['SQLITE_PROFILE']}: "
+        + ", ".join(f"{key}={value}" for key, value in effective.items())
+    )
+    if ":memory:" not in app.config["SQLALCHEMY_DATABASE_URI"]:
+        for key, value in effective.items():
+            if key in profile and str(value).lower() != str(profile[key]).lower():
+                app.logger.warning(f"SQLite pragma {key} is {value}, profile requests {profile[key]}")
+    return effective
+
+
+@contextmanager
+def immediate_transactions():
+    """Start all transactions in this block with BEGIN IMMEDIATE."""
+    token = _begin_immediate.set(True)
+    try:
+        yield
+    finally:
+        _begin_immediate.reset(token)
+
+
+@contextmanager
+def write_lock():
+    """Hold the write lock from the first statement of the block.
+
+    Reading first and writing later is only safe if no other worker can
+    write in between. A transaction that is still open is committed, so
+    the block starts a new one with BEGIN IMMEDIATE. Inside another
+    write_lock() the block just joins the running transaction. The block
+    commits.
+    """
+    if _begin_immediate.get():
+        yield
+        return
+    if db.session().in_transaction():
+        db.session.commit()
+    with immediate_transactions():
+        yield
+
+
+def require_write_lock():
+    """Raise if called outside write_lock(), for code that reads and then writes."""
+    if not _begin_immediate.get():
+        raise RuntimeError("This write needs the write lock, see storage_utils.write_lock()")
+
+
+def write_transaction(view):
+    """Decorate a view so its POST requests run inside write_lock().
+
+    GET requests are not affected.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method in ("GET", "HEAD"):
+            return view(*args, **kwargs)
+        with write_lock():
+            return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,53 @@
+"""
+Hilfsfunktionen für gestreamte Seiten (HTML wird in Stücken gesendet, während es entsteht).
+"""
+
+from flask import current_app, get_flashed_messages, stream_template
+from flask_wtf.csrf import generate_csrf
+
+# Bytes, die gesammelt werden, bevor ein Stück an den Browser geht
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# Zeilen, die pro Datenbank-Fetch geholt werden (yield_per)
+STREAM_YIELD_PER = 200
+
+
+def _buffered(chunks, size):
+    """Join Jinja's many small fragments into chunks of about `size` characters."""
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_page(template_name, **context):
+    """Render a template as a streamed response.
+
+    Why: render_template() builds the whole body in memory before the
+    first byte goes out. A streamed template is sent in chunks while its
+    row generators (queries with yield_per) are consumed, so the browser
+    starts painting after the first chunk and worker memory does not grow
+    with the number of rows.
+
+    The session cookie is sent with the headers, before the template runs.
+    The CSRF token and the flashed messages change the session, so both
+    are prepared here and the template reads the cached values.
+
+    Args:
+        template_name: Template to render
+        **context: Template variables, iterables are consumed while streaming
+
+    Returns:
+        Response: Streamed text/html response
+    """
+    generate_csrf()
+    get_flashed_messages(with_categories=True)
+    chunks = _buffered(stream_template(template_name, **context), STREAM_CHUNK_SIZE)
+    return current_app.response_class(chunks, mimetype="text/html")
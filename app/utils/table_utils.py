@@ -2,21 +2,67 @@
 Hilfsfunktionen für die Verwaltung von Tischen und Tischzuweisungen.
 """
 
+from flask import current_app
+from sqlalchemy import bindparam, exists, insert, select, union, update
 from app.models import Invite, TableAssignment, Response, db
-from app.utils.settings_utils import get_setting
+from app.utils.settings_utils import get_settings
+from app.utils.stats_utils import refresh_table_stats
+from app.utils.storage_utils import write_lock
+from app.utils.seating_utils import SeatingLayout, pack_tables, optimize_tables
 
-def get_blocked_tischnummern():
+def _belegte_tische_query(exclude_invite_id=None):
+    """Build a SQL UNION of all occupied table numbers."""
+    manuell = select(Invite.tischnummer).where(Invite.tischnummer.isnot(None))
+    zugewiesen = select(TableAssignment.tischnummer)
+    if exclude_invite_id is not None:
+        manuell = manuell.where(Invite.id != exclude_invite_id)
+        zugewiesen = zugewiesen.where(TableAssignment.invite_id != exclude_invite_id)
+    return union(manuell, zugewiesen)
+
+
+def get_blocked_tischnummern(exclude_invite_id=None):
     """Get all currently occupied table numbers.
     
     Why: We need to track all assigned table numbers to prevent duplicates,
-    both from manual assignments and automatic distribution.
+    both from manual assignments and automatic distribution. The database
+    computes the distinct numbers, so only one integer column is fetched
+    instead of every invite and assignment row.
+
+    Args:
+        exclude_invite_id: Invite whose own tables should not count as occupied
+
+    Returns:
+        set: Occupied table numbers as int
+    """
+    return set(db.session.execute(_belegte_tische_query(exclude_invite_id)).scalars())
+
+
+def get_occupancy_bitmap(blocked=None):
+    """Get the occupied tables as an integer bitmap (bit n = table n taken).
+
+    Args:
+        blocked: Iterable of occupied table numbers, read from the database if None
     """
-    invites = Invite.query.all()
-    # First collect manually assigned tables from invites
-    blocked = set(int(i.tischnummer) for i in invites if i.tischnummer and i.tischnummer.isdigit())
-    # Then add tables from automatic assignments
-    blocked |= set(int(t.tischnummer) for t in TableAssignment.query.all() if str(t.tischnummer).isdigit())
-    return blocked
+    if blocked is None:
+        blocked = get_blocked_tischnummern()
+    bitmap = 0
+    for tischnummer in blocked:
+        if tischnummer > 0:
+            bitmap |= 1 << tischnummer
+    return bitmap
+
+
+def is_tisch_belegt(tischnummer, exclude_invite_id=None):
+    """Check whether a single table is occupied using an EXISTS query.
+
+    Args:
+        tischnummer: Table number to check
+        exclude_invite_id: Invite whose own tables should not count as occupied
+    """
+    belegt = _belegte_tische_query(exclude_invite_id).subquery()
+    return db.session.execute(
+        select(exists().where(belegt.c.tischnummer == int(tischnummer)))
+    ).scalar()
 
 
 def get_next_free_tischnummer(blocked, max_tables):
@@ -24,27 +70,168 @@ def get_next_free_tischnummer(blocked, max_tables):
     
     Why: When creating new invites or resetting table assignments,
     we need to find the lowest available table number to ensure efficient
-    use of available tables.
+    use of available tables. With the occupancy bitmap the lowest free
+    table is the lowest zero bit, found without probing every number.
+
+    Args:
+        blocked: Set of occupied table numbers or a bitmap from get_occupancy_bitmap()
+        max_tables: Highest table number available
     """
-    for i in range(1, max_tables + 1):
-        if i not in blocked:
-            return str(i)
+    bitmap = blocked if isinstance(blocked, int) else get_occupancy_bitmap(blocked)
+    bitmap |= 1  # There is no table 0
+    frei = (~bitmap & (bitmap + 1)).bit_length() - 1
+    if frei <= max_tables:
+        return str(frei)
     return "1"  # Fallback if all tables are taken
 
 
 def build_verein_tische_map():
-    """Create a mapping of associations to their assigned tables.
+    """Create a mapping of invites to their assigned tables.
     
     Why: This centralized function creates a consistent representation of
     table assignments that's used in multiple templates.
+
+    Returns:
+        dict: {invite_id: [tischnummer, ...]} with table numbers as strings
     """
-    table_assignments = TableAssignment.query.all()
     verein_tische = {}
-    for ta in table_assignments:
-        verein_tische.setdefault(ta.verein, []).append(str(ta.tischnummer))
+    rows = db.session.query(TableAssignment.invite_id, TableAssignment.tischnummer).order_by(
+        TableAssignment.tischnummer)
+    for invite_id, tischnummer in rows:
+        verein_tische.setdefault(invite_id, []).append(str(tischnummer))
     return verein_tische
 
 
+def _get_table_config():
+    """Read the table settings used by the seating engine.
+
+    Returns:
+        tuple: (max_tables, max_persons_per_table) or None if table
+        management is disabled
+    """
+    settings = get_settings()
+    if not settings.enable_tables:
+        return None
+    return settings.max_tables, settings.max_persons_per_table
+
+
+def write_assignments(assignments, invite_id=None):
+    """Persist a seating plan by applying only the differences.
+
+    Why: Deleting and re-inserting every row on each recompute rewrites
+    the whole table, bloats the SQLite journal and lets readers briefly
+    see an empty seating plan. Instead the stored rows are compared with
+    the new plan and only inserts, updates and deletes are executed as
+    bulk executemany statements in a single transaction, which holds the
+    write lock from the read on, whoever the caller is.
+
+    Args:
+        assignments: Iterable of (tischnummer, invite_id, personen) tuples
+        invite_id: If given, only this group's rows are compared and written
+
+    Returns:
+        tuple: (inserted, updated, deleted) row counts
+    """
+    # No other worker can change the stored rows between the diff and the bulk update
+    with write_lock():
+        query = db.session.query(
+            TableAssignment.id, TableAssignment.tischnummer, TableAssignment.invite_id, TableAssignment.personen
+        )
+        if invite_id is not None:
+            query = query.filter(TableAssignment.invite_id == invite_id)
+
+        stored = {}
+        deletes = []
+        for row_id, tischnummer, v, personen in query:
+            if (tischnummer, v) in stored:
+                # Duplicate row for the same table and group
+                deletes.append(row_id)
+            else:
+                stored[(tischnummer, v)] = (row_id, personen)
+
+        inserts = []
+        updates = []
+        for tischnummer, v, personen in assignments:
+            alt = stored.pop((tischnummer, v), None)
+            if alt is None:
+                inserts.append({"tischnummer": tischnummer, "invite_id": v, "personen": personen})
+            elif alt[1] != personen:
+                updates.append({"id": alt[0], "personen": personen})
+        deletes.extend(row_id for row_id, _ in stored.values())
+
+        if deletes:
+            table = TableAssignment.__table__
+            db.session.execute(
+                table.delete().where(table.c.id == bindparam("row_id")),
+                [{"row_id": row_id} for row_id in deletes]
+            )
+        if updates:
+            db.session.execute(update(TableAssignment), updates)
+        if inserts:
+            db.session.execute(insert(TableAssignment), inserts)
+        if inserts or updates or deletes:
+            # Belegte Tische und größte Gruppe im Dashboard mit der Sitzordnung fortschreiben
+            refresh_table_stats()
+        db.session.commit()
+    return len(inserts), len(updates), len(deletes)
+
+
+def seating_groups_query():
+    """Build the query for all invites relevant to the seating plan.
+
+    Manually placed invites and attending responses are selected by two
+    index-backed queries combined with UNION, instead of one OR over an
+    outer join that forces a full scan of invites.
+    """
+    columns = (
+        Invite.id, Invite.verein, Invite.tischnummer, Invite.manuell_gesetzt,
+        Response.id, Response.attending, Response.persons
+    )
+    manuell = select(*columns).outerjoin(Response, Response.invite_id == Invite.id).where(
+        Invite.manuell_gesetzt.is_(True)
+    )
+    zusagen = select(*columns).select_from(Response).join(Invite, Invite.id == Response.invite_id).where(
+        Response.attending == "yes", Response.persons > 0
+    )
+    return union(manuell, zusagen)
+
+
+def load_seating_groups():
+    """Load all groups relevant for the seating plan in a single query.
+
+    Why: Looking up the response of every manual invite and the invite of
+    every attending response costs one round trip per group. One joined,
+    column-projected query over invites and responses returns plain tuples
+    that are fed straight into the packer.
+
+    Returns:
+        tuple: (manuell_zuweisungen, vereine) where manuell_zuweisungen maps
+        invite_id to {'tischnummer': X, 'personen': Y} and vereine is a list of
+        (invite_id, personen) for groups without manual table
+    """
+    rows = db.session.execute(seating_groups_query()).all()
+
+    # Map manual assignments to invites, in invite order
+    manuell_ids = set()
+    manuell_zuweisungen = {}  # {invite_id: {'tischnummer': X, 'personen': Y}}
+    for invite_id, verein, tischnummer, manuell, response_id, attending, persons in sorted(
+            (r for r in rows if r[3]), key=lambda r: r[0]):
+        manuell_ids.add(invite_id)
+        if tischnummer is None:
+            continue
+        personen = persons or 0 if attending == "yes" else 0
+        manuell_zuweisungen[invite_id] = {'tischnummer': tischnummer, 'personen': personen}
+
+    # Invites with confirmed attendance but without manual assignment, in response order
+    vereine = [
+        (invite_id, persons)
+        for invite_id, _, _, _, _, attending, persons in sorted(
+            (r for r in rows if r[4] is not None), key=lambda r: r[4])
+        if attending == "yes" and persons and persons > 0 and invite_id not in manuell_ids
+    ]
+    return manuell_zuweisungen, vereine
+
+
 def assign_all_tables():
     """Automatically assign tables to all invites.
     
@@ -53,174 +240,86 @@ def assign_all_tables():
     optimally across available tables.
     """
     # Check if table management is enabled
-    enable_tables = get_setting("enable_tables", "false")
-    if enable_tables != "true":
+    config = _get_table_config()
+    if config is None:
         print("⚠️ Table management is disabled. Skipping table assignment.")
         return
-        
-    MIN_GRUPPE = 3
-    
-    # Get settings from the database
-    max_tables_value = get_setting("max_tables", "90")
-    max_persons_value = get_setting("max_persons_per_table", "10")
-    
-    MAX_TISCHE = int(max_tables_value) if max_tables_value.isdigit() else 90
-    MAX_PERSONS_PER_TABLE = int(max_persons_value) if max_persons_value.isdigit() else 10
+    MAX_TISCHE, MAX_PERSONS_PER_TABLE = config
 
-    # Clear all previous table assignments
-    TableAssignment.query.delete()
-    db.session.commit()
+    manuell_zuweisungen, vereine = load_seating_groups()
 
-    # Collect information about manually assigned tables
-    invites_manuell = Invite.query.filter_by(manuell_gesetzt=True).all()
-    manuell_vereine = {i.verein for i in invites_manuell}
-    manuell_tische = set()  # Set of manually assigned table numbers
-    
-    # Map manual assignments to associations
-    manuell_zuweisungen = {}  # {verein: {'tischnummer': X, 'personen': Y}}
-    
-    for invite in invites_manuell:
-        if invite.tischnummer and invite.tischnummer.isdigit():
-            tischnummer = int(invite.tischnummer)
-            manuell_tische.add(tischnummer)
-            
-            # Find the number of persons for this association
-            response = Response.query.filter_by(token=invite.token, attending="yes").first()
-            personen = response.persons if response else 0
-            
-            manuell_zuweisungen[invite.verein] = {
-                'tischnummer': tischnummer,
-                'personen': personen
-            }
-
-    # Associations with confirmed attendance but without manual assignment
-    responses = Response.query.filter_by(attending="yes").filter(Response.persons > 0).all()
-    vereine = []
-    for r in responses:
-        invite = Invite.query.filter_by(token=r.token).first()
-        if invite and invite.verein not in manuell_vereine:
-            vereine.append({"verein": invite.verein, "personen": r.persons})
-
-    vereine.sort(key=lambda x: -x["personen"])  # Sort by group size (larger groups first)
-
-    # Tables: List with occupied seats and assignments
-    tische = []  # e.g. [{"belegt": 5, "zuweisungen": [(verein, personen), ...], "nummer": 1}, ...]
-
-    # Initialize all tables from 1 to MAX_TISCHE as empty
-    for i in range(1, MAX_TISCHE + 1):
-        tische.append({"belegt": 0, "zuweisungen": [], "nummer": i, "reserviert": False})
-
-    # Phase 1: Process manually assigned tables
-    for verein, info in manuell_zuweisungen.items():
-        tischnummer = info['tischnummer']
-        personen = info['personen']
-        
-        # Find the corresponding table in the list
-        tisch_index = next((i for i, t in enumerate(tische) if t["nummer"] == tischnummer), None)
-        if tisch_index is None:
-            continue
-        
-        # Mark this table as reserved
-        tische[tisch_index]["reserviert"] = True
-        
-        # If there are more persons than MAX_PERSONS_PER_TABLE, look for adjacent tables
-        if personen > MAX_PERSONS_PER_TABLE:
-            rest_personen = personen
-            
-            # First fill the main table
-            platz_auf_haupttisch = min(MAX_PERSONS_PER_TABLE, rest_personen)
-            tische[tisch_index]["belegt"] = platz_auf_haupttisch
-            tische[tisch_index]["zuweisungen"].append((verein, platz_auf_haupttisch))
-            rest_personen -= platz_auf_haupttisch
-            
-            # Now look for adjacent tables
-            if rest_personen > 0:
-                # Try adjacent tables first (tischnummer-1 or tischnummer+1)
-                nachbarn = [tischnummer - 1, tischnummer + 1]
-                for nachbar_nr in nachbarn:
-                    if rest_personen <= 0:
-                        break
-                        
-                    nachbar_index = next((i for i, t in enumerate(tische) if t["nummer"] == nachbar_nr and not t["reserviert"] and t["belegt"] == 0), None)
-                    if nachbar_index is not None:
-                        # Adjacent table found and available
-                        platz_auf_nachbartisch = min(MAX_PERSONS_PER_TABLE, rest_personen)
-                        tische[nachbar_index]["belegt"] = platz_auf_nachbartisch
-                        tische[nachbar_index]["zuweisungen"].append((verein, platz_auf_nachbartisch))
-                        tische[nachbar_index]["reserviert"] = True  # Reserve this table as well
-                        manuell_tische.add(nachbar_nr)  # Add to the list of manually assigned tables
-                        rest_personen -= platz_auf_nachbartisch
-                
-                # If there are still persons left, look for the next available table
-                if rest_personen > 0:
-                    for i, t in enumerate(tische):
-                        if not t["reserviert"] and t["belegt"] == 0:
-                            platz_auf_freiem_tisch = min(MAX_PERSONS_PER_TABLE, rest_personen)
-                            tische[i]["belegt"] = platz_auf_freiem_tisch
-                            tische[i]["zuweisungen"].append((verein, platz_auf_freiem_tisch))
-                            tische[i]["reserviert"] = True
-                            manuell_tische.add(t["nummer"])
-                            rest_personen -= platz_auf_freiem_tisch
-                            if rest_personen <= 0:
-                                break
-        else:
-            # Normal assignment if number of persons <= MAX_PERSONS_PER_TABLE
-            tische[tisch_index]["belegt"] = personen
-            tische[tisch_index]["zuweisungen"].append((verein, personen))
-
-    # Phase 2: Automatic distribution for non-manual assignments
-    for v in vereine:
-        personen = v["personen"]
-        verein_name = v["verein"]
-        rest = personen
-
-        while rest > 0:
-            # Look for a table with enough space that is not reserved
-            gefunden = False
-            for tisch in tische:
-                if tisch["reserviert"]:
-                    continue
-                    
-                frei = MAX_PERSONS_PER_TABLE - tisch["belegt"]
-                if frei > 0:
-                    setze = min(frei, rest)
-                    if setze < MIN_GRUPPE and rest >= MIN_GRUPPE:
-                        continue
-                    tisch["zuweisungen"].append((verein_name, setze))
-                    tisch["belegt"] += setze
-                    rest -= setze
-                    gefunden = True
-                    break
-                    
-            if not gefunden:
-                # If no suitable table was found, look for a completely free table
-                freier_tisch = next((t for t in tische if not t["reserviert"] and t["belegt"] == 0), None)
-                if freier_tisch:
-                    setze = min(MAX_PERSONS_PER_TABLE, rest)
-                    freier_tisch["zuweisungen"].append((verein_name, setze))
-                    freier_tisch["belegt"] += setze
-                    rest -= setze
-                else:
-                    # If all available tables are full, we can't do anything more
-                    print(f"⚠️ Warning: Not enough tables for {verein_name}, {rest} persons could not be placed.")
-                    break
-
-    # Write all assignments to the database
-    TableAssignment.query.delete()
-    db.session.commit()
-    
-    for tisch in tische:
-        for verein, personen in tisch["zuweisungen"]:
-            if personen > 0:  # Only save meaningful assignments
-                db.session.add(TableAssignment(
-                    tischnummer=tisch["nummer"], 
-                    verein=verein, 
-                    personen=personen
-                ))
-    
-    db.session.commit()
+    if get_settings().get("table_solver", "greedy") == "optimize":
+        # Minimise tables and split groups within the configured time budget
+        layout, unplaced = optimize_tables(
+            manuell_zuweisungen, vereine, MAX_TISCHE, MAX_PERSONS_PER_TABLE,
+            budget_seconds=current_app.config.get("TABLE_SOLVER_BUDGET", 2.0)
+        )
+    else:
+        layout, unplaced = pack_tables(manuell_zuweisungen, vereine, MAX_TISCHE, MAX_PERSONS_PER_TABLE)
+    for invite_id, rest in unplaced.items():
+        print(f"⚠️ Warning: Not enough tables for invite {invite_id}, {rest} persons could not be placed.")
+
+    # Write only the changed assignments to the database
+    inserted, updated, deleted = write_assignments(layout.assignments())
 
-    # Count the actual assignments for debug output
-    assignment_count = TableAssignment.query.count()
     print("🔄 Table assignment is being recalculated...")
-    print(f"✅ Table assignment completed. {assignment_count} assignments created.")
+    print(f"✅ Table assignment completed. {inserted} created, {updated} updated, {deleted} removed.")
+
+
+def update_group_tables(invite_id):
+    """Apply a single group's change to the existing seating plan.
+
+    Why: A guest replying or an invite being deleted only changes one
+    group. Instead of rewriting every assignment we remove the group from
+    the stored layout and place its new size into the free seats, touching
+    only this group's rows. A full repack via assign_all_tables() is only
+    done when the group is manually placed, does not fit anymore, or the
+    plan has become too fragmented (see TABLE_REPACK_THRESHOLD).
+
+    Args:
+        invite_id: ID of the invite whose attendance changed
+    """
+    config = _get_table_config()
+    if config is None:
+        return
+    max_tables, max_persons_per_table = config
+
+    gruppe = db.session.query(Invite.manuell_gesetzt, Response.persons).outerjoin(
+        Response, (Response.invite_id == Invite.id) & (Response.attending == "yes")
+    ).filter(Invite.id == invite_id).first()
+    if gruppe and gruppe.manuell_gesetzt:
+        # Manual placement and neighbour overflow are handled by the full run
+        assign_all_tables()
+        return
+
+    # Rebuild the stored layout including the tables held by manual groups
+    manuell_ids = set()
+    reserved = set()
+    for manuell_id, tischnummer in db.session.query(Invite.id, Invite.tischnummer).filter(
+            Invite.manuell_gesetzt.is_(True)):
+        manuell_ids.add(manuell_id)
+        if tischnummer is not None:
+            reserved.add(tischnummer)
+    rows = db.session.query(TableAssignment.tischnummer, TableAssignment.invite_id, TableAssignment.personen).all()
+    reserved |= {tischnummer for tischnummer, i, _ in rows if i in manuell_ids}
+
+    layout = SeatingLayout.from_assignments(rows, reserved, max_tables, max_persons_per_table)
+    if layout.inkonsistent:
+        assign_all_tables()
+        return
+
+    layout.remove_group(invite_id)
+
+    personen = gruppe.persons or 0 if gruppe else 0
+
+    threshold = current_app.config.get("TABLE_REPACK_THRESHOLD", 0.1)
+    if layout.place_group(invite_id, personen) > 0 or layout.needs_repack(threshold):
+        assign_all_tables()
+        return
+
+    # Only this group's rows change
+    write_assignments(
+        ((tischnummer, i, p) for tischnummer, i, p in layout.assignments() if i == invite_id),
+        invite_id=invite_id
+    )
+    print(f"🔄 Table assignment updated for invite {invite_id} ({len(layout.geaendert)} tables touched).")
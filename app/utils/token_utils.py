@@ -0,0 +1,90 @@
+"""
+Hilfsfunktionen für den Token-Index (Einladungscodes ohne Datenbankzugriff prüfen).
+"""
+
+from flask import current_app
+from sqlalchemy import select
+from app.models import Invite, db
+from app.utils.settings_utils import bump_version_stamp, get_version_stamp, get_version_stamps
+
+# Name of the version stamp bumped whenever invites are created or deleted
+INVITES_STAMP = "invites"
+
+
+def normalize_token(token):
+    """Fold a typed token for lookup: case-insensitive, without any whitespace."""
+    return "".join((token or "").split()).casefold()
+
+
+class TokenIndex:
+    """In-memory index of all valid invite tokens.
+
+    Why: Every lookup of an unknown token (typos, scanners trying random
+    codes) used to cost a query on invites. The index answers from a dict,
+    exact tokens first and then the folded form, because guests type the
+    code from the printed invitation.
+    """
+
+    __slots__ = ("_exact", "_folded", "version")
+
+    def __init__(self, rows, version=0):
+        self._exact = {}
+        self._folded = {}
+        ambiguous = set()
+        for invite_id, token in rows:
+            self._exact[token] = (token, invite_id)
+            key = normalize_token(token)
+            if key in self._folded:
+                # Two tokens only differ in case: only exact input can tell them apart
+                ambiguous.add(key)
+            self._folded[key] = (token, invite_id)
+        for key in ambiguous:
+            del self._folded[key]
+        self.version = version
+
+    @classmethod
+    def load(cls):
+        """Read all tokens and the current invites version from the database."""
+        version = get_version_stamp(INVITES_STAMP)
+        return cls(db.session.execute(select(Invite.id, Invite.token)).all(), version)
+
+    def __len__(self):
+        return len(self._exact)
+
+    def resolve(self, token):
+        """Find the invite for a typed token.
+
+        Returns:
+            tuple: (token, invite_id) with the stored spelling of the token,
+            or None if no invite has this token
+        """
+        if token in self._exact:
+            return self._exact[token]
+        return self._folded.get(normalize_token(token))
+
+
+def get_token_index():
+    """Get this worker's token index, rebuilt if invites were added or deleted.
+
+    The index is validated against the invites version stamp, which is
+    read together with the other stamps once per request.
+    """
+    index = current_app.extensions.get("token_index")
+    if index is None or index.version != get_version_stamps().get(INVITES_STAMP, 0):
+        index = TokenIndex.load()
+        current_app.extensions["token_index"] = index
+    return index
+
+
+def resolve_token(token):
+    """Resolve a typed token to (token, invite_id) or None, see TokenIndex.resolve()."""
+    return get_token_index().resolve(token)
+
+
+def mark_invites_changed():
+    """Invalidate the token index of all workers.
+
+    Must be called in the transaction that creates or deletes invites;
+    the caller commits.
+    """
+    bump_version_stamp(INVITES_STAMP)
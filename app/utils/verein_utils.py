@@ -0,0 +1,30 @@
+"""
+Hilfsfunktionen für die Normalisierung von Vereinsnamen (Duplikatprüfung).
+"""
+
+import unicodedata
+
+# Umlaute werden wie bei der Eingabe ohne deutsche Tastatur ersetzt ("Müller" == "Mueller")
+UMLAUTE = {"ä": "ae", "ö": "oe", "ü": "ue"}
+
+
+def make_verein_key(name):
+    """Build the normalized key used to detect duplicate association names.
+
+    Why: Names are typed by hand or imported from spreadsheets, so the same
+    association shows up as "FF Müllerdorf", "ff  muellerdorf" or with
+    composed and decomposed umlauts. The key folds case (including ß to ss),
+    spells out German umlauts, strips other accents and collapses
+    whitespace, so all spellings map to one value that can be indexed.
+
+    Args:
+        name: Association name as entered
+
+    Returns:
+        str: Normalized key
+    """
+    key = unicodedata.normalize("NFKC", name or "").casefold()
+    for umlaut, ersatz in UMLAUTE.items():
+        key = key.replace(umlaut, ersatz)
+    key = "".join(c for c in unicodedata.normalize("NFKD", key) if not unicodedata.combining(c))
+    return " ".join(key.split())
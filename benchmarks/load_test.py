@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Lasttest: simuliert einen Ansturm von Rückmeldungen gegen die echte App.
+
+Legt pro Szenario eine frische SQLite-Datei mit synthetischen Einladungen an
+(siehe benchmarks.synthetic_event) und schickt parallel Gäste-Traffic
+(GET/POST /respond/<token>, POST /find) und Admin-Traffic (GET /admin/)
+durch die App - entweder direkt über die WSGI-App im selben Prozess oder
+gegen einen lokal gestarteten gunicorn (wie im Dockerfile). Gemessen werden
+pro SQLite-Profil und Endpoint p50/p95/p99-Latenz, Durchsatz, Fehlerquote sowie
+"database is locked"-Fehler und Lock-Wartezeiten.
+
+Beispiel:
+    python -m benchmarks.load_test --invites 2000 --guests 16 --duration 20
+    python -m benchmarks.load_test --server gunicorn --workers 4 --tables on,off --output load.json
+    python -m benchmarks.load_test --profiles wal,legacy --recompute sync --tables on
+
+Im WSGI-Modus laufen alle Gäste als Threads in einem Prozess (GIL, höchstens
+15 gleichzeitige Verbindungen im SQLAlchemy-Pool); für Aussagen über die
+Produktion ist der gunicorn-Modus maßgeblich.
+"""
+
+import argparse
+import contextlib
+import http.cookiejar
+import json
+import logging
+import os
+import platform
+import random
+import re
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+
+os.environ.setdefault("SECRET_KEY", "load-test")
+
+import sqlalchemy
+from sqlalchemy import event
+
+from benchmarks.synthetic_event import DISTRIBUTIONS, generate_event, seed_event
+
+CSRF_PATTERN = re.compile(r'name="csrf_token" value="([^"]+)"')
+
+# Statements that take write locks; slower executions count as lock waits
+WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE", "BEGIN")
+
+
+def _parse_list(value, cast):
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def _csrf(html):
+    match = CSRF_PATTERN.search(html)
+    return match.group(1) if match else ""
+
+
+class WsgiClient:
+    """Client that calls the WSGI app in-process (one cookie jar per client)."""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self._client.open(path, method=method, data=data)
+        return response.status_code, response.get_data(as_text=True)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpClient:
+    """Client that talks HTTP to a running server (one cookie jar per client)."""
+
+    def __init__(self, base_url):
+        self._base_url = base_url
+        self._opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+        )
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self._base_url + path, data=body, method=method)
+        try:
+            with self._opener.open(req, timeout=60) as response:
+                return response.status, response.read().decode()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode(errors="replace")
+
+
+class Recorder:
+    """Collects (endpoint, status, seconds) samples of one thread."""
+
+    def __init__(self):
+        self.samples = []
+
+    def call(self, client, label, method, path, data=None):
+        start = time.perf_counter()
+        try:
+            status, body = client.request(method, path, data)
+        except Exception:
+            status, body = None, ""
+        self.samples.append((label, status, time.perf_counter() - start))
+        return status, body
+
+
+def guest_loop(client_factory, tokens, deadline, recorder, seed, post_ratio, find_ratio):
+    """Simulate guests: open their invitation, sometimes via the code form, and answer."""
+    rnd = random.Random(seed)
+    while time.monotonic() < deadline:
+        client = client_factory()
+        token = rnd.choice(tokens)
+        if rnd.random() < find_ratio:
+            _, html = recorder.call(client, "GET /", "GET", "/")
+            # Typed off paper: upper case and a space in the middle
+            typed = f"{token[:4].upper()} {token[4:]}"
+            status, html = recorder.call(client, "POST /find", "POST", "/find",
+                                         {"token": typed, "csrf_token": _csrf(html)})
+        else:
+            status, html = recorder.call(client, "GET /respond", "GET", f"/respond/{token}")
+        if status == 200 and rnd.random() < post_ratio:
+            attending = "yes" if rnd.random() < 0.8 else "no"
+            recorder.call(client, "POST /respond", "POST", f"/respond/{token}", {
+                "csrf_token": _csrf(html),
+                "attending": attending,
+                "persons": str(rnd.randint(1, 12) if attending == "yes" else 0),
+            })
+
+
+def admin_loop(client_factory, deadline, recorder, think_seconds):
+    """Simulate an admin watching the dashboard while the answers come in."""
+    client = client_factory()
+    _, html = client.request("GET", "/auth/login")
+    client.request("POST", "/auth/login", {"username": "admin", "password": "changeme", "csrf_token": _csrf(html)})
+    while time.monotonic() < deadline:
+        recorder.call(client, "GET /admin", "GET", "/admin/")
+        time.sleep(think_seconds)
+
+
+def summarize(samples, duration):
+    """Aggregate samples to latency percentiles, throughput and error rate per endpoint."""
+    grouped = {}
+    for label, status, seconds in samples:
+        grouped.setdefault(label, []).append((status, seconds))
+    grouped["total"] = [(status, seconds) for _, status, seconds in samples]
+
+    summary = {}
+    for label, rows in sorted(grouped.items()):
+        latencies = sorted(seconds * 1000 for _, seconds in rows)
+        errors = sum(1 for status, _ in rows if status is None or status >= 500)
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+        summary[label] = {
+            "requests": len(rows),
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4),
+            "throughput_rps": round(len(rows) / duration, 1),
+            "p50_ms": round(cuts[49], 2),
+            "p95_ms": round(cuts[94], 2),
+            "p99_ms": round(cuts[98], 2),
+        }
+    return summary
+
+
+class LockMonitor:
+    """Count lock waits and "database is locked" errors of the in-process app.
+
+    SQLite does not report lock waits, so write statements that take longer
+    than the threshold are counted as having waited for the write lock.
+    """
+
+    def __init__(self, app, engine, threshold_ms):
+        from flask import got_request_exception
+
+        self.lock_waits = 0
+        self.locked_errors = 0
+        self._threshold = threshold_ms / 1000
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._app = app
+        self._engine = engine
+        self._signal = got_request_exception
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        got_request_exception.connect(self._on_exception, app)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.start = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(WRITE_PREFIXES):
+            if time.perf_counter() - self._local.start > self._threshold:
+                with self._lock:
+                    self.lock_waits += 1
+
+    def _on_exception(self, sender, exception, **extra):
+        if "database is locked" in str(exception):
+            with self._lock:
+                self.locked_errors += 1
+
+    def close(self):
+        event.remove(self._engine, "before_cursor_execute", self._before)
+        event.remove(self._engine, "after_cursor_execute", self._after)
+        self._signal.disconnect(self._on_exception, self._app)
+
+
+def seed_database(database_url, args, enable_tables):
+    """Create the database file with a synthetic event and return the invite tokens."""
+    from app import create_app
+    from app.models import User, db
+    from app.utils.table_utils import assign_all_tables
+
+    os.environ["DATABASE_URL"] = database_url
+    with contextlib.redirect_stdout(sys.stderr):
+        app = create_app()
+        with app.app_context():
+            ev = generate_event(args.invites, args.distribution, args.manual, seed=args.seed)
+            seed_event(ev, enable_tables=enable_tables)
+            if enable_tables:
+                assign_all_tables()
+            User.query.filter_by(username="admin").update({"force_password_change": False})
+            db.session.commit()
+            db.engine.dispose()
+    return app, [invite["token"] for invite in ev["invites"]]
+
+
+def drive(client_factory, tokens, args, seed):
+    """Run all guest and admin threads for the configured duration."""
+    deadline = time.monotonic() + args.duration
+    recorders = []
+    threads = []
+    for i in range(args.guests):
+        recorder = Recorder()
+        recorders.append(recorder)
+        threads.append(threading.Thread(target=guest_loop, args=(
+            client_factory, tokens, deadline, recorder, seed + i, args.post_ratio, args.find_ratio)))
+    for _ in range(args.admins):
+        recorder = Recorder()
+        recorders.append(recorder)
+        threads.append(threading.Thread(target=admin_loop, args=(
+            client_factory, deadline, recorder, args.admin_think)))
+
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.monotonic() - start
+    return [sample for recorder in recorders for sample in recorder.samples], duration
+
+
+def run_wsgi(database_url, tokens, args, async_recompute):
+    """Drive the app in-process, with the recompute worker as a thread."""
+    from app import create_app
+    from app.models import db
+    from app.utils.recompute_utils import run_pending_recompute
+    from app.utils.storage_utils import immediate_transactions
+
+    with contextlib.redirect_stdout(sys.stderr):
+        app = create_app()
+    app.config["TABLE_RECOMPUTE_ASYNC"] = async_recompute
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with app.app_context():
+        engine = db.engine
+    monitor = LockMonitor(app, engine, args.lock_threshold_ms)
+    stop = threading.Event()
+
+    def recompute_worker():
+        while not stop.is_set():
+            try:
+                with app.app_context(), immediate_transactions(), contextlib.redirect_stdout(None):
+                    run_pending_recompute("load-test")
+            except Exception as e:
+                if "database is locked" in str(e):
+                    monitor.locked_errors += 1
+            stop.wait(min(1.0, app.config.get("TABLE_RECOMPUTE_WINDOW", 5)))
+
+    worker = threading.Thread(target=recompute_worker, daemon=True)
+    if async_recompute:
+        worker.start()
+    try:
+        with contextlib.redirect_stdout(None):
+            samples, duration = drive(lambda: WsgiClient(app), tokens, args, args.seed)
+    finally:
+        stop.set()
+        if async_recompute:
+            worker.join()
+        monitor.close()
+        engine.dispose()
+    return samples, duration, {"locked_errors": monitor.locked_errors, "lock_waits": monitor.lock_waits}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_gunicorn(database_url, tokens, args, async_recompute, workdir):
+    """Drive a locally started gunicorn like the one in the Dockerfile."""
+    port = _free_port()
+    log_path = os.path.join(workdir, "gunicorn.log")
+    env = dict(os.environ, DATABASE_URL=database_url,
+               TABLE_RECOMPUTE_ASYNC="True" if async_recompute else "False")
+    with open(log_path, "w") as log:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "--workers", str(args.workers), "--bind", f"127.0.0.1:{port}",
+             "--timeout", "120", "app.main:app"],
+            stdout=log, stderr=subprocess.STDOUT, env=env,
+        )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        for _ in range(300):
+            with contextlib.suppress(OSError):
+                with socket.create_connection(("127.0.0.1", port), timeout=1):
+                    break
+            if server.poll() is not None:
+                raise RuntimeError(f"gunicorn exited, see {log_path}")
+            time.sleep(0.1)
+        time.sleep(1)  # Let all workers finish booting
+        samples, duration = drive(lambda: HttpClient(base_url), tokens, args, args.seed)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    with open(log_path, errors="replace") as log:
+        locked_errors = log.read().count("database is locked")
+    # Lock waits are only observable in-process
+    return samples, duration, {"locked_errors": locked_errors, "lock_waits": None}
+
+
+def run_scenario(args, profile, enable_tables, async_recompute):
+    workdir = tempfile.mkdtemp(prefix="simple_invites_load_")
+    # Gilt für die App im selben Prozess und wird an gunicorn vererbt
+    os.environ["SQLITE_PROFILE"] = profile
+    try:
+        database_url = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+        app, tokens = seed_database(database_url, args, enable_tables)
+        if args.server == "gunicorn":
+            samples, duration, locks = run_gunicorn(database_url, tokens, args, async_recompute, workdir)
+        else:
+            samples, duration, locks = run_wsgi(database_url, tokens, args, async_recompute)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "server": args.server,
+        "workers": args.workers if args.server == "gunicorn" else 1,
+        "profile": profile,
+        "pragmas": app.extensions["sqlite_pragmas"],
+        "enable_tables": enable_tables,
+        "recompute": "async" if async_recompute else "sync",
+        "invites": args.invites,
+        "guests": args.guests,
+        "admins": args.admins,
+        "duration_s": round(duration, 2),
+        **locks,
+        "endpoints": summarize(samples, duration),
+    }
+
+
+def print_summary(result):
+    print(f"\n{result['server']} profile={result['profile']} tables={'on' if result['enable_tables'] else 'off'} "
+          f"recompute={result['recompute']} locked_errors={result['locked_errors']} "
+          f"lock_waits={result['lock_waits']}", file=sys.stderr)
+    print(f"  {'endpoint':<15}{'requests':>9}{'errors':>8}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}",
+          file=sys.stderr)
+    for label, stats in result["endpoints"].items():
+        print(f"  {label:<15}{stats['requests']:>9}{stats['errors']:>8}{stats['throughput_rps']:>8}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=["wsgi", "gunicorn"], default="wsgi",
+                        help="Call the WSGI app in-process or start gunicorn (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers (default: %(default)s)")
+    parser.add_argument("--invites", type=int, default=1000, help="Seeded invites (default: %(default)s)")
+    parser.add_argument("--distribution", default="skewed", choices=list(DISTRIBUTIONS),
+                        help="Group size distribution (default: %(default)s)")
+    parser.add_argument("--manual", type=float, default=0.1,
+                        help="Share of invites with a manual table (default: %(default)s)")
+    parser.add_argument("--guests", type=int, default=16, help="Concurrent guests (default: %(default)s)")
+    parser.add_argument("--admins", type=int, default=1, help="Concurrent admins (default: %(default)s)")
+    parser.add_argument("--admin-think", type=float, default=1.0,
+                        help="Seconds between two dashboard loads (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds per scenario (default: %(default)s)")
+    parser.add_argument("--post-ratio", type=float, default=0.5,
+                        help="Share of page views followed by an answer (default: %(default)s)")
+    parser.add_argument("--find-ratio", type=float, default=0.2,
+                        help="Share of guests using the code form (default: %(default)s)")
+    parser.add_argument("--profiles", default="wal,legacy",
+                        help="Comma separated SQLite storage profiles (default: %(default)s)")
+    parser.add_argument("--tables", default="on,off",
+                        help="Comma separated table management modes (default: %(default)s)")
+    parser.add_argument("--recompute", default="async", help="Comma separated async/sync (default: %(default)s)")
+    parser.add_argument("--lock-threshold-ms", type=float, default=20,
+                        help="Write statements slower than this count as lock waits (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: %(default)s)")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = []
+    for profile in _parse_list(args.profiles, str):
+        for tables in _parse_list(args.tables, str):
+            for recompute in _parse_list(args.recompute, str):
+                result = run_scenario(args, profile, tables == "on", recompute == "async")
+                results.append(result)
+                print_summary(result)
+
+    report = {
+        "benchmark": "load",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
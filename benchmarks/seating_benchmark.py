@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmark für die Tischberechnung (app.utils.table_utils.assign_all_tables).
+
+Erzeugt synthetische Veranstaltungen, führt eine vollständige Neuberechnung
+gegen eine SQLite-In-Memory-Datenbank aus und gibt die Messwerte als JSON aus,
+damit Regressionen zwischen Releases verglichen werden können.
+
+Beispiel:
+    python -m benchmarks.seating_benchmark --groups 100,1000,10000 --output bench.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import sqlalchemy
+from sqlalchemy import event, func
+from app import create_app
+from app.models import TableAssignment, db
+from app.utils.table_utils import assign_all_tables
+from benchmarks.synthetic_event import DISTRIBUTIONS, generate_event, seed_event
+
+
+def _parse_list(value, cast):
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+@contextlib.contextmanager
+def count_statements(engine):
+    """Collect the SQL statements executed on the engine inside the block.
+
+    A plain BEGIN is left out: whether the block opens a new transaction
+    depends on what ran before it, not on the code being measured.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement != "BEGIN":
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _reset_assignments():
+    TableAssignment.query.delete()
+    db.session.commit()
+
+
+def layout_metrics():
+    """Return (tables_used, split_groups, seated_persons) of the stored layout."""
+    tables_used = db.session.query(func.count(func.distinct(TableAssignment.tischnummer))).scalar()
+    per_group = db.session.query(TableAssignment.invite_id, func.count(TableAssignment.id)).group_by(
+        TableAssignment.invite_id)
+    split_groups = sum(1 for _, count in per_group if count > 1)
+    seated = db.session.query(func.coalesce(func.sum(TableAssignment.personen), 0)).scalar()
+    return tables_used, split_groups, seated
+
+
+def run_scenario(groups, distribution, manual_ratio, seats, table_slack, repeat, seed):
+    """Seed one synthetic event and measure a full recompute from scratch."""
+    ev = generate_event(groups, distribution, manual_ratio, seats, table_slack, seed=seed)
+    seed_event(ev)
+    attending_persons = sum(r["persons"] for r in ev["responses"])
+
+    latencies = []
+    statements = 0
+    for _ in range(repeat):
+        _reset_assignments()
+        with count_statements(db.engine) as executed, contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            assign_all_tables()
+            latencies.append(time.perf_counter() - start)
+        statements = len(executed)
+
+    # Memory is measured in a separate run, tracemalloc distorts the timings
+    _reset_assignments()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        assign_all_tables()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tables_used, split_groups, seated = layout_metrics()
+    return {
+        "groups": groups,
+        "distribution": distribution,
+        "manual_ratio": manual_ratio,
+        "max_tables": ev["max_tables"],
+        "max_persons_per_table": seats,
+        "attending_persons": attending_persons,
+        "latency_ms": {
+            "median": round(statistics.median(latencies) * 1000, 3),
+            "min": round(min(latencies) * 1000, 3),
+            "max": round(max(latencies) * 1000, 3),
+        },
+        "sql_statements": statements,
+        "peak_memory_kb": round(peak / 1024, 1),
+        "tables_used": tables_used,
+        "split_groups": split_groups,
+        "unplaced_persons": attending_persons - seated,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", default="100,1000,5000,20000,50000",
+                        help="Comma separated group counts (default: %(default)s)")
+    parser.add_argument("--distribution", default="small,skewed",
+                        help=f"Comma separated size distributions out of {', '.join(DISTRIBUTIONS)}")
+    parser.add_argument("--manual", default="0,0.1,0.3",
+                        help="Comma separated shares of manual tischnummer assignments (default: %(default)s)")
+    parser.add_argument("--seats", default="10",
+                        help="Comma separated max_persons_per_table values (default: %(default)s)")
+    parser.add_argument("--table-slack", type=float, default=1.2,
+                        help="max_tables relative to the minimum number of tables needed (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per scenario (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: %(default)s)")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    # Keep stdout clean for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        app = create_app(testing=True)
+    # The app logs every SQL-related step on DEBUG, which would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = []
+    with app.app_context():
+        for groups in _parse_list(args.groups, int):
+            for distribution in _parse_list(args.distribution, str):
+                for manual_ratio in _parse_list(args.manual, float):
+                    for seats in _parse_list(args.seats, int):
+                        result = run_scenario(groups, distribution, manual_ratio, seats,
+                                              args.table_slack, args.repeat, args.seed)
+                        results.append(result)
+                        print(f"{groups:>6} groups  {distribution:<8} manual={manual_ratio:<4} seats={seats:<3} "
+                              f"{result['latency_ms']['median']:>10.1f} ms  {result['sql_statements']:>3} stmts",
+                              file=sys.stderr)
+
+    report = {
+        "benchmark": "seating",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
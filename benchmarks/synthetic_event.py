@@ -0,0 +1,97 @@
+"""
+Erzeugt synthetische Veranstaltungen (Einladungen, Rückmeldungen, manuelle Tische)
+für Benchmarks und Lasttests.
+"""
+
+import math
+import random
+from sqlalchemy import insert
+from app.models import Invite, Response, Setting, TableAssignment, db
+from app.utils.settings_utils import clear_settings_cache
+from app.utils.stats_utils import rebuild_stats
+from app.utils.storage_utils import write_lock
+from app.utils.token_utils import mark_invites_changed
+
+# Group size distributions: (sizes, weights)
+DISTRIBUTIONS = {
+    # Mostly small groups
+    "small": ([1, 2, 3, 4, 5, 6], [10, 30, 25, 20, 10, 5]),
+    # Every size between 1 and 12 is equally likely
+    "uniform": (list(range(1, 13)), [1] * 12),
+    # Many small groups, a long tail of large fire brigades
+    "skewed": ([1, 2, 3, 4, 6, 8, 10, 15, 20, 30, 45], [6, 20, 18, 14, 12, 10, 7, 5, 4, 2, 1]),
+}
+
+
+def generate_event(groups, distribution="skewed", manual_ratio=0.0, max_persons_per_table=10,
+                   table_slack=1.2, decline_ratio=0.1, seed=0):
+    """Generate a synthetic event.
+
+    Args:
+        groups: Number of invited groups
+        distribution: Key of DISTRIBUTIONS used for the group sizes
+        manual_ratio: Share of groups (0..1) with a manually set tischnummer
+        max_persons_per_table: Seats per table
+        table_slack: Available tables relative to the minimum needed
+        decline_ratio: Share of groups that answered "no"
+        seed: Random seed, the same seed always produces the same event
+
+    Returns:
+        dict: {"max_tables", "max_persons_per_table", "invites", "responses"}
+        with invites/responses as lists of column dicts
+    """
+    rnd = random.Random(seed)
+    sizes, weights = DISTRIBUTIONS[distribution]
+
+    invites = []
+    responses = []
+    total_persons = 0
+    for i in range(groups):
+        token = f"b{i:07d}"
+        attending = "no" if rnd.random() < decline_ratio else "yes"
+        persons = rnd.choices(sizes, weights)[0] if attending == "yes" else 0
+        total_persons += persons
+        invites.append({
+            "id": i + 1,
+            "verein": f"Verein {i:06d}",
+            "verein_key": f"verein {i:06d}",
+            "token": token,
+            "link": f"/respond/{token}",
+            "manuell_gesetzt": False,
+            "tischnummer": None,
+        })
+        responses.append({"invite_id": i + 1, "attending": attending, "persons": persons})
+
+    max_tables = max(1, math.ceil(total_persons / max_persons_per_table * table_slack))
+    for invite in rnd.sample(invites, int(groups * manual_ratio)):
+        invite["manuell_gesetzt"] = True
+        invite["tischnummer"] = rnd.randint(1, max_tables)
+
+    return {
+        "max_tables": max_tables,
+        "max_persons_per_table": max_persons_per_table,
+        "invites": invites,
+        "responses": responses,
+    }
+
+
+def seed_event(event, enable_tables=True):
+    """Replace the current database content with a generated event."""
+    with write_lock():
+        TableAssignment.query.delete()
+        Response.query.delete()
+        Invite.query.delete()
+        Setting.query.filter(Setting.key.in_(["enable_tables", "max_tables", "max_persons_per_table"])).delete()
+        db.session.add_all([
+            Setting(key="enable_tables", value="true" if enable_tables else "false"),
+            Setting(key="max_tables", value=str(event["max_tables"])),
+            Setting(key="max_persons_per_table", value=str(event["max_persons_per_table"])),
+        ])
+        if event["invites"]:
+            db.session.execute(insert(Invite), event["invites"])
+            db.session.execute(insert(Response), event["responses"])
+        mark_invites_changed()
+        # Bulk inserts bypass the write paths that maintain the dashboard counters
+        rebuild_stats()
+        db.session.commit()
+    clear_settings_cache()
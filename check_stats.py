@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Prüft die laufend mitgeführten Dashboard-Kennzahlen gegen die Basistabellen
+und meldet Abweichungen. Mit --repair werden die Kennzahlen neu berechnet.
+
+    python check_stats.py [--repair]
+
+Exit-Code 1, wenn Abweichungen gefunden wurden (auch nach einer Reparatur).
+"""
+
+import argparse
+import contextlib
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the dashboard counters for drift")
+    parser.add_argument("--repair", action="store_true", help="rebuild drifted counters from the base tables")
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.utils.stats_utils import check_stats
+    from app.utils.storage_utils import write_lock
+
+    # Startmeldungen der App nicht mit dem Bericht vermischen
+    with contextlib.redirect_stdout(sys.stderr):
+        app = create_app()
+    # Lesen und Reparieren in einer Transaktion mit Schreibsperre
+    with app.app_context(), write_lock():
+        drift = check_stats(repair=args.repair)
+
+    if not drift:
+        print("Dashboard counters are consistent.")
+        return 0
+    for field, (stored, actual) in drift.items():
+        print(f"{field}: stored {stored}, actual {actual}")
+    print("Counters rebuilt." if args.repair else "Run with --repair to rebuild the counters.")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
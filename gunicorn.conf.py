@@ -0,0 +1,20 @@
+"""
+gunicorn-Konfiguration: mehrere Worker mit Threads, damit offene Dashboard-Streams
+(/admin/events) keinen Worker blockieren, und einmalige Vorbereitung der Datenbank
+im Master-Prozess, bevor die Worker starten (siehe app.utils.db_fixes.prepare_database).
+"""
+
+import os
+
+workers = int(os.environ.get("GUNICORN_WORKERS", "2"))
+worker_class = "gthread"
+# Jeder offene Stream belegt einen Thread; die übrigen bedienen normale Requests
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+
+
+def on_starting(server):
+    from app import create_app
+    from app.utils.db_fixes import prepare_database
+
+    # Tabellen anlegen und Korrekturen anwenden, ohne dass sich Worker gegenseitig stören
+    prepare_database(create_app())
@@ -0,0 +1,26 @@
+"""Unique index on responses.token
+
+Revision ID: b3c1f0a9d2e4
+Revises: cef09c4481ff
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3c1f0a9d2e4'
+down_revision = 'cef09c4481ff'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep one response per token (the row public.respond used to update)
+    op.execute("DELETE FROM responses WHERE id NOT IN (SELECT MIN(id) FROM responses GROUP BY token)")
+    op.create_index('ix_responses_token', 'responses', ['token'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_responses_token', table_name='responses')
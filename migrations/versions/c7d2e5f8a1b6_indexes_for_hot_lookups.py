@@ -0,0 +1,33 @@
+"""Indexes for hot lookup columns
+
+Revision ID: c7d2e5f8a1b6
+Revises: b3c1f0a9d2e4
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2e5f8a1b6'
+down_revision = 'b3c1f0a9d2e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_invites_verein', 'invites', ['verein'])
+    # Expression index for the case-insensitive duplicate check
+    op.create_index('ix_invites_verein_lower', 'invites', [sa.text('lower(verein)')])
+    op.create_index('ix_invites_manuell_gesetzt', 'invites', ['manuell_gesetzt'])
+    op.create_index('ix_responses_attending_persons', 'responses', ['attending', 'persons'])
+    op.create_index('ix_table_assignments_verein', 'table_assignments', ['verein'])
+
+
+def downgrade():
+    op.drop_index('ix_table_assignments_verein', table_name='table_assignments')
+    op.drop_index('ix_responses_attending_persons', table_name='responses')
+    op.drop_index('ix_invites_manuell_gesetzt', table_name='invites')
+    op.drop_index('ix_invites_verein_lower', table_name='invites')
+    op.drop_index('ix_invites_verein', table_name='invites')
@@ -0,0 +1,92 @@
+"""Link responses and table assignments to invites by integer id
+
+Revision ID: d4a9b2c6e8f1
+Revises: c7d2e5f8a1b6
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a9b2c6e8f1'
+down_revision = 'c7d2e5f8a1b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Batch mode recreates tables, which the enforced foreign keys would block
+    op.execute("PRAGMA foreign_keys=OFF")
+
+    # Only purely numeric values were ever used as table numbers
+    op.execute("UPDATE invites SET tischnummer = NULL WHERE tischnummer = '' OR tischnummer GLOB '*[^0-9]*'")
+    with op.batch_alter_table('invites') as batch_op:
+        batch_op.alter_column('tischnummer', existing_type=sa.String(200), type_=sa.Integer(),
+                              existing_nullable=True)
+    # Batch mode cannot reflect expression indexes and drops them with the old table
+    op.create_index('ix_invites_verein_lower', 'invites', [sa.text('lower(verein)')])
+
+    with op.batch_alter_table('responses') as batch_op:
+        batch_op.add_column(sa.Column('invite_id', sa.Integer(), nullable=True))
+    op.execute("UPDATE responses SET invite_id = (SELECT id FROM invites WHERE invites.token = responses.token)")
+    op.execute("DELETE FROM responses WHERE invite_id IS NULL")
+    with op.batch_alter_table('responses', recreate='always') as batch_op:
+        batch_op.drop_index('ix_responses_token')
+        batch_op.drop_column('token')
+        batch_op.alter_column('invite_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_index('ix_responses_invite_id', ['invite_id'], unique=True)
+        batch_op.create_foreign_key('fk_responses_invite_id', 'invites', ['invite_id'], ['id'],
+                                    ondelete='CASCADE')
+
+    with op.batch_alter_table('table_assignments') as batch_op:
+        batch_op.add_column(sa.Column('invite_id', sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE table_assignments SET invite_id = "
+        "(SELECT id FROM invites WHERE invites.verein = table_assignments.verein)"
+    )
+    op.execute("DELETE FROM table_assignments WHERE invite_id IS NULL")
+    with op.batch_alter_table('table_assignments', recreate='always') as batch_op:
+        batch_op.drop_index('ix_table_assignments_verein')
+        batch_op.drop_column('verein')
+        batch_op.alter_column('invite_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_index('ix_table_assignments_invite_id', ['invite_id'])
+        batch_op.create_foreign_key('fk_table_assignments_invite_id', 'invites', ['invite_id'], ['id'],
+                                    ondelete='CASCADE')
+    # layout_pending is not managed by migrations, see migrations/README
+    op.execute("PRAGMA foreign_keys=ON")
+
+
+def downgrade():
+    op.execute("PRAGMA foreign_keys=OFF")
+
+    with op.batch_alter_table('table_assignments') as batch_op:
+        batch_op.add_column(sa.Column('verein', sa.String(150), nullable=True))
+    op.execute(
+        "UPDATE table_assignments SET verein = "
+        "(SELECT verein FROM invites WHERE invites.id = table_assignments.invite_id)"
+    )
+    with op.batch_alter_table('table_assignments', recreate='always') as batch_op:
+        batch_op.drop_constraint('fk_table_assignments_invite_id', type_='foreignkey')
+        batch_op.drop_index('ix_table_assignments_invite_id')
+        batch_op.drop_column('invite_id')
+        batch_op.alter_column('verein', existing_type=sa.String(150), nullable=False)
+        batch_op.create_index('ix_table_assignments_verein', ['verein'])
+
+    with op.batch_alter_table('responses') as batch_op:
+        batch_op.add_column(sa.Column('token', sa.String(64), nullable=True))
+    op.execute("UPDATE responses SET token = (SELECT token FROM invites WHERE invites.id = responses.invite_id)")
+    with op.batch_alter_table('responses', recreate='always') as batch_op:
+        batch_op.drop_constraint('fk_responses_invite_id', type_='foreignkey')
+        batch_op.drop_index('ix_responses_invite_id')
+        batch_op.drop_column('invite_id')
+        batch_op.alter_column('token', existing_type=sa.String(64), nullable=False)
+        batch_op.create_index('ix_responses_token', ['token'], unique=True)
+        batch_op.create_foreign_key('fk_responses_token', 'invites', ['token'], ['token'])
+
+    with op.batch_alter_table('invites') as batch_op:
+        batch_op.alter_column('tischnummer', existing_type=sa.Integer(), type_=sa.String(200),
+                              existing_nullable=True)
+    op.create_index('ix_invites_verein_lower', 'invites', [sa.text('lower(verein)')])
+    op.execute("PRAGMA foreign_keys=ON")
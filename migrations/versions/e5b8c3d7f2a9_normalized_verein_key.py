@@ -0,0 +1,36 @@
+"""Normalized association key with unique index
+
+Revision ID: e5b8c3d7f2a9
+Revises: d4a9b2c6e8f1
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.db_fixes import assign_verein_keys
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8c3d7f2a9'
+down_revision = 'd4a9b2c6e8f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('invites', sa.Column('verein_key', sa.String(150), nullable=True))
+    # The key is computed in Python (Unicode normalization), not in SQL
+    assign_verein_keys(op.get_bind(), logging.getLogger('alembic.runtime.migration'))
+    op.create_index('ix_invites_verein_key', 'invites', ['verein_key'], unique=True)
+    # Replaced by verein_key for the duplicate check
+    op.drop_index('ix_invites_verein_lower', table_name='invites')
+
+
+def downgrade():
+    op.create_index('ix_invites_verein_lower', 'invites', [sa.text('lower(verein)')])
+    op.drop_index('ix_invites_verein_key', table_name='invites')
+    # Native DROP COLUMN (SQLite 3.35+), batch mode would recreate the referenced invites table
+    op.execute("ALTER TABLE invites DROP COLUMN verein_key")
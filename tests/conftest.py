@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+from app import create_app
+from app.models import db
+from benchmarks.seating_benchmark import count_statements
+
+
+@pytest.fixture
+def app():
+    app = create_app(testing=True)
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def admin_client(app, client):
+    from app.models import User
+
+    admin = User.query.filter_by(username="admin").first()
+    admin.force_password_change = False
+    db.session.commit()
+    client.post("/auth/login", data={"username": "admin", "password": "changeme"})
+    return client
+
+
+@pytest.fixture
+def sql_statements(app):
+    """Record statements with ``with sql_statements() as statements:``, see count_statements()."""
+    return lambda: count_statements(db.engine)
@@ -0,0 +1,211 @@
+import io
+import json
+
+import pytest
+
+from app.models import DashboardStats, Invite, Response, Setting, TableAssignment, db
+from app.utils.settings_utils import clear_settings_cache
+from app.utils.stats_utils import apply_stats_delta, check_stats, rebuild_stats
+from app.utils.table_utils import assign_all_tables
+
+
+def test_duplicate_names_are_detected_by_normalized_key(admin_client):
+    admin_client.post("/admin/create-invite", data={"verein": "FF Müllerdorf"})
+    admin_client.post("/admin/create-invite", data={"verein": "ff  Muellerdorf "})
+    assert [i.verein_key for i in Invite.query.all()] == ["ff muellerdorf"]
+
+    content = "Verein;Ort\nFF MÜLLERDORF;A\nFF Großdorf;B\nff grossdorf;C\n"
+    csv_file = (io.BytesIO(content.encode()), "import.csv", "text/csv")
+    admin_client.post("/admin/import-csv", data={"csv_file": csv_file, "has_header": "on"},
+                      content_type="multipart/form-data")
+    assert sorted(i.verein for i in Invite.query.all()) == ["FF Großdorf", "FF Müllerdorf"]
+
+    # Renaming keeps the key in sync
+    invite = Invite.query.filter_by(verein_key="ff grossdorf").first()
+    admin_client.post(f"/admin/edit/{invite.token}", data={"verein": "FF Kleindorf"})
+    assert Invite.query.filter_by(verein_key="ff kleindorf").count() == 1
+
+
+def _dashboard_statements(client, sql_statements):
+    with sql_statements() as statements:
+        html = client.get("/admin/").get_data(as_text=True)
+    return html, statements
+
+
+def _add_invites(start, stop):
+    for i in range(start, stop):
+        token = f"tok{i:05d}"
+        db.session.add(Invite(id=i + 1, verein=f"Verein {i:03d}", token=token, link=f"/respond/{token}"))
+        db.session.add(Response(invite_id=i + 1, attending="yes" if i % 4 else "no", persons=3))
+    db.session.commit()
+    assign_all_tables()
+    rebuild_stats()
+    db.session.commit()
+
+
+def test_dashboard_query_count_is_independent_of_invite_count(admin_client, sql_statements):
+    clear_settings_cache()
+    db.session.add_all([
+        Setting(key="enable_tables", value="true"),
+        Setting(key="max_tables", value="100"),
+        Setting(key="max_persons_per_table", value="10"),
+    ])
+    _add_invites(0, 8)
+    admin_client.get("/admin/")  # warm up caches
+    html, small = _dashboard_statements(admin_client, sql_statements)
+    assert "Verein 007" in html
+
+    _add_invites(8, 80)
+    html, large = _dashboard_statements(admin_client, sql_statements)
+    assert len(large) == len(small)
+    # Figures, invite list and table occupancy
+    dashboard = [s for s in large if "invites" in s or "table_assignments" in s or "responses" in s]
+    assert len(dashboard) <= 4
+
+    # 60 of 80 invites attend with 3 persons each
+    assert ">80</p>" in html and ">60</p>" in html and ">180</p>" in html
+    tische = TableAssignment.query.filter_by(invite_id=80).all()
+    assert ", ".join(str(t.tischnummer) for t in sorted(tische, key=lambda t: t.tischnummer)) in html
+
+
+def test_invite_list_is_paged_filtered_and_sorted_by_keyset(admin_client):
+    clear_settings_cache()
+    db.session.add_all([
+        Setting(key="enable_tables", value="true"),
+        Setting(key="max_tables", value="100"),
+        Setting(key="max_persons_per_table", value="10"),
+    ])
+    _add_invites(0, 25)
+    Response.query.filter(Response.invite_id > 20).delete()
+    Invite.query.filter(Invite.id > 20).update({"ort": "Müllerdorf", "plz": "12345"})
+    db.session.commit()
+    assign_all_tables()
+
+    def page(**params):
+        return admin_client.get("/admin/", query_string=dict(params, format="json")).get_json()
+
+    # Pages of 10 cover every invite exactly once in name order
+    names = []
+    data = page(limit=10)
+    while True:
+        names += [invite["verein"] for invite in data["invites"]]
+        if not data["next_url"]:
+            break
+        data = admin_client.get(data["next_url"] + "&limit=10").get_json()
+    assert names == sorted(f"Verein {i:03d}" for i in range(25))
+    assert "<tr" in data["html"]
+
+    declined = page(status="declined")["invites"]
+    assert [i["id"] for i in declined] == [1, 5, 9, 13, 17]
+    assert [i["id"] for i in page(status="unanswered", ort="müllerdorf", plz="123")["invites"]] == [21, 22, 23, 24, 25]
+    assert {i["id"] for i in page(tisch="no")["invites"]} == {1, 5, 9, 13, 17, 21, 22, 23, 24, 25}
+
+    # Descending by persons, continued after a cursor of the same sort
+    first = page(sort="personen", dir="desc", limit=3)
+    second = admin_client.get(first["next_url"] + "&limit=100").get_json()
+    ordered = [i["id"] for i in first["invites"] + second["invites"]]
+    assert len(ordered) == len(set(ordered)) == 25
+    assert first["invites"][0]["attending"] == "yes"
+
+    assert admin_client.get("/admin/", query_string={"after": "kaputt"}).status_code == 400
+
+
+def test_list_pages_are_streamed_and_keep_session_changes(admin_client):
+    _add_invites(0, 3)
+    # delete_invite flashes a message, which the streamed dashboard shows exactly once
+    admin_client.post("/admin/delete/tok00002")
+    response = admin_client.get("/admin/")
+    assert response.is_streamed
+    assert "gelöscht" in response.get_data(as_text=True)
+    assert "gelöscht" not in admin_client.get("/admin/").get_data(as_text=True)
+
+    response = admin_client.get("/pdf/")
+    assert response.is_streamed
+    html = response.get_data(as_text=True)
+    assert "Verein 000" in html and "Verein 001" in html and "Verein 002" not in html
+
+
+def _read_events(client, **headers):
+    response = client.get("/admin/events?after=0", headers=headers)
+    assert response.mimetype == "text/event-stream"
+    events = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and line[0] != ":")
+        if "event" in fields:
+            events.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_dashboard_changes_are_streamed_from_the_change_log(app, admin_client):
+    app.config["EVENT_STREAM_SECONDS"] = 0
+    clear_settings_cache()
+    db.session.add_all([
+        Setting(key="enable_tables", value="true"),
+        Setting(key="max_tables", value="100"),
+        Setting(key="max_persons_per_table", value="10"),
+    ])
+    _add_invites(0, 2)
+    html = admin_client.get("/admin/").get_data(as_text=True)
+    assert 'data-events-url="/admin/events?after=0"' in html
+
+    admin_client.post("/respond/tok00000", data={"attending": "yes", "persons": "5"})
+    admin_client.post("/respond/tok00000", data={"attending": "yes", "persons": "5"})  # unchanged
+    admin_client.post("/admin/delete/tok00001")
+
+    events = _read_events(admin_client)
+    assert [(kind, data.get("delta")) for _, kind, data in events] == [
+        # "no" -> "yes" with 5 persons
+        ("response", {"response_count": 1, "total_persons": 5}),
+        ("layout", None),
+        ("invite", {"response_count": -1, "total_persons": -3, "total_invites": -1}),
+        ("layout", None),
+    ]
+    assert events[1][2]["used_tables"] == 1
+
+    # A reconnecting browser continues after the last event it received
+    assert _read_events(admin_client, **{"Last-Event-ID": str(events[1][0])}) == events[2:]
+
+    # Servers without threads get the backlog only and the browser polls again later
+    app.config["EVENT_STREAM_SECONDS"] = 25
+    assert admin_client.get("/admin/events").get_data(as_text=True) == "retry: 5000\n\n"
+    app.config["EVENT_STREAM_SECONDS"] = 0
+    threaded = admin_client.get("/admin/events", environ_overrides={"wsgi.multithread": True})
+    assert threaded.get_data(as_text=True).startswith("retry: 1000\n\n")
+
+
+def test_dashboard_counters_follow_writes_and_report_drift(admin_client):
+    clear_settings_cache()
+    db.session.add_all([
+        Setting(key="enable_tables", value="true"),
+        Setting(key="max_tables", value="100"),
+        Setting(key="max_persons_per_table", value="4"),
+    ])
+    _add_invites(0, 4)
+    admin_client.post("/respond/tok00000", data={"attending": "yes", "persons": "6"})
+    admin_client.post("/respond/tok00003", data={"attending": "no"})
+    admin_client.post("/admin/delete/tok00001")
+    assert check_stats() == {}
+
+    html = admin_client.get("/admin/").get_data(as_text=True)
+    assert 'data-stat="total_invites">3<' in html
+    assert 'data-stat="response_count">2<' in html
+    assert 'data-stat="total_persons">9<' in html
+    assert "Verein 000" in html.split("Meiste Zusagen:")[1].split("</div>")[0]
+
+    db.session.execute(db.text("UPDATE dashboard_stats SET total_persons = 0, used_tables = 99"))
+    assert check_stats(repair=True) == {"total_persons": (0, 9), "used_tables": (99, 3)}
+    assert check_stats() == {}
+
+    # A database from before the counters has no row: it is created, not reported as drift
+    db.session.execute(db.text("DELETE FROM dashboard_stats"))
+    assert check_stats() == {}
+    # A write into a missing row rebuilds it from the base tables including the change
+    db.session.execute(db.text("DELETE FROM dashboard_stats"))
+    db.session.commit()
+    admin_client.post("/respond/tok00002", data={"attending": "no"})
+    assert check_stats() == {}
+    assert db.session.get(DashboardStats, 1).response_count == 1
+
+    # Deltas are only correct if the old values were read under the write lock
+    with pytest.raises(RuntimeError):
+        apply_stats_delta({"total_invites": 1})
@@ -0,0 +1,35 @@
+from app.utils.capacity_utils import evaluate_capacity_grid, evaluate_cell
+
+
+def test_grid_matches_individual_packing():
+    vereine = [(f"Verein {i}", size) for i, size in enumerate([12, 8, 7, 5, 4, 4, 3, 2, 2, 1] * 4)]
+    manuell = {"Manuell": {"tischnummer": 9, "personen": 15}}
+    table_counts = range(5, 40, 3)
+    seat_counts = range(4, 13)
+
+    grid = evaluate_capacity_grid(manuell, vereine, table_counts, seat_counts, processes=1)
+
+    assert len(grid) == len(table_counts) * len(seat_counts)
+    for cell in grid:
+        assert cell == evaluate_cell(manuell, vereine, cell["max_tables"], cell["max_persons_per_table"])
+
+
+def test_grid_reuses_one_bounded_pool():
+    from app.utils import capacity_utils
+
+    vereine = [(f"Verein {i}", size) for i, size in enumerate([9, 6, 4, 3, 2, 1] * 5)]
+    table_counts = range(2, 30)
+    seat_counts = range(4, 8)
+
+    grid = evaluate_capacity_grid({}, vereine, table_counts, seat_counts, processes=2)
+    pool = capacity_utils._pool
+    assert pool is not None and pool._max_workers <= capacity_utils.MAX_POOL_PROCESSES
+    assert evaluate_capacity_grid({}, vereine, table_counts, seat_counts, processes=2) == grid
+    assert capacity_utils._pool is pool
+    assert grid == evaluate_capacity_grid({}, vereine, table_counts, seat_counts, processes=1)
+
+
+def test_capacity_page_renders(admin_client):
+    response = admin_client.get("/admin/capacity?tables_min=5&tables_max=20&seats_min=6&seats_max=10&acceptance=50")
+    assert response.status_code == 200
+    assert "Kapazitätsplanung" in response.get_data(as_text=True)
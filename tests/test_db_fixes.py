@@ -0,0 +1,59 @@
+import sqlite3
+
+from sqlalchemy import inspect
+
+from app import create_app
+from app.models import DashboardStats, Invite, Response, TableAssignment, db
+from app.utils.db_fixes import prepare_database
+
+# Schema of the original release, before responses and table assignments were linked by invite id
+BASELINE_SCHEMA = """
+CREATE TABLE invites (
+    id INTEGER PRIMARY KEY, verein VARCHAR(150) NOT NULL, tischnummer VARCHAR(200),
+    token VARCHAR(64) NOT NULL UNIQUE, link VARCHAR(512) NOT NULL, created_at DATETIME,
+    manuell_gesetzt BOOLEAN
+);
+CREATE TABLE responses (
+    id INTEGER PRIMARY KEY, token VARCHAR(64) NOT NULL REFERENCES invites (token),
+    attending VARCHAR(10) NOT NULL, persons INTEGER, timestamp DATETIME
+);
+CREATE TABLE table_assignments (
+    id INTEGER PRIMARY KEY, tischnummer INTEGER NOT NULL, verein VARCHAR(150) NOT NULL, personen INTEGER NOT NULL
+);
+INSERT INTO invites (id, verein, tischnummer, token, link, manuell_gesetzt) VALUES
+    (1, 'FF Nord', '4', 'nord', '/respond/nord', 1),
+    (2, 'FF Süd', '', 'sued', '/respond/sued', 0),
+    (3, 'ff  sued', NULL, 'sued2', '/respond/sued2', 0);
+INSERT INTO responses (id, token, attending, persons) VALUES
+    (1, 'nord', 'yes', 6), (2, 'sued', 'yes', 2), (3, 'sued', 'no', 0), (4, 'weg', 'yes', 1);
+INSERT INTO table_assignments (id, tischnummer, verein, personen) VALUES (1, 4, 'FF Nord', 6), (2, 1, 'FF Süd', 2);
+"""
+
+
+def test_baseline_database_is_converted_once_in_one_transaction(tmp_path, monkeypatch):
+    path = tmp_path / "baseline.db"
+    connection = sqlite3.connect(path)
+    connection.executescript(BASELINE_SCHEMA)
+    connection.close()
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{path}")
+    monkeypatch.setenv("TABLE_RECOMPUTE_ASYNC", "false")
+
+    app = create_app()
+    prepare_database(app)
+    prepare_database(app)  # nothing left to do
+
+    with app.app_context():
+        tables = inspect(db.engine).get_table_names()
+        assert not [name for name in tables if name.endswith("_alt")]
+        assert {c["name"] for c in inspect(db.engine).get_columns("invites")} >= {"email", "verein_key"}
+        assert [(i.id, i.tischnummer) for i in Invite.query.order_by(Invite.id)] == [(1, 4), (2, None), (3, None)]
+        # Lowest response id per token wins, responses without an invite are dropped
+        assert [(r.invite_id, r.attending) for r in Response.query.order_by(Response.id)] == [(1, "yes"), (2, "yes")]
+        assert sorted((t.invite_id, t.tischnummer) for t in TableAssignment.query) == [(1, 4), (2, 1)]
+        # Same association spelled differently: the later invite gets a unique key
+        assert db.session.get(Invite, 3).verein_key.endswith("#3")
+        # The dashboard counters exist before the first write
+        stats = db.session.get(DashboardStats, 1)
+        assert (stats.total_invites, stats.response_count, stats.total_persons) == (3, 2, 8)
+        db.session.remove()
+        db.engine.dispose()
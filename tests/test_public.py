@@ -0,0 +1,58 @@
+from app.models import Invite, db
+
+
+def test_respond_page_supports_conditional_get(app):
+    db.session.add(Invite(verein="Verein A", token="tokA", link="/respond/tokA"))
+    db.session.commit()
+    client = app.test_client()
+
+    first = client.get("/respond/tokA")
+    assert first.status_code == 200 and first.headers["ETag"]
+    assert "Cookie" in first.headers["Vary"]
+    second = client.get("/respond/tokA", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 304 and second.data == b""
+
+    # The redirect target shows a flash message and is not cached
+    client.post("/respond/tokA", data={"attending": "yes", "persons": "4"})
+    flashed = client.get("/respond/tokA", headers={"If-None-Match": first.headers["ETag"]})
+    assert flashed.status_code == 200 and "no-store" in flashed.headers["Cache-Control"]
+
+    changed = client.get("/respond/tokA", headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200 and changed.headers["ETag"] != first.headers["ETag"]
+    assert changed.last_modified is not None
+
+
+def test_legal_pages_are_cacheable(app):
+    response = app.test_client().get("/impressum")
+    assert response.cache_control.public and response.cache_control.max_age == 300
+
+
+def test_upsert_response_reports_changes_and_keeps_one_row(app):
+    from app.models import Response
+    from app.utils.response_utils import upsert_response
+
+    invite = Invite(verein="Verein B", token="tokB", link="/respond/tokB")
+    db.session.add(invite)
+    db.session.commit()
+
+    assert upsert_response(invite.id, "yes", 4) is True
+    assert upsert_response(invite.id, "yes", 4) is False
+    assert upsert_response(invite.id, "yes", 5) is True
+    db.session.commit()
+    assert [(r.attending, r.persons) for r in Response.query.filter_by(invite_id=invite.id)] == [("yes", 5)]
+
+
+def test_token_index_rejects_unknown_tokens_without_invite_query(app, sql_statements):
+    db.session.add(Invite(verein="Verein C", token="abcd1234", link="/respond/abcd1234"))
+    db.session.commit()
+    client = app.test_client()
+    client.get("/respond/abcd1234")  # builds the index
+
+    with sql_statements() as statements:
+        assert client.get("/respond/zzzz9999").status_code == 302
+    assert not [s for s in statements if "invites" in s]
+
+    # Typed off paper: case and whitespace do not matter, no redirect hop
+    found = client.post("/find", data={"token": " ABCD 1234 "})
+    assert found.status_code == 200 and "Verein C" in found.get_data(as_text=True)
+    assert client.get("/respond/ABCD1234").headers["Location"].endswith("/respond/abcd1234")
@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy import delete, func, select, text
+from app.models import Invite, Response, TableAssignment, db
+from app.utils.table_utils import seating_groups_query
+
+
+def _hot_queries():
+    return {
+        "duplicate check by verein_key": select(Invite.id).where(Invite.verein_key == "ff a"),
+        "invite by token": select(Invite.id).where(Invite.token == "tok00001"),
+        "response of one invite": select(Response.id).where(Response.invite_id == 1),
+        "manual invites": select(Invite.verein, Invite.tischnummer).where(Invite.manuell_gesetzt.is_(True)),
+        "attending count": select(func.count()).select_from(Response).where(Response.attending == "yes"),
+        "group of one invite": select(Invite.manuell_gesetzt, Response.persons).outerjoin(
+            Response, (Response.invite_id == Invite.id) & (Response.attending == "yes")
+        ).where(Invite.id == 1),
+        "assignments of one invite": select(TableAssignment.id).where(TableAssignment.invite_id == 1),
+        "delete assignments of one invite": delete(TableAssignment).where(TableAssignment.invite_id == 1),
+        "seating groups": seating_groups_query(),
+    }
+
+
+@pytest.mark.parametrize("name", list(_hot_queries()))
+def test_hot_query_does_not_scan_full_table(app, name):
+    statement = _hot_queries()[name].compile(db.engine, compile_kwargs={"literal_binds": True})
+    plan = [row[-1] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {statement}"))]
+    scans = [detail for detail in plan if detail.startswith("SCAN ") and "INDEX" not in detail]
+    assert not scans, f"{name} scans a full table: {plan}"
@@ -0,0 +1,67 @@
+from app.models import Setting, VersionStamp, db
+from app.utils.settings_utils import (
+    SETTINGS_STAMP, bump_version_stamp, check_settings_version, get_setting, invalidate_settings,
+)
+
+
+def test_settings_cache_is_invalidated_by_version_stamp(app):
+    db.session.add(Setting(key="max_tables", value="10"))
+    db.session.commit()
+    assert get_setting("max_tables") == "10"
+
+    # Change without stamp (cache stays until the TTL)
+    Setting.query.filter_by(key="max_tables").update({"value": "20"})
+    db.session.commit()
+    check_settings_version()
+    assert get_setting("max_tables") == "10"
+    assert get_setting("max_tables", expire_after=0) == "20"
+
+    # Another worker saved the settings and bumped the stamp
+    Setting.query.filter_by(key="max_tables").update({"value": "30"})
+    bump_version_stamp(SETTINGS_STAMP)
+    db.session.commit()
+    assert get_setting("max_tables") == "20"
+    check_settings_version()
+    assert get_setting("max_tables") == "30"
+
+    invalidate_settings()
+    assert db.session.get(VersionStamp, SETTINGS_STAMP).version == 2
+
+
+def test_settings_change_is_seen_on_next_request(app, admin_client):
+    admin_client.post("/admin/settings", data={"event_name": "Sommerfest", "max_tables": "12"})
+    with app.test_request_context():
+        assert get_setting("event_name") == "Sommerfest"
+
+
+def test_settings_snapshot_typed_accessors_and_bulk_save(app):
+    from datetime import date
+    import pytest
+    from app.utils.settings_utils import get_settings, save_settings
+
+    save_settings({"max_tables": "12", "enable_tables": "true", "event_date": "2026-07-04"})
+    save_settings({"max_tables": "14", "max_persons_per_table": "x"})
+    settings = get_settings()
+    assert settings.max_tables == 14
+    assert settings.max_persons_per_table == 10
+    assert settings.enable_tables is True
+    assert settings.event_date == date(2026, 7, 4)
+    assert settings.values_for({"event_name": "Fest", "max_tables": "90"}) == {"event_name": "Fest", "max_tables": "14"}
+    with pytest.raises(AttributeError):
+        settings.version = 5
+    assert Setting.query.count() == 4
+
+
+def test_public_pages_use_cached_settings(app, sql_statements):
+    from app.utils.settings_utils import save_settings
+
+    save_settings({"event_name": "Jubiläum", "event_date": "2099-07-04"})
+    client = app.test_client()
+    client.get("/")
+
+    for url in ("/", "/impressum", "/datenschutz"):
+        with sql_statements() as statements:
+            response = client.get(url)
+        assert len(statements) == 1  # settings version check only
+        assert response.status_code == 200
+    assert "Jubiläum" in client.get("/").get_data(as_text=True)
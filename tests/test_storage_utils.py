@@ -0,0 +1,61 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.utils.storage_utils import configure_storage, get_storage_profile, immediate_transactions, read_pragmas
+
+
+def test_storage_profile_with_overrides():
+    profile = get_storage_profile("wal", {"SQLITE_SYNCHRONOUS": "FULL", "SQLITE_BUSY_TIMEOUT": "250"})
+    assert profile["journal_mode"] == "wal"
+    assert profile["synchronous"] == "full"
+    assert profile["busy_timeout"] == 250
+    with pytest.raises(ValueError):
+        get_storage_profile("turbo", {})
+
+
+@pytest.mark.parametrize("profile", ["wal", "legacy"])
+def test_reads_run_inside_the_transaction(tmp_path, profile):
+    engine = create_engine(f"sqlite:///{tmp_path / 'storage.db'}")
+    configure_storage(engine, get_storage_profile(profile, {}), retries=1)
+    with engine.begin() as connection:
+        connection.execute(text("SELECT 1"))
+        assert connection.connection.driver_connection.in_transaction
+    with engine.connect() as connection:
+        # DDL is rolled back with the transaction
+        connection.execute(text("CREATE TABLE t (x INTEGER)"))
+        connection.rollback()
+        assert "t" not in connection.execute(text("SELECT name FROM sqlite_master")).scalars().all()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("profile", ["wal", "legacy"])
+def test_write_transactions_take_the_lock_at_begin(tmp_path, profile):
+    path = tmp_path / "storage.db"
+    engine = create_engine(f"sqlite:///{path}")
+    configure_storage(engine, get_storage_profile(profile, {"SQLITE_BUSY_TIMEOUT": "50"}), retries=1)
+    assert read_pragmas(engine)["journal_mode"] == ("wal" if profile == "wal" else "delete")
+    assert read_pragmas(engine)["foreign_keys"] is True
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE t (x INTEGER)"))
+
+    other = sqlite3.connect(path, timeout=0, isolation_level=None)
+    with immediate_transactions():
+        with engine.begin() as connection:
+            # The write lock is held before the first statement ...
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                other.execute("BEGIN IMMEDIATE")
+            # ... while readers keep working (under both journals until the commit)
+            assert other.execute("SELECT count(*) FROM t").fetchone() == (0,)
+
+        other.execute("BEGIN IMMEDIATE")
+        # BEGIN IMMEDIATE is retried with backoff and then gives up
+        with pytest.raises(OperationalError, match="locked"):
+            with engine.begin() as connection:
+                connection.execute(text("INSERT INTO t VALUES (1)"))
+        other.execute("ROLLBACK")
+    other.close()
+    engine.dispose()
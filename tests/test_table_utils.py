@@ -0,0 +1,350 @@
+from app.models import Invite, Response, Setting, TableAssignment, db
+from app.utils.seating_utils import MIN_GRUPPE
+from app.utils.settings_utils import clear_settings_cache
+from app.utils.table_utils import (
+    assign_all_tables, get_blocked_tischnummern, get_next_free_tischnummer, is_tisch_belegt,
+    update_group_tables,
+)
+
+
+def _setup_event(groups, max_tables=10, max_persons=10):
+    clear_settings_cache()
+    db.session.add_all([
+        Setting(key="enable_tables", value="true"),
+        Setting(key="max_tables", value=str(max_tables)),
+        Setting(key="max_persons_per_table", value=str(max_persons)),
+    ])
+    for i, personen in enumerate(groups):
+        token = f"tok{i:05d}"
+        db.session.add(Invite(id=i + 1, verein=f"Verein {i}", token=token, link=f"/respond/{token}"))
+        db.session.add(Response(invite_id=i + 1, attending="yes", persons=personen))
+    db.session.commit()
+
+
+def _layout():
+    return sorted((ta.tischnummer, ta.invite_id, ta.personen) for ta in TableAssignment.query.all())
+
+
+def test_update_group_tables_only_touches_changed_group(app):
+    _setup_event([8, 6, 4, 2])
+    assign_all_tables()
+    before = [row for row in _layout() if row[1] != 4]
+
+    Response.query.filter_by(invite_id=4).first().persons = 5
+    db.session.commit()
+    update_group_tables(4)
+
+    after = _layout()
+    assert [row for row in after if row[1] != 4] == before
+    assert sum(p for _, v, p in after if v == 4) == 5
+    belegung = {}
+    for tischnummer, _, personen in after:
+        belegung[tischnummer] = belegung.get(tischnummer, 0) + personen
+    assert max(belegung.values()) <= 10
+
+
+def test_update_group_tables_removes_declined_group(app):
+    _setup_event([8, 6, 4])
+    assign_all_tables()
+
+    Response.query.filter_by(invite_id=2).first().attending = "no"
+    db.session.commit()
+    update_group_tables(2)
+
+    assert 2 not in {v for _, v, _ in _layout()}
+    assert sum(p for _, _, p in _layout()) == 12
+
+
+def test_free_seat_index_finds_first_table_with_capacity():
+    from app.utils.seating_utils import FreeSeatIndex
+
+    index = FreeSeatIndex([2, -1, 5, 10, 3])
+    assert index.first_at_least(1) == 0
+    assert index.first_at_least(3) == 2
+    assert index.first_at_least(10) == 3
+    assert index.first_at_least(11) is None
+
+    index.update(3, 0)
+    assert index.first_at_least(6) is None
+    assert index.first_at_least(4) == 2
+
+
+class _ReferenceLayout:
+    """The list-scanning first fit that FreeSeatIndex replaced, kept as an oracle."""
+
+    def __init__(self, max_tables, max_persons):
+        self.max_persons = max_persons
+        self.tische = [{"belegt": 0, "zuweisungen": [], "nummer": i, "reserviert": False}
+                       for i in range(1, max_tables + 1)]
+
+    @classmethod
+    def from_assignments(cls, rows, reserved, max_tables, max_persons):
+        layout = cls(max_tables, max_persons)
+        for tischnummer, verein, personen in rows:
+            tisch = layout.tische[tischnummer - 1]
+            tisch["zuweisungen"].append((verein, personen))
+            tisch["belegt"] += personen
+        for nummer in reserved:
+            layout.tische[nummer - 1]["reserviert"] = True
+        return layout
+
+    def _frei(self):
+        return next((t for t in self.tische if not t["reserviert"] and t["belegt"] == 0), None)
+
+    def _setze(self, tisch, verein, personen, reserviert=False):
+        tisch["zuweisungen"].append((verein, personen))
+        tisch["belegt"] += personen
+        tisch["reserviert"] |= reserviert
+
+    def place_manual(self, verein, tischnummer, personen):
+        if not 1 <= tischnummer <= len(self.tische):
+            return
+        tisch = self.tische[tischnummer - 1]
+        tisch["reserviert"] = True
+        tisch["belegt"] = min(personen, self.max_persons)
+        tisch["zuweisungen"].append((verein, tisch["belegt"]))
+        rest = personen - tisch["belegt"]
+        for nachbar_nr in (tischnummer - 1, tischnummer + 1):
+            if rest > 0 and 1 <= nachbar_nr <= len(self.tische):
+                nachbar = self.tische[nachbar_nr - 1]
+                if not nachbar["reserviert"] and nachbar["belegt"] == 0:
+                    self._setze(nachbar, verein, min(self.max_persons, rest), reserviert=True)
+                    rest -= min(self.max_persons, rest)
+        while rest > 0 and self._frei() is not None:
+            self._setze(self._frei(), verein, min(self.max_persons, rest), reserviert=True)
+            rest -= min(self.max_persons, rest)
+
+    def place_group(self, verein, personen):
+        rest = personen
+        while rest > 0:
+            for tisch in self.tische:
+                setze = min(self.max_persons - tisch["belegt"], rest)
+                if not tisch["reserviert"] and setze > 0 and not (setze < MIN_GRUPPE <= rest):
+                    break
+            else:
+                tisch = self._frei()
+                if tisch is None:
+                    return rest
+                setze = min(self.max_persons, rest)
+            self._setze(tisch, verein, setze)
+            rest -= setze
+        return 0
+
+    def remove_group(self, verein):
+        betroffen = set()
+        for tisch in self.tische:
+            behalten = [(v, p) for v, p in tisch["zuweisungen"] if v != verein]
+            if not tisch["reserviert"] and len(behalten) != len(tisch["zuweisungen"]):
+                tisch["zuweisungen"] = behalten
+                tisch["belegt"] = sum(p for _, p in behalten)
+                betroffen.add(tisch["nummer"])
+        return betroffen
+
+    def assignments(self):
+        return [(t["nummer"], v, p) for t in self.tische for v, p in t["zuweisungen"] if p > 0]
+
+
+def _reference_pack(manuell, vereine, max_tables, max_persons):
+    layout = _ReferenceLayout(max_tables, max_persons)
+    for verein, info in manuell.items():
+        layout.place_manual(verein, info["tischnummer"], info["personen"])
+    unplaced = {}
+    for verein, personen in sorted(vereine, key=lambda v: -v[1]):
+        rest = layout.place_group(verein, personen)
+        if rest > 0:
+            unplaced[verein] = rest
+    return layout, unplaced
+
+
+def test_indexed_packing_matches_reference_first_fit():
+    import random
+    from app.utils.seating_utils import SeatingLayout, _best_fit, _first_fit, pack_tables
+
+    rnd = random.Random(7)
+    for _ in range(300):
+        max_tables, max_persons = rnd.randint(1, 40), rnd.randint(1, 12)
+        manuell = {
+            f"Manuell {i}": {"tischnummer": rnd.randint(0, max_tables + 1),
+                             "personen": rnd.randint(0, 3 * max_persons)}
+            for i in range(rnd.randint(0, 4))
+        }
+        vereine = [(f"Verein {i}", rnd.randint(1, 2 * max_persons + 3)) for i in range(rnd.randint(0, 60))]
+
+        layout, unplaced = pack_tables(manuell, vereine, max_tables, max_persons)
+        reference, reference_unplaced = _reference_pack(manuell, vereine, max_tables, max_persons)
+        assert list(layout.assignments()) == reference.assignments()
+        assert unplaced == reference_unplaced
+
+        # Incremental updates on the stored plan: remove a group and place its new size
+        reserved = {t["nummer"] for t in reference.tische if t["reserviert"]}
+        rows = reference.assignments()
+        layout = SeatingLayout.from_assignments(rows, reserved, max_tables, max_persons)
+        reference = _ReferenceLayout.from_assignments(rows, reserved, max_tables, max_persons)
+        for verein, _ in rnd.sample(vereine, min(len(vereine), 5)):
+            assert layout.remove_group(verein) == reference.remove_group(verein)
+            personen = rnd.randint(0, 2 * max_persons)
+            assert layout.place_group(verein, personen) == reference.place_group(verein, personen)
+            assert list(layout.assignments()) == reference.assignments()
+
+        # Bin packing of the optimiser against plain list scans
+        items = [(rnd.randint(1, max_persons), i) for i in range(rnd.randint(0, 60))]
+        bins = []
+        for personen, verein in items:
+            b = next((b for b in bins if max_persons - sum(p for _, p in b) >= personen), None)
+            if b is None:
+                bins.append(b := [])
+            b.append((verein, personen))
+        assert _first_fit(items, max_persons) == bins
+
+        loads = []
+        for personen, _ in items:
+            frei = [(max_persons - load, i) for i, load in enumerate(loads) if max_persons - load >= personen]
+            if frei:
+                loads[min(frei)[1]] += personen
+            else:
+                loads.append(personen)
+        # Ties between equally filled bins may be broken differently, the loads stay the same
+        assert sorted(sum(p for _, p in b) for b in _best_fit(items, max_persons)) == sorted(loads)
+
+
+def test_recompute_is_debounced_and_claimed_once(app):
+    import time
+    from app.utils.recompute_utils import get_layout_state, mark_layout_dirty, run_pending_recompute
+
+    _setup_event([8, 6, 4])
+    app.config["TABLE_RECOMPUTE_ASYNC"] = True
+    mark_layout_dirty(1)
+    mark_layout_dirty(2)
+    # The flag belongs to the caller's transaction
+    db.session.rollback()
+    assert not get_layout_state().dirty
+    mark_layout_dirty(1)
+    mark_layout_dirty(2)
+    db.session.commit()
+    assert TableAssignment.query.count() == 0
+
+    # Still inside the debounce window
+    assert not run_pending_recompute("worker-a", window=60)
+
+    later = time.time() + 120
+    assert run_pending_recompute("worker-a", window=60, now=later)
+    assert not run_pending_recompute("worker-b", window=60, now=later)
+
+    state = get_layout_state()
+    assert state.version == 1
+    assert not state.dirty and state.lock_owner is None
+    assert {v for _, v, _ in _layout()} == {1, 2}
+
+
+def test_assign_all_tables_only_writes_changed_rows(app, sql_statements):
+    from app.utils.table_utils import write_assignments
+
+    _setup_event([8, 6, 4])
+    assign_all_tables()
+    ids_before = {(ta.tischnummer, ta.invite_id): ta.id for ta in TableAssignment.query.all()}
+
+    assert write_assignments([(t, v, p) for t, v, p in _layout()]) == (0, 0, 0)
+
+    # The stored rows are read after BEGIN IMMEDIATE, even when the caller holds no lock
+    plan = [(t, v, p) for t, v, p in _layout() if v != 1]
+    with sql_statements() as statements:
+        assert write_assignments(plan)[2] > 0
+    assert statements[0] == "BEGIN IMMEDIATE"
+    assert statements[1].startswith("SELECT table_assignments.id")
+    assert 1 not in {v for _, v, _ in _layout()}
+    assign_all_tables()
+    ids_before = {(ta.tischnummer, ta.invite_id): ta.id for ta in TableAssignment.query.all()}
+
+    Response.query.filter_by(invite_id=3).first().persons = 3
+    db.session.commit()
+    assign_all_tables()
+    ids_after = {(ta.tischnummer, ta.invite_id): ta.id for ta in TableAssignment.query.all()}
+    assert ids_after == ids_before
+    assert sum(p for _, v, p in _layout() if v == 3) == 3
+
+
+def test_recompute_statement_count_is_independent_of_group_count(app, sql_statements):
+    _setup_event([4] * 10, max_tables=200)
+    assign_all_tables()  # warm up the settings cache
+    TableAssignment.query.delete()
+    db.session.commit()
+    with sql_statements() as small:
+        assign_all_tables()
+
+    TableAssignment.query.delete()
+    for i in range(10, 400):
+        token = f"tok{i:05d}"
+        db.session.add(Invite(id=i + 1, verein=f"Verein {i}", token=token, link=f"/respond/{token}",
+                              manuell_gesetzt=i % 50 == 0, tischnummer=i // 2 if i % 50 == 0 else None))
+        db.session.add(Response(invite_id=i + 1, attending="yes", persons=1 + i % 7))
+    db.session.commit()
+    with sql_statements() as large:
+        assign_all_tables()
+
+    assert len(large) == len(small)
+
+
+def test_optimize_tables_is_never_worse_than_greedy():
+    import random
+    from app.utils.seating_utils import _score, optimize_tables, pack_tables
+
+    rnd = random.Random(3)
+    for _ in range(50):
+        vereine = [(f"Verein {i}", rnd.choice([1, 2, 3, 4, 6, 7, 9, 13])) for i in range(rnd.randint(1, 40))]
+        manuell = {"Manuell": {"tischnummer": rnd.randint(1, 12), "personen": rnd.choice([0, 4, 14])}}
+        greedy = pack_tables(manuell, vereine, 30, 10)
+        optimiert = optimize_tables(manuell, vereine, 30, 10, budget_seconds=0.01)
+        assert _score(*optimiert) <= _score(*greedy)
+
+    # 6+4 and 7+3 fit exactly, greedy splits the 7 across tables
+    layout, unplaced = optimize_tables({}, [("A", 7), ("B", 6), ("C", 4), ("D", 3)], 5, 10)
+    assert not unplaced
+    assert layout.summary()["tables_used"] == 2
+    assert layout.summary()["split_groups"] == 0
+
+
+def test_occupancy_lookup_and_manual_table_conflict(app, admin_client):
+    _setup_event([8, 8])
+    assign_all_tables()
+    invite = Invite(verein="Manuell", token="manuell", link="/respond/manuell",
+                    tischnummer=4, manuell_gesetzt=True)
+    db.session.add(invite)
+    db.session.commit()
+
+    assert get_blocked_tischnummern() == {1, 2, 4}
+    assert get_blocked_tischnummern(exclude_invite_id=invite.id) == {1, 2}
+    assert get_next_free_tischnummer(get_blocked_tischnummern(), 10) == "3"
+    assert get_next_free_tischnummer({1, 2, 3}, 3) == "1"
+    assert is_tisch_belegt(4) and not is_tisch_belegt(4, exclude_invite_id=invite.id)
+    assert not is_tisch_belegt(3)
+
+    # Only table numbers of the configured range can be assigned
+    for ungueltig in ("0", "11"):
+        response = admin_client.post("/admin/assign_table/tok00000", data={"tischnummer": ungueltig},
+                                     follow_redirects=True)
+        assert "zwischen 1 und 10" in response.get_data(as_text=True)
+        assert db.session.get(Invite, 1).manuell_gesetzt is not True
+
+    # Intended rule (README: "doppelte Tischnummern werden verhindert"): a table
+    # manually given to one group cannot be manually given to another one
+    response = admin_client.post("/admin/assign_table/tok00000", data={"tischnummer": "4"}, follow_redirects=True)
+    assert "bereits manuell einem anderen Verein zugewiesen" in response.get_data(as_text=True)
+    assert db.session.get(Invite, 1).manuell_gesetzt is not True
+    assert db.session.get(Invite, invite.id).tischnummer == 4
+    admin_client.post("/admin/assign_table/tok00000", data={"tischnummer": "5"})
+    assert db.session.get(Invite, 1).tischnummer == 5
+    # Assigning the own table again is not a conflict
+    admin_client.post("/admin/assign_table/tok00000", data={"tischnummer": "5"})
+    assert db.session.get(Invite, 1).tischnummer == 5
+
+
+def test_deleting_invite_cascades_to_response_and_tables(app, admin_client):
+    _setup_event([8, 6])
+    assign_all_tables()
+    db.session.get(Invite, 1).verein = "Umbenannt"
+    db.session.commit()
+    assert {v for _, v, _ in _layout()} == {1, 2}
+
+    admin_client.post("/admin/delete/tok00000")
+    assert Response.query.filter_by(invite_id=1).count() == 0
+    assert {v for _, v, _ in _layout()} == {2}